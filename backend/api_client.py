@@ -1,21 +1,60 @@
 """
 API Client for communicating with Lumy dashboard
 """
-import requests
+import gzip
+import json
+import time
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
+from metrics import span
+from http_transport import HTTPTransport, CircuitOpenError, parse_retry_after
 
 logger = logging.getLogger(__name__)
 
+# Batch responses that resending the same batch can't fix (malformed, too
+# large, unknown device, constraint violation)
+BATCH_REJECTED_STATUSES = (400, 404, 409, 413, 422)
+
 class LumyAPIClient:
-    def __init__(self, base_url: str, api_key: str):
+    def __init__(self, base_url: str, api_key: str, transport: Optional[HTTPTransport] = None,
+                 batch_recheck_interval: float = 3600):
+        """
+        Args:
+            base_url: Dashboard URL
+            api_key: API key for device authentication
+            transport: HTTP transport to use (default: one with default
+                timeouts, retries and circuit breakers)
+            batch_recheck_interval: Seconds to use single heartbeats after
+                finding no telemetry batch endpoint before trying it again
+        """
         self.base_url = base_url.rstrip('/')
         self.api_key = api_key
-        self.session = requests.Session()
+        self.transport = transport or HTTPTransport(base_url)
+        self.session = self.transport.session
         self.session.headers.update({
             'X-API-KEY': api_key,
             'Content-Type': 'application/json'
         })
+        # Last config and its ETag per device, for conditional requests
+        self._config_cache = {}
+        self.config_not_modified = 0
+        # Set by send_heartbeat() when the dashboard lacks the current preview
+        self.preview_required = False
+        # Set by send_telemetry_batch(): seconds the server asked us to wait,
+        # whether it refused the batch for good, and whether the server has
+        # the batch endpoint at all
+        self.retry_after = None
+        self.batch_rejected = False
+        self.batch_recheck_interval = batch_recheck_interval
+        self._batch_unsupported_until = 0.0
+        # Set by check_claim_status(): whether the dashboard says the device
+        # is claimed, or None if it didn't answer
+        self.claim_status = None
+    
+    @property
+    def batch_supported(self) -> bool:
+        """False for a while after the dashboard turned out to lack the batch endpoint"""
+        return time.monotonic() >= self._batch_unsupported_until
     
     def register_device(self, device_id: str, registration_code: str, expires_in: int = 3600) -> Optional[Dict[str, Any]]:
         """
@@ -30,14 +69,13 @@ class LumyAPIClient:
             dict with success, code, and expires_at
         """
         try:
-            response = self.session.post(
-                f'{self.base_url}/api/devices/register',
+            response = self.transport.request(
+                'register', 'POST', '/api/devices/register',
                 json={
                     'device_id': device_id,
                     'registration_code': registration_code,
                     'expires_in': expires_in
-                },
-                timeout=10
+                }
             )
             
             if response.status_code == 200:
@@ -48,29 +86,39 @@ class LumyAPIClient:
                 logger.error(f"Registration failed: {response.status_code} - {response.text}")
                 return None
                 
+        except CircuitOpenError as e:
+            logger.debug(str(e))
+            return None
         except Exception as e:
             logger.error(f"Error registering device: {e}")
             return None
     
-    def check_claim_status(self, device_id: str) -> Optional[Dict[str, Any]]:
+    def check_claim_status(self, device_id: str, wait: float = 0) -> Optional[Dict[str, Any]]:
         """
         Check if the device has been claimed by a user
         
         Args:
             device_id: Unique device identifier
+            wait: Seconds the dashboard may hold the request open until the
+                device is claimed (long-poll). Dashboards without long-poll
+                support answer immediately.
             
         Returns:
             dict with device info if claimed, None if not claimed
         """
+        self.claim_status = None
         try:
             # Check registration endpoint to see if device is claimed
-            response = self.session.get(
-                f'{self.base_url}/api/devices/{device_id}/registration',
-                timeout=10
+            params = {'wait': int(wait)} if wait > 0 else None
+            response = self.transport.request(
+                'registration', 'GET', f'/api/devices/{device_id}/registration',
+                params=params,
+                read_timeout=self.transport.read_timeout + wait
             )
             
             if response.status_code == 200:
                 data = response.json()
+                self.claim_status = bool(data.get('registered'))
                 if data.get('registered'):
                     logger.info(f"Device {device_id} has been claimed!")
                     return data
@@ -79,6 +127,9 @@ class LumyAPIClient:
                 logger.debug(f"Registration check: {response.status_code}")
                 return None
                 
+        except CircuitOpenError as e:
+            logger.debug(str(e))
+            return None
         except Exception as e:
             logger.error(f"Error checking claim status: {e}")
             return None
@@ -87,6 +138,9 @@ class LumyAPIClient:
         """
         Fetch device configuration and widgets
         
+        Sends If-None-Match with the last ETag; on 304 Not Modified the
+        previously fetched config is returned without downloading it again.
+        
         Args:
             device_id: Unique device identifier
             
@@ -94,24 +148,54 @@ class LumyAPIClient:
             dict with display config and widgets
         """
         try:
-            response = self.session.get(
-                f'{self.base_url}/api/devices/{device_id}/config',
-                timeout=10
-            )
+            headers = {}
+            cached = self._config_cache.get(device_id)
+            if cached and cached['etag']:
+                headers['If-None-Match'] = cached['etag']
             
-            if response.status_code == 200:
+            with span('api.config'):
+                response = self.transport.request('config', 'GET', f'/api/devices/{device_id}/config', headers=headers)
+            
+            if response.status_code == 304 and cached:
+                self.config_not_modified += 1
+                logger.debug(f"Config not modified for device {device_id}")
+                return cached['config']
+            elif response.status_code == 200:
                 config = response.json()
+                self._config_cache[device_id] = {
+                    'etag': response.headers.get('ETag'),
+                    'config': config
+                }
                 logger.info(f"Config fetched for device {device_id}")
                 return config
             else:
                 logger.error(f"Failed to fetch config: {response.status_code}")
                 return None
                 
+        except CircuitOpenError as e:
+            logger.debug(str(e))
+            return None
         except Exception as e:
             logger.error(f"Error fetching config: {e}")
             return None
     
-    def send_heartbeat(self, device_id: str, display_preview: Optional[str] = None, system_info: Optional[Dict[str, Any]] = None) -> bool:
+    def config_etag(self, device_id: str) -> Optional[str]:
+        """ETag of the last config fetched for the device, if any"""
+        cached = self._config_cache.get(device_id)
+        return cached['etag'] if cached else None
+    
+    def restore_config(self, device_id: str, config: Dict[str, Any], etag: Optional[str]):
+        """
+        Seed the config cache with a config saved before a restart
+        
+        The next get_config() then sends its ETag, and gets a 304 instead
+        of the full config if nothing changed.
+        """
+        if etag:
+            self._config_cache[device_id] = {'etag': etag, 'config': config}
+    
+    def send_heartbeat(self, device_id: str, display_preview: Optional[str] = None, system_info: Optional[Dict[str, Any]] = None,
+                       display_preview_hash: Optional[str] = None, widgets: Optional[Dict[str, Any]] = None) -> bool:
         """
         Send heartbeat to update last_seen timestamp, display preview, and system info
         
@@ -119,30 +203,112 @@ class LumyAPIClient:
             device_id: Unique device identifier
             display_preview: Base64 encoded display preview image (optional)
             system_info: Dictionary with system information (optional)
+            display_preview_hash: Hash of the displayed frame (optional). Sent
+                without display_preview, it tells the dashboard the preview
+                it already has is still current.
+            widgets: Per-widget status such as render stats (optional)
             
         Returns:
-            True if successful, False otherwise
+            True if successful, False otherwise. preview_required is set when
+            the dashboard asks for the full preview on the next heartbeat.
         """
         try:
             payload = {
                 'status': 'online',
                 'last_refresh': None,
-                'widgets': {},
+                'widgets': widgets or {},
                 'system': system_info or {}
             }
             
             # Add display preview if provided
             if display_preview:
                 payload['display_preview'] = display_preview
+            if display_preview_hash:
+                payload['display_preview_hash'] = display_preview_hash
             
-            response = self.session.post(
-                f'{self.base_url}/api/devices/{device_id}/status',
-                json=payload,
-                timeout=10
-            )
+            with span('api.heartbeat'):
+                response = self.transport.request('status', 'POST', f'/api/devices/{device_id}/status', json=payload)
             
-            return response.status_code == 200
+            if response.status_code != 200:
+                return False
             
+            try:
+                self.preview_required = bool(response.json().get('preview_required'))
+            except ValueError:
+                self.preview_required = False
+            return True
+            
+        except CircuitOpenError as e:
+            logger.debug(str(e))
+            return False
         except Exception as e:
             logger.error(f"Error sending heartbeat: {e}")
             return False
+    
+    def send_telemetry_batch(self, device_id: str, records: List[Dict[str, Any]], display_preview: Optional[str] = None,
+                             display_preview_hash: Optional[str] = None) -> bool:
+        """
+        Upload a batch of queued heartbeat samples as a gzip-compressed body
+        
+        Args:
+            device_id: Unique device identifier
+            records: Heartbeat samples, oldest first
+            display_preview: Base64 encoded display preview image (optional)
+            display_preview_hash: Hash of the displayed frame (optional)
+            
+        Returns:
+            True if the server accepted the batch. On failure, retry_after is
+            set from the server's Retry-After header if it sent one,
+            batch_rejected is set if resending the batch can't succeed, and
+            batch_supported is cleared for batch_recheck_interval if the
+            endpoint doesn't exist.
+        """
+        self.retry_after = None
+        self.batch_rejected = False
+        try:
+            payload = {'records': records}
+            if display_preview:
+                payload['display_preview'] = display_preview
+            if display_preview_hash:
+                payload['display_preview_hash'] = display_preview_hash
+            body = gzip.compress(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+            
+            # Retries are left to the uploader's backoff
+            response = self.transport.request(
+                'status_batch', 'POST', f'/api/devices/{device_id}/status/batch',
+                retries=0,
+                read_timeout=30,
+                data=body,
+                headers={'Content-Encoding': 'gzip'}
+            )
+            
+            # A missing route gets the dashboard's HTML not-found page; a JSON
+            # 404 comes from the route itself (e.g. an unknown device)
+            content_type = response.headers.get('Content-Type', '')
+            if response.status_code == 404 and 'json' not in content_type:
+                self._batch_unsupported_until = time.monotonic() + self.batch_recheck_interval
+                logger.warning(f"Dashboard has no telemetry batch endpoint, "
+                               f"using single heartbeats for {self.batch_recheck_interval:.0f}s")
+                return False
+            if response.status_code in BATCH_REJECTED_STATUSES:
+                self.batch_rejected = True
+                logger.error(f"Dashboard rejected telemetry batch: {response.status_code}")
+                return False
+            if response.status_code != 200:
+                self.retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                logger.error(f"Failed to upload telemetry batch: {response.status_code}")
+                return False
+            
+            try:
+                self.preview_required = bool(response.json().get('preview_required'))
+            except ValueError:
+                self.preview_required = False
+            logger.debug(f"Uploaded {len(records)} telemetry samples ({len(body)} bytes)")
+            return True
+            
+        except CircuitOpenError as e:
+            logger.debug(str(e))
+            return False
+        except Exception as e:
+            logger.error(f"Error uploading telemetry batch: {e}")
+            return False
@@ -0,0 +1,176 @@
+"""
+Async Runtime - Runs the device agent on an asyncio event loop
+Network calls run concurrently with timeouts; rendering and SPI transfers
+run on a dedicated display thread so a slow dashboard never delays the panel
+"""
+import asyncio
+import random
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+logger = logging.getLogger(__name__)
+
+class AsyncRuntime:
+    def __init__(self, agent, heartbeat_interval: float = 60, config_interval: float = 300,
+                 jitter: float = 5, network_timeout: float = 40, network_workers: int = 4):
+        """
+        Args:
+            agent: LumyAgent providing the task steps
+            heartbeat_interval: Seconds between heartbeats
+            config_interval: Seconds between config refreshes
+            jitter: Max random seconds added to network task deadlines
+            network_timeout: Seconds before a network call is abandoned
+            network_workers: Threads available for dashboard API calls
+        """
+        self.agent = agent
+        self.heartbeat_interval = heartbeat_interval
+        self.config_interval = config_interval
+        self.jitter = jitter
+        self.network_timeout = network_timeout
+        self.timeouts = 0
+        self._widget_tasks = {}
+        self._network_executor = ThreadPoolExecutor(max_workers=network_workers, thread_name_prefix='lumy-net')
+        # Each widget fetches on its own thread so a hung dashboard call, or
+        # a hung fetch for another widget, can't starve it
+        self._widget_executors = {}
+        # One worker: the panel can only do one thing at a time
+        self._display_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='lumy-display')
+
+    def run(self):
+        """Run until interrupted"""
+        try:
+            asyncio.run(self._main())
+        finally:
+            self._network_executor.shutdown(wait=False, cancel_futures=True)
+            for executor in self._widget_executors.values():
+                executor.shutdown(wait=False, cancel_futures=True)
+            self._display_executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _main(self):
+        refresh_now = await self._on_display(self.agent.show_initial_frame)
+
+        logger.info("Entering async main loop...")
+        self._stop = asyncio.Event()
+        # A saved config may be stale, so refresh it straight away
+        config_delay = 0 if self.agent.from_saved_state else None
+        tasks = [
+            asyncio.create_task(self._periodic('heartbeat', self._heartbeat, lambda: self.heartbeat_interval, jitter=self.jitter)),
+            asyncio.create_task(self._periodic('config', self._config, lambda: self.config_interval, delay=config_delay, jitter=self.jitter))
+        ]
+        if self.agent.from_saved_state:
+            tasks.append(asyncio.create_task(self._verify_claim()))
+        self._sync_widgets(refresh_now=refresh_now)
+        try:
+            # The periodic tasks run forever; only a lost claim ends the loop
+            await self._stop.wait()
+        finally:
+            tasks.extend(self._widget_tasks.values())
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _sync_widgets(self, delay=None, refresh_now=()):
+        """Start and stop widget loops to match the agent's layout"""
+        widget_ids = self.agent.widget_ids()
+        for widget_id in list(self._widget_tasks):
+            if widget_id not in widget_ids:
+                self._widget_tasks.pop(widget_id).cancel()
+                executor = self._widget_executors.pop(widget_id, None)
+                if executor:
+                    executor.shutdown(wait=False, cancel_futures=True)
+        for widget_id in widget_ids:
+            if widget_id not in self._widget_tasks:
+                first = 0 if widget_id in refresh_now else delay
+                get_interval = partial(self.agent.widget_task_interval, widget_id)
+                step = partial(self._widget, widget_id)
+                self._widget_tasks[widget_id] = asyncio.create_task(self._periodic(f'widget:{widget_id}', step, get_interval, delay=first))
+
+    async def _periodic(self, name, step, get_interval, delay=None, jitter=0):
+        """
+        Run a step on a fixed cadence
+
+        Deadlines advance from the previous deadline so runs don't drift;
+        if a step overruns, the missed runs coalesce into one.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (get_interval() if delay is None else delay)
+        while True:
+            due = deadline + (random.uniform(0, jitter) if jitter else 0)
+            await asyncio.sleep(max(0, due - loop.time()))
+            try:
+                await step()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Task '{name}' failed: {e}", exc_info=True)
+
+            interval = get_interval()
+            deadline += interval
+            now = loop.time()
+            if deadline <= now:
+                # Only whole intervals that passed unrun count as missed, not
+                # a run that was merely late (jitter, or a step that took
+                # about one interval)
+                skipped = int((now - deadline) // interval) if interval > 0 else 0
+                if skipped:
+                    logger.warning(f"Task '{name}' fell behind, coalescing {skipped} missed run(s)")
+                deadline = now
+
+    async def _heartbeat(self):
+        display_preview, preview_hash, system_info = await asyncio.to_thread(self.agent.build_heartbeat)
+        system_info['network_timeouts'] = self.timeouts
+        await self._on_network(self.agent.post_heartbeat, display_preview, preview_hash, system_info)
+
+    async def _widget(self, widget_id):
+        logger.info(f"Refreshing {widget_id}...")
+        executor = self._widget_executors.get(widget_id)
+        if executor is None:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f'lumy-widget-{widget_id}')
+            self._widget_executors[widget_id] = executor
+        data = await self._on_network(self.agent.get_widget_data, widget_id, executor=executor)
+        await self._on_display(self._show_widget, widget_id, data)
+
+    def _show_widget(self, widget_id, data):
+        if self.agent.show_widget(widget_id, data):
+            self.agent.show_frame()
+
+    async def _config(self):
+        logger.info("Refreshing configuration...")
+        new_config = await self._on_network(self.agent.api_client.get_config, self.agent.device_id)
+        # Applied on the display thread since it may rebuild the layout
+        if new_config and await self._on_display(self.agent.apply_config, new_config):
+            running = set(self._widget_tasks)
+            # New widgets start with an immediate refresh; only the ones
+            # already running need refreshing for the new config
+            self._sync_widgets(delay=0)
+            await asyncio.gather(*(self._widget(widget_id) for widget_id in self.agent.widget_ids() if widget_id in running))
+
+    async def _verify_claim(self):
+        """Check the claim saved before a fast boot until the dashboard confirms it"""
+        while not await self._on_network(self.agent.verify_claim):
+            if self.agent.claim_lost:
+                self._stop.set()
+                return
+            await asyncio.sleep(self.config_interval)
+
+    async def _on_network(self, func, *args, executor=None):
+        """
+        Run a blocking network call with a timeout
+
+        On timeout the call is abandoned (its thread finishes on its own
+        when the underlying request times out) and None is returned.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(executor or self._network_executor, partial(func, *args))
+        try:
+            return await asyncio.wait_for(future, self.network_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            logger.warning(f"{getattr(func, '__name__', func)} timed out after {self.network_timeout}s")
+            return None
+
+    async def _on_display(self, func, *args):
+        """Run rendering, packing and SPI work on the display thread"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._display_executor, partial(func, *args))
@@ -0,0 +1,73 @@
+"""
+Clock Widget for Lumy Display
+Shows the current time and date, sized to its region
+"""
+import logging
+from datetime import datetime
+from PIL import Image, ImageDraw
+from font_cache import get_font, FONT_REGULAR, FONT_BOLD
+
+logger = logging.getLogger(__name__)
+
+class ClockWidget:
+    # Widget registry metadata
+    widget_id = 'clock'
+    refresh_interval = 60  # the display only shows minutes
+    data_dependencies = ()
+    render_budget = None  # seconds; None uses the registry default
+
+    def __init__(self, width=800, height=480):
+        """
+        Args:
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+        """
+        self.width = width
+        self.height = height
+        # Canvas reused by every render
+        self._canvas = None
+
+    def get_data(self):
+        """Current time at minute resolution"""
+        now = datetime.now()
+        return {
+            'time': now.strftime('%H:%M'),
+            'date': now.strftime('%a %b %d')
+        }
+
+    def render(self, data=None):
+        """
+        Render the time with the date below it, centered
+
+        Args:
+            data: Optional data from get_data()
+
+        Returns:
+            PIL Image object
+        """
+        if data is None:
+            data = self.get_data()
+
+        if self._canvas is None:
+            self._canvas = Image.new('RGB', (self.width, self.height), 'white')
+        image = self._canvas
+        draw = ImageDraw.Draw(image)
+        draw.rectangle((0, 0, self.width, self.height), fill='white')
+
+        # Scale fonts to the tile: time takes about half the height
+        time_font = get_font(FONT_BOLD, max(12, int(self.height * 0.5)))
+        date_font = get_font(FONT_REGULAR, max(10, int(self.height * 0.18)))
+
+        time_bbox = draw.textbbox((0, 0), data['time'], font=time_font)
+        time_width = time_bbox[2] - time_bbox[0]
+        time_height = time_bbox[3] - time_bbox[1]
+        date_bbox = draw.textbbox((0, 0), data['date'], font=date_font)
+        date_width = date_bbox[2] - date_bbox[0]
+        date_height = date_bbox[3] - date_bbox[1]
+
+        gap = int(self.height * 0.06)
+        top = (self.height - time_height - gap - date_height) // 2
+        draw.text(((self.width - time_width) // 2, top - time_bbox[1]), data['time'], font=time_font, fill='black')
+        draw.text(((self.width - date_width) // 2, top + time_height + gap - date_bbox[1]), data['date'], font=date_font, fill=(60, 60, 60))
+
+        return image
@@ -0,0 +1,210 @@
+"""
+Compositor - Lays out widgets into regions of the display
+Each region keeps its last rendered tile; only widgets whose data changed
+are re-rendered, and the changed regions are reported as dirty
+"""
+import json
+import hashlib
+import logging
+from typing import Optional, Dict, Any, List, Tuple
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Widget shown full screen when no regions are configured
+PRIMARY_WIDGET = 'weather'
+
+class Region:
+    def __init__(self, widget_id: str, widget, box: Tuple[int, int, int, int]):
+        """
+        Args:
+            widget_id: Widget id from the config
+            widget: Widget instance sized to the region
+            box: (x, y, width, height) on the canvas
+        """
+        self.widget_id = widget_id
+        self.widget = widget
+        self.box = box
+        self.tile = None
+        self.data_hash = None
+        self.dirty = False
+
+    @property
+    def bounds(self):
+        """(left, top, right, bottom) of the region"""
+        x, y, width, height = self.box
+        return (x, y, x + width, y + height)
+
+    def overlaps(self, other) -> bool:
+        a, b = self.bounds, other.bounds
+        return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+def data_digest(data) -> Optional[str]:
+    """Stable hash of widget data, used to detect changes"""
+    if data is None:
+        return None
+    canonical = json.dumps(data, sort_keys=True, default=str)
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+def plan_layout(entries: List[Dict[str, Any]], width: int, height: int) -> List[Tuple[str, Tuple[int, int, int, int]]]:
+    """
+    Work out which widgets go where
+
+    Widgets are placed by a 'region': [x, y, width, height] in their
+    config, in config order (later widgets draw on top). With no regions
+    configured, the primary widget (or the first enabled one) fills the
+    display, as before widgets could share the screen.
+
+    Args:
+        entries: Enabled widget entries from the config
+        width: Display width
+        height: Display height
+
+    Returns:
+        List of (widget id, box)
+    """
+    placed = []
+    for entry in entries:
+        region = (entry.get('config') or {}).get('region')
+        if not region:
+            continue
+        try:
+            x, y, w, h = (int(v) for v in region)
+        except (TypeError, ValueError):
+            logger.warning(f"Invalid region for widget '{entry.get('id')}': {region}")
+            continue
+        # Clamp to the display
+        x, y = max(0, min(x, width - 1)), max(0, min(y, height - 1))
+        w, h = max(1, min(w, width - x)), max(1, min(h, height - y))
+        placed.append((entry['id'], (x, y, w, h)))
+
+    if placed:
+        unplaced = [entry['id'] for entry in entries if entry['id'] not in dict(placed)]
+        if unplaced:
+            logger.warning(f"Widgets without a region are not shown: {', '.join(unplaced)}")
+        return placed
+
+    if not entries:
+        return []
+    ids = [entry['id'] for entry in entries]
+    primary = PRIMARY_WIDGET if PRIMARY_WIDGET in ids else ids[0]
+    if len(ids) > 1:
+        logger.info(f"No widget regions configured, showing '{primary}' full screen")
+    return [(primary, (0, 0, width, height))]
+
+class Compositor:
+    def __init__(self, width: int = 800, height: int = 480, background='white'):
+        """
+        Args:
+            width: Display width
+            height: Display height
+            background: Fill for areas no region covers
+        """
+        self.width = width
+        self.height = height
+        self.background = background
+        self.regions = []
+        # Reused for every frame
+        self.canvas = Image.new('RGB', (width, height), background)
+        self.tiles_rendered = 0
+        self.tiles_reused = 0
+
+    def add(self, widget_id: str, widget, box: Tuple[int, int, int, int]) -> Region:
+        """Add a region; later regions draw on top of earlier ones"""
+        region = Region(widget_id, widget, box)
+        self.regions.append(region)
+        return region
+
+    def get(self, widget_id: str) -> Optional[Region]:
+        """Get the region showing a widget"""
+        for region in self.regions:
+            if region.widget_id == widget_id:
+                return region
+        return None
+
+    def get_widget(self, widget_id: str):
+        """Get the widget instance for an id, or None if not shown"""
+        region = self.get(widget_id)
+        return region.widget if region else None
+
+    def update(self, widget_id: str, data, render) -> bool:
+        """
+        Re-render a widget's tile if its data changed
+
+        Args:
+            widget_id: Widget to update
+            data: Latest widget data (None if unavailable)
+            render: Callable(widget, data) returning a PIL Image
+
+        Returns:
+            True if the region's tile changed
+        """
+        region = self.get(widget_id)
+        if region is None:
+            return False
+
+        if data is None and region.tile is not None:
+            # Keep showing the last good tile rather than an error screen
+            logger.warning(f"No data for widget '{widget_id}', keeping last tile")
+            return False
+
+        digest = data_digest(data)
+        if region.tile is not None and digest == region.data_hash:
+            self.tiles_reused += 1
+            return False
+
+        try:
+            tile = render(region.widget, data)
+        except Exception:
+            # Widgets draw into a reused canvas, which may now be half drawn
+            region.data_hash = None
+            raise
+        if tile is None:
+            return False
+        _, _, width, height = region.box
+        if tile.size != (width, height):
+            logger.warning(f"Widget '{widget_id}' rendered {tile.size[0]}x{tile.size[1]}, region is {width}x{height}")
+            tile = tile.crop((0, 0, width, height))
+
+        region.tile = tile
+        region.data_hash = digest
+        region.dirty = True
+        self.tiles_rendered += 1
+        return True
+
+    def invalidate(self, widget_id: Optional[str] = None):
+        """Force widgets (default: all) to re-render on their next update"""
+        for region in self.regions:
+            if widget_id is None or region.widget_id == widget_id:
+                region.data_hash = None
+
+    def compose(self):
+        """
+        Paste changed tiles onto the canvas
+
+        Regions drawn above a dirty region are repainted too so the
+        stacking order is kept.
+
+        Returns:
+            Tuple of (canvas image, list of dirty (x, y, width, height) boxes)
+        """
+        # Kept with their z-order (index in self.regions)
+        dirty = [(index, region) for index, region in enumerate(self.regions) if region.dirty]
+        if not dirty:
+            return self.canvas, []
+
+        for index, region in enumerate(self.regions):
+            below_dirty = any(other.overlaps(region) for other_index, other in dirty if other_index < index)
+            if region.tile is not None and (region.dirty or below_dirty):
+                self.canvas.paste(region.tile, region.bounds[:2])
+            region.dirty = False
+
+        return self.canvas, [region.box for _, region in dirty]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Tile render/reuse counters"""
+        return {
+            'regions': len(self.regions),
+            'tiles_rendered': self.tiles_rendered,
+            'tiles_reused': self.tiles_reused
+        }
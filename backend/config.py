@@ -17,11 +17,84 @@ if os.path.exists(env_file):
 API_BASE_URL = os.getenv('LUMY_API_URL', 'https://lumy-beta.vercel.app')
 API_KEY = os.getenv('LUMY_API_KEY', 'ZgIj4BaD25SyRVeQ9j0oh3ebpp0tQtgv')
 
+# HTTP Configuration
+HTTP_CONNECT_TIMEOUT = 5  # seconds to connect to the dashboard
+HTTP_READ_TIMEOUT = 15  # seconds to wait for a response
+HTTP_POOL_SIZE = 4  # kept-alive connections to the dashboard
+HTTP_RETRIES = 2  # retries for connection errors and 429/5xx responses
+HTTP_BACKOFF_BASE = 1  # seconds; retry delays double from here, with full jitter
+HTTP_BACKOFF_MAX = 8  # longest delay between retries within one call
+BREAKER_FAILURE_THRESHOLD = 5  # consecutive failures before an endpoint's circuit opens
+BREAKER_RESET_TIMEOUT = 60  # seconds an open circuit waits before a trial request
+BREAKER_MAX_RESET_TIMEOUT = 900  # cap for the open time, which doubles after failed trials
+
 # Device Configuration
 DEVICE_ID_FILE = '/etc/lumy/device_id'
+STATE_FILE = '/etc/lumy/state.json'  # claim status and last config, for fast boot
+BOOT_FRAME_FILE = '/etc/lumy/boot_frame.bin'  # packed buffer last shown on the panel
+STATE_MAX_BYTES = 256 * 1024  # larger configs aren't saved for fast boot
+# Boot a claimed device from saved state, checking with the dashboard in the background
+FAST_BOOT = os.getenv('LUMY_FAST_BOOT', '1') != '0'
 POLL_INTERVAL = 10  # seconds between polling for claim status
+POLL_MAX_INTERVAL = 300  # longest wait between claim polls while the dashboard is unreachable
+CLAIM_WAIT = int(os.getenv('LUMY_CLAIM_WAIT', '25'))  # seconds the dashboard may hold a claim poll open (0 = plain polling)
 CONFIG_REFRESH_INTERVAL = 300  # seconds between config refreshes (5 minutes)
+HEARTBEAT_INTERVAL = 60  # seconds between heartbeats
+SCHEDULER_JITTER = 5  # max random seconds added to network tasks so a fleet doesn't sync up
+
+# Runtime Configuration
+RUNTIME_MODE = os.getenv('LUMY_RUNTIME', 'sync')  # 'sync' (scheduler thread) or 'async' (asyncio)
+# Seconds an async network call may run before it is abandoned. Its thread
+# keeps running until the request itself times out, so this is kept above
+# the longest request: connect + read for Open-Meteo (WEATHER_TIMEOUT) and
+# for the dashboard, whose telemetry batch uploads read for up to 30s
+NETWORK_TIMEOUT = 40
+NETWORK_WORKERS = 4  # threads for blocking network I/O in the async runtime
+
+# Weather Configuration
+MIN_REFRESH_INTERVAL = 60  # lowest display refresh interval accepted from the device config
+WEATHER_CACHE_FILE = '/etc/lumy/weather_cache.json'
+WEATHER_TIMEOUT = 10  # seconds each to connect to and read from Open-Meteo
+# Seconds a cached response is fresh; kept under the refresh interval so
+# each scheduled refresh fetches new data
+WEATHER_CACHE_TTL = int(os.getenv('LUMY_WEATHER_CACHE_TTL', '540'))
+
+# Telemetry Configuration
+# 'live' uploads queued heartbeats every heartbeat, 'batch' every
+# TELEMETRY_FLUSH_INTERVAL (fewer, compressed requests), 'off' posts
+# single uncompressed heartbeats that are lost while offline
+TELEMETRY_MODE = os.getenv('LUMY_TELEMETRY', 'live')
+TELEMETRY_FLUSH_INTERVAL = int(os.getenv('LUMY_TELEMETRY_FLUSH_INTERVAL', '900'))  # seconds between batch uploads
+TELEMETRY_BATCH_SIZE = 60  # samples per upload request
+TELEMETRY_QUEUE_FILE = '/etc/lumy/telemetry.jsonl'
+TELEMETRY_MAX_RECORDS = 1440  # samples kept while offline (a day of heartbeats)
+TELEMETRY_RETRY_INTERVAL = 30  # seconds before the first retry after a failed upload
+TELEMETRY_MAX_BACKOFF = 900  # longest wait between upload retries
+TELEMETRY_BATCH_RECHECK = 3600  # seconds before retrying batches on a dashboard without the endpoint
+
+# Metrics Configuration
+# Optional file the Prometheus text export is written to on each heartbeat
+METRICS_FILE = os.getenv('LUMY_METRICS_FILE')
+
+# Widget Configuration
+WIDGET_RENDER_BUDGET = 2.0  # seconds a widget render may take before its refresh is backed off
 
 # Display Configuration
+DISPLAY_BACKEND = os.getenv('LUMY_DISPLAY', 'epd')  # 'epd' (Waveshare panel) or 'virtual' (no hardware)
 DISPLAY_WIDTH = 800
 DISPLAY_HEIGHT = 480
+PREVIEW_MAX_WIDTH = 400  # dashboard preview width in pixels
+PREVIEW_FORMAT = os.getenv('LUMY_PREVIEW_FORMAT', 'png')  # 'png' (palette) or 'webp'
+PREVIEW_QUALITY = 60  # WebP quality
+PREVIEW_MAX_BYTES = 48 * 1024  # size budget for an encoded preview
+# Minimum seconds between panel refreshes; frames queued in between are coalesced
+DISPLAY_MIN_INTERVAL = int(os.getenv('LUMY_DISPLAY_MIN_INTERVAL', '60'))
+DISPLAY_MAX_DUTY = 0.5  # largest fraction of time the panel may spend refreshing
+DISPLAY_STOP_TIMEOUT = 60  # seconds to wait for a refresh in progress on shutdown
+DISPLAY_DITHER = os.getenv('LUMY_DISPLAY_DITHER', '1') != '0'  # Floyd-Steinberg dithering when packing frames
+
+# Virtual Display Configuration (LUMY_DISPLAY=virtual)
+VIRTUAL_DISPLAY_DIR = os.getenv('LUMY_VIRTUAL_DISPLAY_DIR', '/tmp/lumy-display')
+VIRTUAL_DISPLAY_FORMAT = os.getenv('LUMY_VIRTUAL_DISPLAY_FORMAT', 'png')  # 'png', 'raw' or 'none'
+VIRTUAL_DISPLAY_LATENCY = float(os.getenv('LUMY_VIRTUAL_DISPLAY_LATENCY', '12'))  # simulated refresh seconds
+VIRTUAL_DISPLAY_KEEP_FRAMES = os.getenv('LUMY_VIRTUAL_DISPLAY_KEEP_FRAMES', '0') != '0'  # number frames instead of overwriting
@@ -5,8 +5,12 @@ Waveshare 7.3inch e-Paper HAT (E) - 800x480
 import sys
 import os
 import time
-from PIL import Image, ImageDraw, ImageFont
+import hashlib
+from PIL import ImageDraw
 import logging
+from font_cache import get_font, FONT_REGULAR, FONT_BOLD, FONT_MONO_BOLD
+import frame_packer
+from metrics import span
 
 # Add waveshare library path
 lib_path = os.path.join(os.path.dirname(__file__), 'lib')
@@ -17,16 +21,34 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class DisplayManager:
-    def __init__(self):
-        """Initialize the e-paper display"""
+    def __init__(self, dither=True, epd=None):
+        """
+        Initialize the e-paper display
+        
+        Args:
+            dither (bool): Dither images when mapping to the panel palette
+            epd: Panel driver to use instead of the Waveshare epd7in3e
+                (e.g. a virtual_epd.EPD for running off-device)
+        """
         self.width = 800
         self.height = 480
+        self.dither = dither
         self.epd = None
         
+        # Frame dedup state: hash of the buffer currently on the panel
+        self._last_frame_hash = None
+        # Packed buffer currently on the panel (None if unknown)
+        self.last_buffer = None
+        self.refreshes_performed = 0
+        self.refreshes_skipped = 0
+        self.last_dirty_regions = None
+        
         try:
-            # Import Waveshare library
-            from waveshare_epd import epd7in3e
-            self.epd = epd7in3e.EPD()
+            if epd is None:
+                # Import Waveshare library
+                from waveshare_epd import epd7in3e
+                epd = epd7in3e.EPD()
+            self.epd = epd
             logger.info("Initializing e-paper display...")
             self.epd.init()
             logger.info("Display initialized successfully")
@@ -41,8 +63,99 @@ class DisplayManager:
         if self.epd:
             logger.info("Clearing display...")
             self.epd.Clear()
+            self._last_frame_hash = None
+            self.last_buffer = None
             logger.info("Display cleared")
     
+    def show_image(self, image, force=False, dirty_regions=None):
+        """
+        Display an image, skipping the refresh if it is already on screen
+        
+        The image is packed into the panel buffer and hashed. When the hash
+        matches the frame currently displayed, the SPI transfer and refresh
+        are skipped entirely.
+        
+        Args:
+            image: PIL Image to display
+            force: Refresh even if the frame is unchanged
+            dirty_regions: Optional list of (x, y, width, height) boxes that
+                changed since the last frame. An empty list means nothing
+                changed, so packing and hashing are skipped too.
+            
+        Returns:
+            True if the panel was refreshed, False if skipped or failed
+        """
+        if not self.epd:
+            logger.error("Display not initialized")
+            return False
+        
+        if dirty_regions is not None:
+            self.last_dirty_regions = list(dirty_regions)
+            if not dirty_regions and not force and self._last_frame_hash:
+                self.refreshes_skipped += 1
+                return False
+        
+        with span('display.pack'):
+            buffer = self.pack_frame(image)
+        frame_hash = hashlib.sha1(bytes(buffer)).hexdigest()
+        
+        if not force and frame_hash == self._last_frame_hash:
+            self.refreshes_skipped += 1
+            logger.info("Frame unchanged, skipping display refresh")
+            return False
+        
+        with span('display.refresh'):
+            self.epd.display(buffer)
+        self._last_frame_hash = frame_hash
+        self.last_buffer = buffer
+        self.refreshes_performed += 1
+        return True
+    
+    def pack_frame(self, image):
+        """
+        Pack an image into the panel's 4-bit buffer
+        
+        Uses the vectorized NumPy packer when available, which is
+        byte-identical to the driver's getbuffer() but much faster.
+        
+        Args:
+            image: PIL Image to pack
+            
+        Returns:
+            Packed buffer for epd.display()
+        """
+        if frame_packer.is_available():
+            return frame_packer.pack_image(image, self.width, self.height, self.dither)
+        return self.epd.getbuffer(image)
+    
+    def assume_frame(self, frame_hash, buffer=None):
+        """
+        Record that the panel already shows a frame without refreshing it
+        
+        e-paper keeps its image without power, so after a restart the
+        frame shown last is still on the panel and needn't be redrawn.
+        
+        Args:
+            frame_hash: Hash of the packed frame on the panel
+            buffer: The packed frame itself, if known
+        """
+        self._last_frame_hash = frame_hash
+        self.last_buffer = buffer
+    
+    @property
+    def frame_hash(self):
+        """Hash of the packed frame currently on the panel (None if unknown)"""
+        return self._last_frame_hash
+    
+    def get_refresh_stats(self):
+        """Return counters for performed and skipped refreshes"""
+        return {
+            'refreshes_performed': self.refreshes_performed,
+            'refreshes_skipped': self.refreshes_skipped,
+            'dirty_regions': len(self.last_dirty_regions) if self.last_dirty_regions is not None else None,
+            'frame_hash': self._last_frame_hash
+        }
+    
     def show_welcome_screen(self, registration_code):
         """
         Display the Lumy welcome screen with registration code
@@ -54,22 +167,32 @@ class DisplayManager:
             logger.error("Display not initialized")
             return
         
-        # Create a blank white image
-        image = Image.new('RGB', (self.width, self.height), 'white')
+        image = self.render_welcome_screen(registration_code)
+        
+        # Display the image
+        logger.info("Displaying welcome screen...")
+        self.show_image(image)
+        logger.info("Welcome screen displayed")
+    
+    def render_welcome_screen(self, registration_code):
+        """
+        Build the welcome screen image (no display I/O)
+        
+        Args:
+            registration_code (str): The device registration code
+            
+        Returns:
+            PIL Image object
+        """
+        # Black and white only, so draw straight in panel colours
+        image = frame_packer.new_image(self.width, self.height, 'white')
         draw = ImageDraw.Draw(image)
         
-        # Try to load fonts, fall back to default if not available
-        try:
-            title_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 80)
-            subtitle_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 40)
-            code_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSansMono-Bold.ttf', 100)
-            instruction_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 30)
-        except Exception as e:
-            logger.warning(f"Could not load fonts: {e}, using default")
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-            code_font = ImageFont.load_default()
-            instruction_font = ImageFont.load_default()
+        # Load fonts from the shared cache (falls back to default if missing)
+        title_font = get_font(FONT_BOLD, 80)
+        subtitle_font = get_font(FONT_REGULAR, 40)
+        code_font = get_font(FONT_MONO_BOLD, 100)
+        instruction_font = get_font(FONT_REGULAR, 30)
         
         # Draw "Welcome to Lumy" title centered at top
         title_text = "Welcome to Lumy"
@@ -119,10 +242,7 @@ class DisplayManager:
         instruction_x2 = (self.width - instruction_width2) // 2
         draw.text((instruction_x2, 420), instruction_text2, font=instruction_font, fill='black')
         
-        # Display the image
-        logger.info("Displaying welcome screen...")
-        self.epd.display(self.epd.getbuffer(image))
-        logger.info("Welcome screen displayed")
+        return image
     
     def sleep(self):
         """Put the display to sleep to save power"""
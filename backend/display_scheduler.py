@@ -0,0 +1,279 @@
+"""
+Display Scheduler - Queues frames for the panel on a background worker
+Frames submitted while a refresh is running are coalesced into the latest
+one, and refreshes are rate-limited by interval and measured refresh cost.
+Queued frames are copied into reused images, so steady-state submits don't
+allocate a new full-size frame. A frame that fails to reach the panel stays
+queued and is retried after the refresh interval.
+"""
+import time
+import threading
+import logging
+from typing import Optional, Dict, Any, Callable
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class DisplayScheduler:
+    def __init__(self, display, min_interval: float = 60, max_duty: float = 0.5,
+                 on_refresh: Optional[Callable] = None):
+        """
+        Args:
+            display: DisplayManager doing the packing and SPI transfer
+            min_interval: Minimum seconds between the starts of two refreshes
+            max_duty: Largest fraction of time the panel may spend refreshing;
+                slow refreshes stretch the interval to stay under it
+            on_refresh: Called on the worker as on_refresh(buffer, frame_hash)
+                with the packed buffer after each refresh, e.g. to persist it
+        """
+        self.display = display
+        self.min_interval = min_interval
+        self.max_duty = max_duty
+        self.on_refresh = on_refresh
+
+        self._cond = threading.Condition()
+        self._pending = None
+        self._busy = False
+        self._running = False
+        self._thread = None
+        self._last_start = None
+
+        # Packed buffer actually on the panel and its hash, for previews
+        self.current_buffer = None
+        self.current_hash = None
+        # Image the worker finished with, reused for the next queued frame
+        self._spare = None
+
+        # Metrics
+        self.requests = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.skipped = 0
+        self.failures = 0
+        self.last_duration = None
+        self.max_duration = 0.0
+        self.avg_duration = None
+        self.last_wait = None
+
+    def start(self):
+        """Start the background worker"""
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        self._thread = threading.Thread(target=self._worker, name='lumy-display-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stop the worker, letting a refresh in progress finish
+
+        Frames still queued are dropped.
+        """
+        with self._cond:
+            self._running = False
+            self._pending = None
+            self._cond.notify_all()
+        if self._thread:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def submit(self, image, dirty_regions=None, force=False) -> bool:
+        """
+        Queue a frame for display without blocking
+
+        If a frame is already waiting it is replaced; only the latest
+        frame is ever shown. The image is copied (into the waiting frame or
+        a spare one when possible), so the caller may keep drawing on it.
+
+        Args:
+            image: PIL Image to display
+            dirty_regions: Boxes that changed since the last frame
+            force: Refresh even if the frame is unchanged
+
+        Returns:
+            True if the frame was queued
+        """
+        if dirty_regions is not None and not dirty_regions and not force:
+            return False
+
+        submitted = time.monotonic()
+        with self._cond:
+            self.requests += 1
+            target = None
+            if self._pending is not None:
+                self.coalesced += 1
+                # Merge so a forced frame or changed regions aren't lost
+                target, pending_regions, pending_force, submitted = self._pending
+                if dirty_regions is not None and pending_regions is not None:
+                    dirty_regions = list(pending_regions) + [box for box in dirty_regions if box not in pending_regions]
+                else:
+                    dirty_regions = None
+                force = force or pending_force
+            self._pending = (self._copy_frame(image, target), dirty_regions, force, submitted)
+            self._cond.notify_all()
+
+        if not self._running:
+            logger.warning("Display scheduler not started, frame will wait")
+        return True
+
+    def restore_frame(self, frame_hash, buffer=None):
+        """
+        Adopt a frame the panel still shows from before a restart
+
+        It becomes the current frame (for previews) and an identical
+        frame submitted later won't refresh the panel.
+        """
+        with self._cond:
+            self.current_buffer = buffer
+            self.current_hash = frame_hash
+        self.display.assume_frame(frame_hash, buffer)
+
+    def current_frame(self):
+        """
+        Returns:
+            Tuple of (packed buffer on the panel, its frame hash), both None
+            before the first refresh
+        """
+        with self._cond:
+            return self.current_buffer, self.current_hash
+
+    def next_refresh_at(self) -> Optional[float]:
+        """Monotonic time the next refresh may start (None if no limit applies)"""
+        if self._last_start is None:
+            return None
+        interval = self.min_interval
+        if self.avg_duration and self.max_duty:
+            # Don't keep the panel busy more than max_duty of the time
+            interval = max(interval, self.avg_duration / self.max_duty)
+        return self._last_start + interval
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until nothing is queued or refreshing
+
+        Returns:
+            True if idle, False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending is not None or self._busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._running:
+                    if self._pending is not None:
+                        ready_at = self.next_refresh_at()
+                        wait = 0 if ready_at is None else ready_at - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._cond.wait(wait)
+                    else:
+                        self._cond.wait()
+                if not self._running:
+                    return
+                image, dirty_regions, force, submitted = self._pending
+                self._pending = None
+                self._busy = True
+
+            start = time.monotonic()
+            metrics.observe('display.queue_wait', start - submitted)
+            failed = False
+            try:
+                refreshed = self.display.show_image(image, force=force, dirty_regions=dirty_regions)
+            except Exception as e:
+                refreshed = False
+                failed = True
+                self.failures += 1
+                logger.error(f"Display refresh failed, will retry: {e}", exc_info=True)
+            duration = time.monotonic() - start
+
+            if refreshed and self.on_refresh:
+                try:
+                    self.on_refresh(self.display.last_buffer, self.display.frame_hash)
+                except Exception as e:
+                    logger.error(f"Display refresh callback failed: {e}")
+
+            with self._cond:
+                self._busy = False
+                self.last_wait = round(start - submitted, 3)
+                if failed:
+                    self._requeue(image, force, start)
+                else:
+                    self._spare = image
+                if refreshed:
+                    self._record_refresh(start, duration)
+                    self.current_buffer = self.display.last_buffer
+                    self.current_hash = self.display.frame_hash
+                elif not failed:
+                    self.skipped += 1
+                self._cond.notify_all()
+
+    def _requeue(self, image, force, start):
+        """
+        Put back a frame that never reached the panel (lock held)
+
+        A frame submitted meanwhile replaces it, keeping its force flag.
+        Either way the panel no longer matches the dirty regions, so the
+        retry packs the whole frame. The failed attempt counts as a refresh
+        start, so retries are spaced by the usual interval.
+        """
+        self._last_start = start
+        if self._pending is None:
+            self._pending = (image, None, force, time.monotonic())
+        else:
+            pending_image, _, pending_force, submitted = self._pending
+            self._pending = (pending_image, None, force or pending_force, submitted)
+            self._spare = image
+
+    def _copy_frame(self, image, target=None):
+        """
+        Copy a submitted image for the worker (lock held)
+
+        The waiting frame (target) or the worker's spare is overwritten
+        when it has the same mode and size; otherwise a copy is made.
+        """
+        if target is None or target.mode != image.mode or target.size != image.size:
+            target = self._spare
+            self._spare = None
+        if target is None or target.mode != image.mode or target.size != image.size:
+            return image.copy()
+        target.paste(image, (0, 0))
+        if image.mode == 'P':
+            target.putpalette(image.getpalette())
+        return target
+
+    def _record_refresh(self, start, duration):
+        self._last_start = start
+        self.refreshes += 1
+        self.last_duration = duration
+        self.max_duration = max(self.max_duration, duration)
+        # Moving average of refresh cost
+        if self.avg_duration is None:
+            self.avg_duration = duration
+        else:
+            self.avg_duration = 0.8 * self.avg_duration + 0.2 * duration
+        logger.info(f"Display refreshed in {duration:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Queue and refresh-duration metrics for the heartbeat"""
+        with self._cond:
+            return {
+                'queue_depth': 1 if self._pending is not None else 0,
+                'busy': self._busy,
+                'requests': self.requests,
+                'coalesced': self.coalesced,
+                'refreshes': self.refreshes,
+                'skipped': self.skipped,
+                'failures': self.failures,
+                'last_duration_s': round(self.last_duration, 2) if self.last_duration is not None else None,
+                'avg_duration_s': round(self.avg_duration, 2) if self.avg_duration is not None else None,
+                'max_duration_s': round(self.max_duration, 2),
+                'last_wait_s': self.last_wait
+            }
@@ -0,0 +1,89 @@
+"""
+Font Cache - Process-wide registry of loaded TrueType fonts
+Fonts are parsed once per (path, size) and shared by every renderer
+"""
+import threading
+import logging
+from collections import OrderedDict
+from PIL import ImageFont
+
+logger = logging.getLogger(__name__)
+
+FONT_DIR = '/usr/share/fonts/truetype/dejavu'
+FONT_REGULAR = f'{FONT_DIR}/DejaVuSans.ttf'
+FONT_BOLD = f'{FONT_DIR}/DejaVuSans-Bold.ttf'
+FONT_MONO_BOLD = f'{FONT_DIR}/DejaVuSansMono-Bold.ttf'
+
+class FontCache:
+    def __init__(self, max_size: int = 32):
+        """
+        Create an LRU cache of fonts
+
+        Args:
+            max_size: Maximum number of (path, size) entries kept loaded
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._fonts = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, path: str, size: int):
+        """
+        Get a font, loading it on first use
+
+        Fonts that fail to load are cached as PIL's default font so a
+        missing file is only probed once.
+
+        Args:
+            path: Path to a TrueType font file
+            size: Font size in pixels
+
+        Returns:
+            PIL ImageFont object
+        """
+        key = (path, size)
+        with self._lock:
+            font = self._fonts.get(key)
+            if font is not None:
+                self._fonts.move_to_end(key)
+                self.hits += 1
+                return font
+            self.misses += 1
+
+        try:
+            font = ImageFont.truetype(path, size)
+        except Exception as e:
+            logger.warning(f"Could not load font {path} ({size}px): {e}, using default")
+            font = ImageFont.load_default()
+
+        with self._lock:
+            self._fonts[key] = font
+            self._fonts.move_to_end(key)
+            while len(self._fonts) > self.max_size:
+                self._fonts.popitem(last=False)
+        return font
+
+    def clear(self):
+        """Drop all loaded fonts and reset counters"""
+        with self._lock:
+            self._fonts.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict:
+        """Return cache size and hit/miss counters"""
+        with self._lock:
+            return {
+                'size': len(self._fonts),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses
+            }
+
+# Shared instance used by all renderers
+font_cache = FontCache()
+
+def get_font(path: str, size: int):
+    """Get a font from the shared process-wide cache"""
+    return font_cache.get(path, size)
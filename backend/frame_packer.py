@@ -0,0 +1,228 @@
+"""
+Frame Packer - Vectorized palette mapping and buffer packing
+Produces the same 4-bit packed buffer as epd7in3e.getbuffer() using NumPy
+"""
+import logging
+from PIL import Image, ImageColor
+
+# NumPy is imported on first use (see is_available), keeping it off the boot path
+np = None
+_numpy_checked = False
+
+logger = logging.getLogger(__name__)
+
+# Panel palette, in the same index order the Waveshare driver uses.
+# Index 4 is unused by the panel and duplicates black.
+PALETTE = (
+    (0, 0, 0),        # 0 black
+    (255, 255, 255),  # 1 white
+    (255, 255, 0),    # 2 yellow
+    (255, 0, 0),      # 3 red
+    (0, 0, 0),        # 4 unused
+    (0, 0, 255),      # 5 blue
+    (0, 255, 0),      # 6 green
+)
+
+_palette_image = None
+
+def is_available():
+    """
+    Return True if NumPy is installed and the fast path can be used
+
+    The first call imports NumPy; call this before the packing functions.
+    """
+    global np, _numpy_checked
+    if not _numpy_checked:
+        try:
+            import numpy
+            np = numpy
+        except ImportError:
+            np = None
+        _numpy_checked = True
+    return np is not None
+
+def get_palette_image():
+    """Get the (cached) 'P' mode image holding the panel palette"""
+    global _palette_image
+    if _palette_image is None:
+        flat = tuple(c for color in PALETTE for c in color)
+        _palette_image = Image.new('P', (1, 1))
+        _palette_image.putpalette(flat + (0, 0, 0) * (256 - len(PALETTE)))
+    return _palette_image
+
+def new_image(width=800, height=480, color='white'):
+    """
+    Create a 'P' mode canvas using the panel palette
+
+    For screens drawn only in panel colours. It takes a third of the
+    memory of an RGB canvas, and packing it needs no palette mapping or
+    dithering. Text drawn on it is not anti-aliased.
+    """
+    image = Image.new('P', (width, height), PALETTE.index(ImageColor.getrgb(color)))
+    image.putpalette(get_palette_image().getpalette())
+    return image
+
+def is_panel_image(image):
+    """Return True for 'P' mode images using the panel palette (see new_image)"""
+    if image.mode != 'P':
+        return False
+    palette = image.getpalette()
+    return palette is not None and palette[:3 * len(PALETTE)] == [c for color in PALETTE for c in color]
+
+def orient(image, width=800, height=480):
+    """Rotate portrait images to the panel orientation, like the driver does"""
+    if image.size == (height, width):
+        return image.rotate(90, expand=True)
+    if image.size != (width, height):
+        logger.warning(f"Invalid image dimensions: {image.size[0]} x {image.size[1]}, expected {width} x {height}")
+    return image
+
+def map_to_palette(image, dither=True):
+    """
+    Map an RGB image to panel palette indices
+
+    Args:
+        image: PIL Image in panel orientation
+        dither: Apply Floyd-Steinberg dithering (matches the driver).
+            Without dithering each pixel maps to its exact nearest colour.
+
+    Returns:
+        2D uint8 NumPy array of palette indices
+    """
+    if is_panel_image(image):
+        # Already panel indices: nothing to map or dither
+        return np.asarray(image, dtype=np.uint8)
+
+    # convert() copies even when the mode already matches
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    if dither:
+        # Error diffusion is inherently sequential, so let PIL's C
+        # implementation do it; this is exactly what the driver does.
+        indexed = image.quantize(palette=get_palette_image())
+        return np.asarray(indexed, dtype=np.uint8)
+
+    rgb = np.asarray(image, dtype=np.int32)
+    r, g, b = rgb[..., 0], rgb[..., 1], rgb[..., 2]
+    best_index = np.zeros(r.shape, dtype=np.uint8)
+    best_dist = None
+    for index, (pr, pg, pb) in enumerate(PALETTE):
+        dist = (r - pr) ** 2 + (g - pg) ** 2 + (b - pb) ** 2
+        if best_dist is None:
+            best_dist = dist
+            continue
+        closer = dist < best_dist
+        best_index[closer] = index
+        np.minimum(best_dist, dist, out=best_dist)
+    return best_index
+
+def pack_indices(indices):
+    """
+    Pack palette indices two pixels per byte (high nibble first)
+
+    Args:
+        indices: uint8 NumPy array of palette indices
+
+    Returns:
+        bytearray ready to send to the panel
+    """
+    flat = indices.reshape(-1)
+    # In place after the first shift, so only one half-size array is made
+    packed = flat[0::2] << 4
+    packed |= flat[1::2]
+    return bytearray(packed)
+
+def unpack_indices(buffer, width=800, height=480):
+    """
+    Unpack a panel buffer into palette indices (inverse of pack_indices)
+
+    Args:
+        buffer: Packed buffer as sent to the panel
+        width: Panel width in pixels
+        height: Panel height in pixels
+
+    Returns:
+        2D uint8 NumPy array of palette indices
+    """
+    packed = np.frombuffer(buffer, dtype=np.uint8)
+    indices = np.empty(packed.size * 2, dtype=np.uint8)
+    indices[0::2] = packed >> 4
+    indices[1::2] = packed & 0x0F
+    return indices.reshape(height, width)
+
+def buffer_to_image(buffer, width=800, height=480):
+    """
+    Decode a packed 4-bit panel buffer into a palette image
+
+    Args:
+        buffer: Packed buffer as sent to the panel
+        width: Panel width in pixels
+        height: Panel height in pixels
+
+    Returns:
+        PIL 'P' mode Image using the panel palette
+    """
+    data = bytes(buffer)
+    if is_available():
+        pixels = unpack_indices(data, width, height).tobytes()
+    else:
+        pixels = bytes(nibble for byte in data for nibble in (byte >> 4, byte & 0x0F))
+
+    image = Image.frombytes('P', (width, height), pixels)
+    image.putpalette(get_palette_image().getpalette())
+    return image
+
+def downscale_packed(buffer, width=800, height=480, factor=2):
+    """
+    Box-filter a packed panel buffer down to an RGB array
+
+    Each output pixel averages the panel colours of a factor x factor
+    block, so only reduced-size arrays are allocated. Halving, the common
+    case, reads pixel pairs straight from the packed bytes.
+
+    Args:
+        buffer: Packed buffer as sent to the panel
+        width: Panel width in pixels
+        height: Panel height in pixels
+        factor: Integer reduction factor
+
+    Returns:
+        (height // factor, width // factor, 3) uint8 NumPy array
+    """
+    colors = np.zeros((16, 3), dtype=np.uint16)
+    colors[:len(PALETTE)] = PALETTE
+    if factor == 2 and height % 2 == 0:
+        # Each byte holds two horizontally adjacent pixels
+        pairs = colors[np.arange(256) >> 4] + colors[np.arange(256) & 0x0F]
+        rows = np.frombuffer(buffer, dtype=np.uint8).reshape(height, width // 2)
+        total = pairs[rows[0::2]]
+        total += pairs[rows[1::2]]
+        total >>= 2
+        return total.astype(np.uint8)
+
+    indices = unpack_indices(buffer, width, height)
+    height = height // factor * factor
+    width = width // factor * factor
+    total = np.zeros((height // factor, width // factor, 3), dtype=np.uint16)
+    for dy in range(factor):
+        for dx in range(factor):
+            total += colors[indices[dy:height:factor, dx:width:factor]]
+    total //= factor * factor
+    return total.astype(np.uint8)
+
+def pack_image(image, width=800, height=480, dither=True):
+    """
+    Convert an image to the panel's packed 4-bit buffer
+
+    Args:
+        image: PIL Image (800x480 or 480x800)
+        width: Panel width in pixels
+        height: Panel height in pixels
+        dither: Apply Floyd-Steinberg dithering
+
+    Returns:
+        bytearray byte-identical to epd7in3e.getbuffer()
+    """
+    image = orient(image, width, height)
+    return pack_indices(map_to_palette(image, dither))
@@ -0,0 +1,275 @@
+"""
+HTTP Transport - Pooled, retrying HTTP layer for the dashboard API
+Retries use exponential backoff with full jitter, and a circuit breaker per
+endpoint stops sending requests while that endpoint keeps failing
+"""
+import time
+import random
+import socket
+import threading
+import logging
+from typing import Optional, Dict, Any
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: the server is overloaded or restarting
+RETRY_STATUSES = (429, 502, 503, 504)
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """
+    Exponential backoff with full jitter
+
+    Args:
+        attempt: Retry number, starting at 1
+        base: Delay ceiling for the first retry
+        cap: Largest delay ceiling
+
+    Returns:
+        Random delay between 0 and min(cap, base * 2^(attempt - 1)) seconds
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds (HTTP dates are ignored)"""
+    try:
+        return max(0.0, float(value)) if value else None
+    except ValueError:
+        return None
+
+class CircuitOpenError(Exception):
+    """Raised instead of sending a request while an endpoint's circuit is open"""
+
+class CircuitBreaker:
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 60, max_reset_timeout: float = 900):
+        """
+        Args:
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before one trial request
+            max_reset_timeout: Cap for the open time, which doubles each
+                time a trial request fails
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._open_for = reset_timeout
+        self._retry_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """Return True if a request may be sent now"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() >= self._retry_at:
+                # Let one trial request through
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info("Circuit closed, endpoint recovered")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._open_for = self.reset_timeout
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN:
+                # Trial failed: stay open for longer
+                self._open_for = min(self.max_reset_timeout, self._open_for * 2)
+                self._open()
+            elif self.state == self.CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self.opened += 1
+        # Jitter so a fleet doesn't retry in lockstep after an outage
+        self._retry_at = time.monotonic() + self._open_for * random.uniform(0.8, 1.2)
+
+    def retry_in(self) -> float:
+        """Seconds until the next trial request is allowed (0 if closed)"""
+        with self._lock:
+            if self.state != self.OPEN:
+                return 0.0
+            return max(0.0, self._retry_at - time.monotonic())
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'state': self.state,
+                'failures': self.failures,
+                'opened': self.opened,
+                'rejected': self.rejected
+            }
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter whose pooled sockets use TCP keepalive, so dead connections are noticed"""
+
+    def __init__(self, keepalive_idle: int = 60, **kwargs):
+        self.keepalive_idle = keepalive_idle
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        options = list(HTTPConnection.default_socket_options) + [(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)]
+        # Linux-only tuning; other platforms keep the OS defaults
+        if hasattr(socket, 'TCP_KEEPIDLE'):
+            options += [
+                (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, self.keepalive_idle),
+                (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, 15),
+                (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 4)
+            ]
+        kwargs['socket_options'] = options
+        super().init_poolmanager(*args, **kwargs)
+
+class HTTPTransport:
+    def __init__(self, base_url: str, headers: Optional[Dict[str, str]] = None,
+                 connect_timeout: float = 5, read_timeout: float = 15, pool_size: int = 4,
+                 retries: int = 2, backoff_base: float = 1, backoff_max: float = 8,
+                 failure_threshold: int = 5, reset_timeout: float = 60, max_reset_timeout: float = 900):
+        """
+        Args:
+            base_url: Dashboard URL requests are relative to
+            headers: Headers sent with every request
+            connect_timeout: Seconds to establish a connection
+            read_timeout: Seconds to wait for the response
+            pool_size: Kept-alive connections to the dashboard
+            retries: Retries after a connection error or retryable status
+            backoff_base: Delay ceiling for the first retry
+            backoff_max: Largest delay between retries
+            failure_threshold: Consecutive failures that open an endpoint's circuit
+            reset_timeout: Seconds an open circuit waits before a trial request
+            max_reset_timeout: Longest an open circuit waits
+        """
+        self.base_url = base_url.rstrip('/')
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or {})
+        # Retries are handled here, not by urllib3, so they go through the breaker
+        adapter = KeepAliveAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.retries_made = 0
+
+    def breaker(self, endpoint: str) -> CircuitBreaker:
+        """Get the circuit breaker for an endpoint"""
+        with self._lock:
+            breaker = self._breakers.get(endpoint)
+            if breaker is None:
+                breaker = self._breakers[endpoint] = CircuitBreaker(
+                    self.failure_threshold, self.reset_timeout, self.max_reset_timeout)
+            return breaker
+
+    def is_available(self, endpoint: str) -> bool:
+        """Return True unless the endpoint's circuit is open"""
+        return self.breaker(endpoint).retry_in() == 0
+
+    def request(self, endpoint: str, method: str, path: str, retries: Optional[int] = None,
+                read_timeout: Optional[float] = None, **kwargs) -> requests.Response:
+        """
+        Send a request, retrying transient failures
+
+        Connection errors, timeouts and 429/5xx gateway responses are
+        retried with backoff (honouring Retry-After). They count against
+        the endpoint's circuit breaker, as do other 5xx responses (not
+        retried, since the server failed rather than being busy) and any
+        other exception from requests. Other responses count as success
+        since the server answered.
+
+        Args:
+            endpoint: Name of the endpoint, for its circuit breaker
+            method: HTTP method
+            path: Path relative to the base URL
+            retries: Override the number of retries
+            read_timeout: Override the read timeout
+            **kwargs: Passed to requests
+
+        Returns:
+            The final response (which may still be an error status)
+
+        Raises:
+            CircuitOpenError: The endpoint's circuit is open
+            requests.RequestException: Every attempt failed to get a response
+        """
+        breaker = self.breaker(endpoint)
+        if not breaker.allow():
+            raise CircuitOpenError(f"{endpoint} circuit open, retrying in {breaker.retry_in():.0f}s")
+
+        retries = self.retries if retries is None else retries
+        kwargs.setdefault('timeout', (self.connect_timeout, read_timeout or self.read_timeout))
+        url = f'{self.base_url}{path}'
+
+        attempt = 0
+        while True:
+            self.requests_sent += 1
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt >= retries:
+                    breaker.record_failure()
+                    raise
+                delay = backoff_delay(attempt + 1, self.backoff_base, self.backoff_max)
+                logger.debug(f"{endpoint} request failed ({e}), retrying in {delay:.1f}s")
+            except Exception:
+                # Anything else (bad chunked body, redirect loop, ...) still
+                # has to settle a half-open trial, or the circuit never closes
+                breaker.record_failure()
+                raise
+            else:
+                if response.status_code not in RETRY_STATUSES:
+                    if response.status_code >= 500:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    return response
+                if attempt >= retries:
+                    breaker.record_failure()
+                    return response
+                retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                if retry_after is not None and retry_after > self.backoff_max:
+                    # The server wants a longer pause than we retry within
+                    breaker.record_failure()
+                    return response
+                delay = retry_after if retry_after is not None else backoff_delay(attempt + 1, self.backoff_base, self.backoff_max)
+                logger.debug(f"{endpoint} returned {response.status_code}, retrying in {delay:.1f}s")
+
+            attempt += 1
+            self.retries_made += 1
+            time.sleep(delay)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request counts and per-endpoint breaker state for the heartbeat"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {
+            'requests': self.requests_sent,
+            'retries': self.retries_made,
+            'circuits': {endpoint: breaker.get_stats() for endpoint, breaker in breakers.items()}
+        }
@@ -3,20 +3,33 @@
 Lumy - Main Application
 Connects to dashboard, displays registration code, and manages widgets
 """
+import time
+
+# Process start, taken before the heavier imports below, for boot timing
+PROCESS_START = time.monotonic()
+
 import os
 import sys
-import time
 import logging
 import random
-import base64
-import subprocess
+import json
+import hashlib
+from functools import partial
 import socket
-from io import BytesIO
 from display_manager import DisplayManager
+from display_scheduler import DisplayScheduler
 from device_manager import DeviceManager
-from api_client import LumyAPIClient
-from weather_widget import WeatherWidget
+from state_store import StateStore
+from widget_registry import WidgetRegistry, widget_type
+from compositor import Compositor, plan_layout
+from weather_cache import WeatherCache
+from system_info import SystemInfoCollector
+from scheduler import Scheduler
+from preview_encoder import PreviewEncoder, encode_preview
+from metrics import metrics
 import config
+# The HTTP stack (requests, urllib3) and the async runtime are imported
+# where they are first used, after a fast boot has put a frame on screen
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +37,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Config fields that change without affecting what is displayed
+CONFIG_DIGEST_IGNORED_KEYS = ('updated_at', 'device_id')
+
+# Shared collector so rarely-changing values are only read once
+system_info_collector = SystemInfoCollector()
+
+class BootTimer:
+    """Measures how long after the process started the first useful frame was on screen"""
+    
+    def __init__(self, start):
+        self.start = start
+        self.mode = None
+        self.imports_s = None
+        self.first_frame_s = None
+        self.first_frame_source = None
+        self.uptime_s = None
+    
+    def imports_done(self):
+        self.imports_s = round(time.monotonic() - self.start, 3)
+    
+    def frame_shown(self, source):
+        """
+        Record the first frame of the claimed device reaching the panel
+        
+        Args:
+            source: 'saved' for the frame kept from before a restart,
+                'render' for a newly rendered one
+        """
+        if self.first_frame_s is not None:
+            return
+        elapsed = time.monotonic() - self.start
+        self.first_frame_s = round(elapsed, 3)
+        self.first_frame_source = source
+        # System uptime includes the OS boot, for time from power-on
+        try:
+            with open('/proc/uptime', 'r') as f:
+                self.uptime_s = round(float(f.read().split()[0]), 1)
+        except (OSError, ValueError, IndexError):
+            self.uptime_s = None
+        metrics.observe('boot.first_frame', elapsed)
+        logger.info(f"First frame on screen {elapsed:.2f}s after start ({source} frame, {self.mode} boot)")
+    
+    def get_stats(self):
+        return {
+            'mode': self.mode,
+            'imports_s': self.imports_s,
+            'first_frame_s': self.first_frame_s,
+            'first_frame_source': self.first_frame_source,
+            'uptime_at_first_frame_s': self.uptime_s
+        }
+
+boot_timer = BootTimer(PROCESS_START)
+
 def get_system_info():
     """
     Collect system information from the Raspberry Pi
@@ -34,89 +100,8 @@ def get_system_info():
     info = {}
     
     try:
-        # Get MAC address
-        try:
-            mac_result = subprocess.run(['cat', '/sys/class/net/wlan0/address'], 
-                                       capture_output=True, text=True, timeout=2)
-            if mac_result.returncode == 0:
-                info['mac_address'] = mac_result.stdout.strip().upper()
-        except:
-            info['mac_address'] = 'Unknown'
-        
-        # Get WiFi signal strength
-        try:
-            wifi_result = subprocess.run(['iwconfig', 'wlan0'], 
-                                        capture_output=True, text=True, timeout=2)
-            if wifi_result.returncode == 0:
-                # Parse signal level from iwconfig output
-                for line in wifi_result.stdout.split('\n'):
-                    if 'Signal level' in line:
-                        # Extract signal level (e.g., "-50 dBm")
-                        parts = line.split('Signal level=')
-                        if len(parts) > 1:
-                            signal = parts[1].split()[0]
-                            info['wifi_signal'] = signal
-                            break
-                if 'wifi_signal' not in info:
-                    info['wifi_signal'] = 'Unknown'
-        except:
-            info['wifi_signal'] = 'Unknown'
-        
-        # Get firmware/OS version
-        try:
-            with open('/etc/os-release', 'r') as f:
-                for line in f:
-                    if line.startswith('PRETTY_NAME='):
-                        info['firmware'] = line.split('=')[1].strip().strip('"')
-                        break
-            if 'firmware' not in info:
-                info['firmware'] = 'Raspberry Pi OS'
-        except:
-            info['firmware'] = 'Unknown'
-        
-        # Get timezone
-        try:
-            tz_result = subprocess.run(['timedatectl', 'show', '--property=Timezone', '--value'], 
-                                      capture_output=True, text=True, timeout=2)
-            if tz_result.returncode == 0:
-                tz = tz_result.stdout.strip()
-                info['timezone'] = tz if tz else 'UTC'
-            else:
-                info['timezone'] = 'UTC'
-        except:
-            info['timezone'] = 'UTC'
-        
-        # Get uptime
-        try:
-            with open('/proc/uptime', 'r') as f:
-                uptime_seconds = float(f.read().split()[0])
-                info['uptime'] = int(uptime_seconds)
-        except:
-            info['uptime'] = 0
-        
-        # Get CPU temperature
-        try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                temp = float(f.read()) / 1000.0
-                info['cpu_temp'] = round(temp, 1)
-        except:
-            info['cpu_temp'] = None
-        
-        # Get memory usage
-        try:
-            mem_result = subprocess.run(['free'], capture_output=True, text=True, timeout=2)
-            if mem_result.returncode == 0:
-                lines = mem_result.stdout.split('\n')
-                if len(lines) > 1:
-                    mem_line = lines[1].split()
-                    total = int(mem_line[1])
-                    used = int(mem_line[2])
-                    info['memory_usage'] = round((used / total) * 100, 1)
-        except:
-            info['memory_usage'] = None
-        
+        info = system_info_collector.collect()
         logger.info(f"System info collected: WiFi={info.get('wifi_signal')}, Temp={info.get('cpu_temp')}°C")
-        
     except Exception as e:
         logger.error(f"Error collecting system info: {e}")
     
@@ -133,28 +118,47 @@ def image_to_base64_preview(image, max_width=400):
     Returns:
         Base64 encoded image string or None if error
     """
-    try:
-        from PIL import Image
-        
-        # Calculate thumbnail size (maintain aspect ratio)
-        aspect_ratio = image.height / image.width
-        thumbnail_width = min(max_width, image.width)
-        thumbnail_height = int(thumbnail_width * aspect_ratio)
-        
-        # Create thumbnail
-        thumbnail = image.copy()
-        thumbnail.thumbnail((thumbnail_width, thumbnail_height), Image.Resampling.LANCZOS)
+    return encode_preview(image, max_width, config.PREVIEW_FORMAT, config.PREVIEW_QUALITY, config.PREVIEW_MAX_BYTES)
+
+def get_refresh_interval(device_config, default):
+    """
+    Get the display refresh interval from the device config
+    
+    Args:
+        device_config: Config dict from the dashboard (may be None)
+        default: Interval to use when the config doesn't set one
         
-        # Convert to base64
-        buffer = BytesIO()
-        thumbnail.save(buffer, format='PNG', optimize=True)
-        buffer.seek(0)
+    Returns:
+        Interval in seconds
+    """
+    try:
+        interval = int(device_config['display']['refresh_interval'])
+        if interval >= config.MIN_REFRESH_INTERVAL:
+            return interval
+        logger.warning(f"Ignoring refresh interval {interval}s (minimum {config.MIN_REFRESH_INTERVAL}s)")
+    except (TypeError, KeyError, ValueError):
+        pass
+    return default
+
+def get_config_digest(device_config):
+    """
+    Digest of the parts of the device config that affect the display
+    
+    Args:
+        device_config: Config dict from the dashboard (may be None)
         
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
-        return f"data:image/png;base64,{img_str}"
-    except Exception as e:
-        logger.error(f"Failed to create image preview: {e}")
+    Returns:
+        Hex SHA-256 digest, or None if there is no config
+    """
+    if not device_config:
         return None
+    relevant = {k: v for k, v in device_config.items() if k not in CONFIG_DIGEST_IGNORED_KEYS}
+    canonical = json.dumps(relevant, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def get_weather_cache_ttl(refresh_interval):
+    """Cache TTL that keeps cached weather from outliving a scheduled refresh"""
+    return min(config.WEATHER_CACHE_TTL, int(refresh_interval * 0.9))
 
 def generate_registration_code():
     """
@@ -172,153 +176,608 @@ def generate_registration_code():
     
     return f"{letter_part}-{number_part}"
 
+def build_layout(registry, entries):
+    """
+    Plan which widgets are shown where
+    
+    Falls back to the default widgets full screen if nothing enabled
+    can be shown.
+    
+    Args:
+        registry: WidgetRegistry
+        entries: Enabled widget entries (registry.enabled_widgets())
+    
+    Returns:
+        List of (widget id, (x, y, width, height))
+    """
+    layout = plan_layout(entries, config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
+    if not layout:
+        logger.warning("No enabled widgets can be shown, using the default screen")
+        layout = plan_layout(registry.enabled_widgets(None), config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
+    return layout
+
+class LumyAgent:
+    """
+    Runs a claimed device: heartbeats, widget refreshes and config refreshes
+    
+    Each task is split into a network step and a local step so the
+    threaded scheduler and the asyncio runtime can share them.
+    """
+    def __init__(self, display, display_scheduler, api_client, registry, services, device_id, device_config,
+                 telemetry=None, state_store=None, from_saved_state=False):
+        self.display = display
+        self.display_scheduler = display_scheduler
+        self.api_client = api_client
+        self.registry = registry
+        self.services = services
+        self.weather_service = services['weather_service']
+        self.weather_cache = self.weather_service.cache
+        self.device_id = device_id
+        self.device_config = device_config
+        self.config_digest = get_config_digest(device_config)
+        self.preview_encoder = PreviewEncoder(config.PREVIEW_MAX_WIDTH, config.PREVIEW_FORMAT, config.PREVIEW_QUALITY, config.PREVIEW_MAX_BYTES)
+        # Hash of the preview the dashboard last stored
+        self.preview_sent_hash = None
+        self.scheduler = None
+        # TelemetryUploader when heartbeats are queued and batched, else None
+        self.telemetry = telemetry
+        self.last_telemetry_flush = time.monotonic()
+        # StateStore the config is saved to for the next boot
+        self.state_store = state_store
+        # Booted from saved state: the claim and config still need checking
+        self.from_saved_state = from_saved_state
+        # Set when the dashboard no longer knows the saved claim
+        self.claim_lost = False
+        self.compositor = None
+        self.layout = None
+        # Bumped whenever the set of widgets on screen changes
+        self.layout_version = 0
+        self.intervals = {}
+        self._apply_layout(device_config)
+        self._apply_intervals(device_config)
+    
+    def weather_widgets(self):
+        """Weather widget instances on screen, in layout order"""
+        return [region.widget for region in self.compositor.regions if widget_type(region.widget_id) == 'weather']
+    
+    def widget_ids(self):
+        """Ids of the widgets currently on screen"""
+        return [region.widget_id for region in self.compositor.regions]
+    
+    def _apply_layout(self, device_config):
+        """
+        Rebuild the compositor if the widget layout changed
+        
+        Widgets that stay on screen are given their (possibly changed)
+        config instead.
+        
+        Returns:
+            True if the layout changed
+        """
+        entries = self.registry.enabled_widgets(device_config)
+        layout = build_layout(self.registry, entries)
+        widget_configs = {entry['id']: entry.get('config') or {} for entry in entries}
+        changed = layout != self.layout
+        
+        if changed:
+            compositor = Compositor(config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
+            for widget_id, box in layout:
+                widget = self.registry.create(widget_id, box[2], box[3], self.services, widget_configs.get(widget_id))
+                if widget is not None:
+                    compositor.add(widget_id, widget, box)
+            
+            self.compositor = compositor
+            self.layout = layout
+            self.layout_version += 1
+            logger.info(f"Widget layout: {', '.join(f'{widget_id} at {box}' for widget_id, box in layout)}")
+        else:
+            for region in self.compositor.regions:
+                if hasattr(region.widget, 'configure'):
+                    region.widget.configure(widget_configs.get(region.widget_id))
+        
+        # Locations on screen are fetched together
+        self.weather_service.set_locations([widget.location for widget in self.weather_widgets()])
+        return changed
+    
+    def _apply_intervals(self, device_config):
+        """Work out each widget's refresh interval"""
+        self.intervals = {}
+        for region in self.compositor.regions:
+            interval = region.widget.refresh_interval
+            if widget_type(region.widget_id) == 'weather':
+                # The display refresh interval from the config drives the weather
+                interval = get_refresh_interval(device_config, interval)
+                self.weather_cache.ttl = get_weather_cache_ttl(interval)
+            self.intervals[region.widget_id] = interval
+    
+    def widget_task_interval(self, widget_id):
+        """Widget refresh interval, backed off if renders overrun their budget"""
+        return self.registry.effective_interval(widget_id, self.intervals[widget_id])
+    
+    def show_initial_frame(self):
+        """
+        Render every widget and display the first frame
+        
+        Weather uses cached data from before a reboot if there is any, so
+        the screen doesn't wait on the network.
+        
+        Returns:
+            Ids of widgets drawn from stale data that should refresh now
+        """
+        logger.info("Rendering widgets...")
+        refresh_now = []
+        for widget_id in self.widget_ids():
+            data = None
+            if widget_type(widget_id) == 'weather':
+                widget = self.compositor.get_widget(widget_id)
+                data = widget.get_cached_weather()
+                if data and not self.weather_service.is_fresh(widget.location):
+                    logger.info(f"Rendering cached weather for {widget.city_name}, refreshing in main loop")
+                    refresh_now.append(widget_id)
+            if data is None:
+                data = self.get_widget_data(widget_id)
+            self.show_widget(widget_id, data)
+        
+        if self.show_frame():
+            logger.info("Widgets queued for display")
+        return refresh_now
+    
+    def build_heartbeat(self):
+        """
+        Build the heartbeat payload (local work only)
+        
+        The preview is only encoded when the frame changes, and only sent
+        when the dashboard doesn't already have it; otherwise just its
+        hash is sent.
+        
+        Returns:
+            Tuple of (display preview or None, preview hash, system info)
+        """
+        display_preview = None
+        preview_hash = None
+        # Preview what is actually on the panel, not a frame still queued
+        shown_buffer, shown_hash = self.display_scheduler.current_frame()
+        if shown_buffer:
+            display_preview, preview_hash = self.preview_encoder.get_packed(shown_buffer, shown_hash, self.display.width, self.display.height)
+            if preview_hash == self.preview_sent_hash:
+                display_preview = None
+        
+        # Collect system information
+        system_info = get_system_info()
+        system_info['display'] = self.display.get_refresh_stats()
+        system_info['display']['scheduler'] = self.display_scheduler.get_stats()
+        system_info['compositor'] = self.compositor.get_stats()
+        system_info['metrics'] = metrics.summary()
+        system_info['http'] = self.api_client.transport.get_stats()
+        system_info['weather'] = self.weather_service.get_stats()
+        system_info['boot'] = boot_timer.get_stats()
+        if self.telemetry:
+            system_info['telemetry'] = self.telemetry.queue.get_stats()
+        if config.METRICS_FILE:
+            metrics.write_text(config.METRICS_FILE)
+        return display_preview, preview_hash, system_info
+    
+    def post_heartbeat(self, display_preview, preview_hash, system_info):
+        """
+        Send a built heartbeat and track which preview the dashboard has (network only)
+        
+        With telemetry batching the sample is queued and the queue is
+        uploaded when a flush is due; samples that couldn't be sent are kept
+        on disk, so nothing is lost while offline.
+        """
+        widgets = self.registry.get_stats()
+        if self.telemetry and self.api_client.batch_supported:
+            self.telemetry.record(system_info, widgets, preview_hash)
+            if not self._telemetry_flush_due():
+                return True
+            self.last_telemetry_flush = time.monotonic()
+            sent = self.telemetry.flush(display_preview, preview_hash)
+            if not sent and not self.api_client.batch_supported:
+                logger.warning("Falling back to single heartbeats")
+                sent = self.api_client.send_heartbeat(self.device_id, display_preview, system_info, preview_hash, widgets=widgets)
+        else:
+            sent = self.api_client.send_heartbeat(self.device_id, display_preview, system_info, preview_hash, widgets=widgets)
+        if sent:
+            if self.api_client.preview_required:
+                self.preview_sent_hash = None
+            elif display_preview:
+                self.preview_sent_hash = preview_hash
+        return sent
+    
+    def _telemetry_flush_due(self):
+        """In batch mode, flush every TELEMETRY_FLUSH_INTERVAL or once a full batch is queued"""
+        if config.TELEMETRY_MODE != 'batch':
+            return True
+        if len(self.telemetry.queue) >= self.telemetry.batch_size:
+            return True
+        return time.monotonic() - self.last_telemetry_flush >= config.TELEMETRY_FLUSH_INTERVAL
+    
+    def send_heartbeat(self):
+        """Send heartbeat with display preview and system info"""
+        self.post_heartbeat(*self.build_heartbeat())
+    
+    def get_widget_data(self, widget_id):
+        """Fetch a widget's data (may do network I/O)"""
+        widget = self.compositor.get_widget(widget_id)
+        if widget is None:
+            return None
+        try:
+            return widget.get_data()
+        except Exception as e:
+            logger.error(f"Widget '{widget_id}' failed to get data: {e}")
+            return None
+    
+    def show_widget(self, widget_id, data):
+        """
+        Re-render a widget's tile if its data changed (local work only)
+        
+        Returns:
+            True if the tile changed and the frame needs showing
+        """
+        render = lambda widget, widget_data: self.registry.render(widget_id, widget, widget_data)
+        changed = self.compositor.update(widget_id, data, render)
+        if self.scheduler and widget_id in self.intervals:
+            self.scheduler.set_interval(f'widget:{widget_id}', self.widget_task_interval(widget_id))
+        return changed
+    
+    def show_frame(self):
+        """
+        Compose changed tiles and queue the frame for the display
+        
+        The refresh itself happens on the display scheduler's worker, so
+        this never blocks on the panel.
+        
+        Returns:
+            True if a frame was queued
+        """
+        image, dirty_regions = self.compositor.compose()
+        if not dirty_regions:
+            return False
+        return self.display_scheduler.submit(image, dirty_regions=dirty_regions)
+    
+    def refresh_widget(self, widget_id):
+        """Fetch a widget's data, re-render it and update the display"""
+        logger.info(f"Refreshing {widget_id}...")
+        if self.show_widget(widget_id, self.get_widget_data(widget_id)) and self.show_frame():
+            logger.info(f"{widget_id} updated")
+    
+    def apply_config(self, new_config):
+        """
+        Apply a fetched device config: layout, intervals and static layers
+        
+        Returns:
+            True if something relevant changed and the display should be re-rendered
+        """
+        if self.state_store:
+            self.state_store.save_config(new_config, self.api_client.config_etag(self.device_id))
+        digest = get_config_digest(new_config)
+        self.device_config = new_config
+        if digest == self.config_digest:
+            logger.debug("Configuration unchanged")
+            return False
+        self.config_digest = digest
+        
+        if not self._apply_layout(new_config):
+            # Same widgets, but their inputs may have changed
+            self.compositor.invalidate()
+            for widget in self.weather_widgets():
+                widget.invalidate_background()
+        self._apply_intervals(new_config)
+        if self.scheduler:
+            self._sync_widget_tasks(delay=0)
+        logger.info(f"Configuration updated (digest {digest[:12]})")
+        return True
+    
+    def refresh_config(self):
+        """Fetch the device config, re-rendering if it changed"""
+        logger.info("Refreshing configuration...")
+        new_config = self.api_client.get_config(self.device_id)
+        if new_config and self.apply_config(new_config):
+            for widget_id in self.widget_ids():
+                self.scheduler.run_now(f'widget:{widget_id}')
+    
+    def _sync_widget_tasks(self, delay=None, refresh_now=()):
+        """Add, remove and re-time widget tasks to match the layout"""
+        names = {f'widget:{widget_id}': widget_id for widget_id in self.widget_ids()}
+        for name in self.scheduler.task_names():
+            if name.startswith('widget:') and name not in names:
+                self.scheduler.remove(name)
+        for name, widget_id in names.items():
+            interval = self.widget_task_interval(widget_id)
+            if self.scheduler.has_task(name):
+                self.scheduler.set_interval(name, interval)
+            else:
+                first = 0 if widget_id in refresh_now else delay
+                self.scheduler.add(name, partial(self.refresh_widget, widget_id), interval, delay=first)
+    
+    def verify_claim(self):
+        """
+        Confirm with the dashboard that the device is still claimed (network only)
+        
+        After a fast boot the saved claim status was trusted. If the
+        dashboard says the device is no longer claimed, the saved claim is
+        cleared and claim_lost is set; the runtime then stops and the
+        process exits, so it restarts into registration.
+        
+        Returns:
+            True once confirmed, False if unconfirmed
+        """
+        status = self.api_client.check_claim_status(self.device_id)
+        if status and status.get('registered'):
+            logger.info("Claim confirmed by dashboard")
+            self.from_saved_state = False
+            return True
+        if self.api_client.claim_status is False:
+            logger.error("Device is no longer claimed, restarting to register again")
+            if self.state_store:
+                self.state_store.update(claimed=False)
+            self.claim_lost = True
+        return False
+    
+    def _verify_claim_task(self):
+        if self.verify_claim():
+            self.scheduler.remove('claim')
+        elif self.claim_lost:
+            self.scheduler.stop()
+    
+    def run(self):
+        """Run the tasks on a deadline scheduler until interrupted"""
+        refresh_now = self.show_initial_frame()
+        
+        # Main loop: sleep until the next task is due
+        logger.info("Entering main loop...")
+        self.scheduler = Scheduler()
+        self.scheduler.add('heartbeat', self.send_heartbeat, config.HEARTBEAT_INTERVAL, jitter=config.SCHEDULER_JITTER)
+        # A saved config may be stale, so refresh it straight away
+        config_delay = 0 if self.from_saved_state else None
+        self.scheduler.add('config', self.refresh_config, config.CONFIG_REFRESH_INTERVAL, jitter=config.SCHEDULER_JITTER, delay=config_delay)
+        if self.from_saved_state:
+            self.scheduler.add('claim', self._verify_claim_task, config.CONFIG_REFRESH_INTERVAL, delay=0)
+        self._sync_widget_tasks(refresh_now=refresh_now)
+        self.scheduler.run_forever()
+
+def create_transport():
+    """Create the dashboard HTTP transport from the config"""
+    from http_transport import HTTPTransport
+    return HTTPTransport(
+        config.API_BASE_URL,
+        connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=config.HTTP_READ_TIMEOUT,
+        pool_size=config.HTTP_POOL_SIZE,
+        retries=config.HTTP_RETRIES,
+        backoff_base=config.HTTP_BACKOFF_BASE,
+        backoff_max=config.HTTP_BACKOFF_MAX,
+        failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+        reset_timeout=config.BREAKER_RESET_TIMEOUT,
+        max_reset_timeout=config.BREAKER_MAX_RESET_TIMEOUT
+    )
+
+def get_poll_delay(failures):
+    """
+    Seconds to wait before the next claim poll
+    
+    Polls every POLL_INTERVAL while the dashboard answers; while it
+    doesn't, backs off exponentially with jitter up to POLL_MAX_INTERVAL.
+    """
+    from http_transport import backoff_delay
+    if failures == 0:
+        return config.POLL_INTERVAL
+    return config.POLL_INTERVAL + backoff_delay(failures, config.POLL_INTERVAL, config.POLL_MAX_INTERVAL)
+
+def create_display():
+    """Create the display manager for the configured backend"""
+    epd = None
+    if config.DISPLAY_BACKEND == 'virtual':
+        import virtual_epd
+        logger.info(f"Using virtual display, frames written to {config.VIRTUAL_DISPLAY_DIR}")
+        epd = virtual_epd.EPD(
+            config.VIRTUAL_DISPLAY_DIR,
+            config.VIRTUAL_DISPLAY_FORMAT,
+            config.VIRTUAL_DISPLAY_LATENCY,
+            config.VIRTUAL_DISPLAY_KEEP_FRAMES
+        )
+    elif config.DISPLAY_BACKEND != 'epd':
+        logger.warning(f"Unknown display backend '{config.DISPLAY_BACKEND}', using epd")
+    return DisplayManager(dither=config.DISPLAY_DITHER, epd=epd)
+
+def claim_device(display_scheduler, api_client, state_store, device_id):
+    """
+    Make sure the device is claimed, registering it if needed
+    
+    Shows the registration code and waits until a user claims the device
+    on the dashboard. Blocks until claimed.
+    """
+    # Check if device is already registered
+    logger.info("Checking if device is already registered...")
+    status = api_client.check_claim_status(device_id)
+    
+    if status and status.get('registered'):
+        # Device is already claimed, skip registration
+        logger.info("Device is already registered!")
+        logger.info(f"  User ID: {status.get('user_id')}")
+        logger.info(f"  Device name: {status.get('device_name')}")
+        logger.info("Skipping registration flow, going straight to widgets...")
+    else:
+        # Device not claimed yet, do registration flow
+        logger.info("Device not registered, starting registration flow...")
+        
+        # Generate registration code
+        reg_code = generate_registration_code()
+        logger.info(f"Registration code: {reg_code}")
+        
+        # Register with API
+        logger.info("Registering with dashboard...")
+        registration = api_client.register_device(device_id, reg_code)
+        
+        if not registration:
+            logger.error("Failed to register with dashboard. Check API URL and API key.")
+            logger.error(f"API URL: {config.API_BASE_URL}")
+            logger.warning("Displaying code anyway, but claiming won't work without API connection.")
+        else:
+            logger.info("Successfully registered with dashboard")
+        
+        # Show welcome screen; the saved frame is no longer what the panel shows
+        state_store.update(claimed=False)
+        state_store.clear_frame()
+        welcome = display_scheduler.display.render_welcome_screen(reg_code)
+        display_scheduler.submit(welcome, force=True)
+        logger.info("Welcome screen queued for display")
+        
+        # Poll for claim status
+        logger.info("Waiting for user to claim device...")
+        claimed = False
+        poll_count = 0
+        
+        poll_failures = 0
+        waited = 0
+        last_logged = 0
+        
+        while not claimed:
+            poll_count += 1
+            
+            # Check if claimed; the dashboard holds the request until the
+            # claim happens or CLAIM_WAIT passes, so the claim shows up at once
+            poll_start = time.monotonic()
+            status = api_client.check_claim_status(device_id, wait=config.CLAIM_WAIT)
+            elapsed = time.monotonic() - poll_start
+            waited += elapsed
+            
+            # Back off while the dashboard is unreachable (the breaker
+            # counts consecutive failed polls)
+            poll_failures = api_client.transport.breaker('registration').failures
+            
+            if status and status.get('registered'):
+                logger.info("Device has been claimed!")
+                logger.info(f"  User ID: {status.get('user_id')}")
+                logger.info(f"  Device name: {status.get('device_name')}")
+                claimed = True
+                break
+            
+            # A held long-poll has already waited; sleep only for what is
+            # left, which covers dashboards that answer at once and failures
+            delay = get_poll_delay(poll_failures) - elapsed
+            if delay > 0:
+                time.sleep(delay)
+                waited += delay
+            
+            # Log status every minute or so
+            if waited - last_logged >= 60:
+                last_logged = waited
+                logger.info(f"Still waiting for claim... ({int(waited)}s, {poll_count} polls)")
+    
+    state_store.update(device_id=device_id, claimed=True)
+
 def main():
     """Main application entry point"""
+    boot_timer.imports_done()
     logger.info("=" * 60)
     logger.info("Lumy Display Starting...")
     logger.info("=" * 60)
     
-    # Check if we're running on a Raspberry Pi
-    if not os.path.exists('/sys/class/gpio'):
+    # Check if we're running on a Raspberry Pi (not needed for the virtual display)
+    if config.DISPLAY_BACKEND != 'virtual' and not os.path.exists('/sys/class/gpio'):
         logger.error("This script must be run on a Raspberry Pi with GPIO access")
+        logger.error("Set LUMY_DISPLAY=virtual to run without a panel")
         sys.exit(1)
     
     try:
         # Initialize components
-        display = DisplayManager()
+        display = create_display()
         device_mgr = DeviceManager(config.DEVICE_ID_FILE)
-        api_client = LumyAPIClient(config.API_BASE_URL, config.API_KEY)
+        state_store = StateStore(config.STATE_FILE, config.BOOT_FRAME_FILE, config.STATE_MAX_BYTES)
         
         # Get device ID
         device_id = device_mgr.get_device_id()
         logger.info(f"Device ID: {device_id}")
         
-        # Check if device is already registered
-        logger.info("Checking if device is already registered...")
-        status = api_client.check_claim_status(device_id)
+        # Refreshed frames are saved, so the next boot knows what the panel shows
+        def on_refresh(buffer, frame_hash):
+            # The welcome screen of an unclaimed device isn't the first frame
+            # the boot metric measures; the claim needs its code on screen,
+            # so it can't complete before the welcome refresh does
+            if state_store.is_claimed(device_id):
+                boot_timer.frame_shown('render')
+            state_store.save_frame(buffer, frame_hash)
         
-        if status and status.get('registered'):
-            # Device is already claimed, skip registration
-            logger.info("Device is already registered!")
-            logger.info(f"  User ID: {status.get('user_id')}")
-            logger.info(f"  Device name: {status.get('device_name')}")
-            logger.info("Skipping registration flow, going straight to widgets...")
-        else:
-            # Device not claimed yet, do registration flow
-            logger.info("Device not registered, starting registration flow...")
-            
-            # Generate registration code
-            reg_code = generate_registration_code()
-            logger.info(f"Registration code: {reg_code}")
+        display_scheduler = DisplayScheduler(display, config.DISPLAY_MIN_INTERVAL, config.DISPLAY_MAX_DUTY, on_refresh)
+        display_scheduler.start()
+        
+        # A device claimed before the restart boots from its saved state;
+        # the claim and config are checked in the background
+        device_config, config_etag = state_store.load_config()
+        fast_boot = config.FAST_BOOT and state_store.is_claimed(device_id) and device_config is not None
+        boot_timer.mode = 'fast' if fast_boot else 'full'
+        if fast_boot:
+            logger.info("Device was claimed before restart, booting from saved state")
+            buffer, frame_hash = state_store.load_frame(display.width * display.height // 2)
+            if buffer is not None:
+                # Still on the panel: e-paper keeps its image without power
+                display_scheduler.restore_frame(frame_hash, buffer)
+                boot_timer.frame_shown('saved')
+        
+        from api_client import LumyAPIClient
+        api_client = LumyAPIClient(config.API_BASE_URL, config.API_KEY, create_transport(),
+                                   config.TELEMETRY_BATCH_RECHECK)
+        if fast_boot:
+            # The first config refresh is then a 304 unless it changed
+            api_client.restore_config(device_id, device_config, config_etag)
+        
+        if not fast_boot:
+            claim_device(display_scheduler, api_client, state_store, device_id)
             
-            # Register with API
-            logger.info("Registering with dashboard...")
-            registration = api_client.register_device(device_id, reg_code)
+            # Device is claimed, fetch configuration
+            logger.info("Fetching configuration...")
+            device_config = api_client.get_config(device_id)
             
-            if not registration:
-                logger.error("Failed to register with dashboard. Check API URL and API key.")
-                logger.error(f"API URL: {config.API_BASE_URL}")
-                logger.warning("Displaying code anyway, but claiming won't work without API connection.")
+            if device_config:
+                logger.info("Configuration received:")
+                logger.info(f"  Widgets: {len(device_config.get('widgets', []))}")
+                state_store.save_config(device_config, api_client.config_etag(device_id))
             else:
-                logger.info("Successfully registered with dashboard")
-            
-            # Show welcome screen
-            display.show_welcome_screen(reg_code)
-            logger.info("Welcome screen displayed")
-            
-            # Poll for claim status
-            logger.info("Waiting for user to claim device...")
-            claimed = False
-            poll_count = 0
-            
-            while not claimed:
-                time.sleep(config.POLL_INTERVAL)
-                poll_count += 1
-                
-                # Check if claimed
-                status = api_client.check_claim_status(device_id)
-                
-                if status and status.get('registered'):
-                    logger.info("Device has been claimed!")
-                    logger.info(f"  User ID: {status.get('user_id')}")
-                    logger.info(f"  Device name: {status.get('device_name')}")
-                    claimed = True
-                    break
-                
-                # Log status every minute
-                if poll_count % 6 == 0:  # Every 60 seconds
-                    logger.info(f"Still waiting for claim... ({poll_count * config.POLL_INTERVAL}s)")
-        
-        # Device is claimed, fetch configuration
-        logger.info("Fetching configuration...")
-        device_config = api_client.get_config(device_id)
-        
-        if device_config:
-            logger.info("Configuration received:")
-            logger.info(f"  Widgets: {len(device_config.get('widgets', []))}")
-        else:
-            logger.warning("Could not fetch configuration")
+                logger.warning("Could not fetch configuration")
         
-        # Initialize weather widget
-        logger.info("Initializing weather widget...")
-        weather = WeatherWidget(config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
+        # Initialize enabled widgets (modules are only imported when enabled)
+        logger.info("Initializing widgets...")
+        from weather_service import WeatherService
+        registry = WidgetRegistry(config.WIDGET_RENDER_BUDGET)
+        weather_cache = WeatherCache(config.WEATHER_CACHE_FILE, config.WEATHER_CACHE_TTL)
+        services = {'weather_service': WeatherService(weather_cache, timeout=config.WEATHER_TIMEOUT)}
         
-        # Display weather widget
-        logger.info("Rendering weather widget...")
-        weather_image = weather.render()
-        current_display_image = None
+        telemetry = None
+        if config.TELEMETRY_MODE in ('live', 'batch'):
+            from telemetry import TelemetryQueue, TelemetryUploader
+            # Live uploads every heartbeat, so samples only need to hit the
+            # SD card once an upload fails
+            telemetry_queue = TelemetryQueue(config.TELEMETRY_QUEUE_FILE, config.TELEMETRY_MAX_RECORDS,
+                                             write_through=config.TELEMETRY_MODE == 'batch')
+            telemetry = TelemetryUploader(telemetry_queue, api_client, device_id, config.TELEMETRY_BATCH_SIZE,
+                                          config.TELEMETRY_RETRY_INTERVAL, config.TELEMETRY_MAX_BACKOFF)
         
-        if weather_image:
-            display.epd.display(display.epd.getbuffer(weather_image))
-            current_display_image = weather_image
-            logger.info("Weather widget displayed")
+        agent = LumyAgent(display, display_scheduler, api_client, registry, services, device_id, device_config,
+                          telemetry, state_store, from_saved_state=fast_boot)
+        if config.RUNTIME_MODE == 'async':
+            logger.info("Using asyncio runtime")
+            from async_runtime import AsyncRuntime
+            AsyncRuntime(
+                agent,
+                heartbeat_interval=config.HEARTBEAT_INTERVAL,
+                config_interval=config.CONFIG_REFRESH_INTERVAL,
+                jitter=config.SCHEDULER_JITTER,
+                network_timeout=config.NETWORK_TIMEOUT,
+                network_workers=config.NETWORK_WORKERS
+            ).run()
         else:
-            logger.error("Failed to render weather widget")
+            agent.run()
         
-        # Main loop: Send heartbeats and refresh weather/config
-        logger.info("Entering main loop...")
-        last_heartbeat = time.time()
-        last_weather_refresh = time.time()
-        last_config_refresh = time.time()
-        
-        while True:
-            now = time.time()
-            
-            # Send heartbeat every 60 seconds with display preview and system info
-            if now - last_heartbeat >= 60:
-                display_preview = None
-                if current_display_image:
-                    display_preview = image_to_base64_preview(current_display_image)
-                
-                # Collect system information
-                system_info = get_system_info()
-                
-                # Send heartbeat with all data
-                api_client.send_heartbeat(device_id, display_preview, system_info)
-                last_heartbeat = now
-            
-            # Refresh weather every 10 minutes
-            if now - last_weather_refresh >= 600:
-                logger.info("Refreshing weather...")
-                weather_image = weather.render()
-                if weather_image:
-                    display.epd.display(display.epd.getbuffer(weather_image))
-                    current_display_image = weather_image
-                    logger.info("Weather updated")
-                last_weather_refresh = now
-            
-            # Refresh config every 5 minutes
-            if now - last_config_refresh >= config.CONFIG_REFRESH_INTERVAL:
-                logger.info("Refreshing configuration...")
-                device_config = api_client.get_config(device_id)
-                if device_config:
-                    logger.info("Configuration updated")
-                last_config_refresh = now
-            
-            time.sleep(30)
+        if agent.claim_lost:
+            display_scheduler.stop(timeout=config.DISPLAY_STOP_TIMEOUT)
+            sys.exit(1)
     
     except KeyboardInterrupt:
         logger.info("\nShutting down gracefully...")
+        if 'display_scheduler' in locals():
+            # Let a refresh in progress finish before the panel sleeps
+            display_scheduler.stop(timeout=config.DISPLAY_STOP_TIMEOUT)
         if 'display' in locals():
             display.sleep()
     except Exception as e:
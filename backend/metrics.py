@@ -0,0 +1,178 @@
+"""
+Metrics - Lightweight timing spans and counters for the device agent
+Keeps bounded rolling histograms in memory; a compact summary rides along
+with the heartbeat and a text export can optionally be written to a file
+"""
+import os
+import time
+import threading
+import logging
+from collections import deque
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Recent samples kept per span
+MAX_SAMPLES = 256
+
+class Histogram:
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        """
+        Args:
+            max_samples: Recent durations kept for percentiles
+        """
+        self.samples = deque(maxlen=max_samples)
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = None
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.last = seconds
+
+    def percentile(self, fraction: float) -> Optional[float]:
+        """Percentile over the recent samples (None if empty)"""
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+    def summary(self) -> Dict[str, Any]:
+        """Compact summary in milliseconds"""
+        ms = lambda seconds: round(seconds * 1000, 1) if seconds is not None else None
+        summary = {
+            'n': self.count,
+            'p50': ms(self.percentile(0.5)),
+            'p95': ms(self.percentile(0.95)),
+            'max': ms(self.max),
+            'last': ms(self.last)
+        }
+        if self.errors:
+            summary['err'] = self.errors
+        return summary
+
+class Metrics:
+    def __init__(self, max_samples: int = MAX_SAMPLES):
+        """
+        Args:
+            max_samples: Recent durations kept per span
+        """
+        self.max_samples = max_samples
+        self._histograms = {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def _histogram(self, name: str) -> Histogram:
+        histogram = self._histograms.get(name)
+        if histogram is None:
+            histogram = self._histograms[name] = Histogram(self.max_samples)
+        return histogram
+
+    @contextmanager
+    def span(self, name: str):
+        """
+        Time a block of code
+
+        Usage:
+            with metrics.span('weather.fetch'):
+                ...
+
+        A block that raises is still timed and counted as an error.
+        """
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                histogram = self._histogram(name)
+                histogram.observe(elapsed)
+                if failed:
+                    histogram.errors += 1
+
+    def observe(self, name: str, seconds: float):
+        """Record a duration measured elsewhere"""
+        with self._lock:
+            self._histogram(name).observe(seconds)
+
+    def incr(self, name: str, amount: int = 1):
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Compact summary for the heartbeat
+
+        Returns:
+            {'spans': {name: {'n', 'p50', 'p95', 'max', 'last'}}, 'counters': {...}}
+            with durations in milliseconds
+        """
+        with self._lock:
+            return {
+                'spans': {name: histogram.summary() for name, histogram in sorted(self._histograms.items())},
+                'counters': dict(sorted(self._counters.items()))
+            }
+
+    def to_text(self) -> str:
+        """Export in Prometheus text format"""
+        lines = []
+        with self._lock:
+            for name, histogram in sorted(self._histograms.items()):
+                metric = 'lumy_' + name.replace('.', '_').replace('-', '_') + '_seconds'
+                lines.append(f'# TYPE {metric} summary')
+                for quantile in (0.5, 0.95):
+                    value = histogram.percentile(quantile)
+                    if value is not None:
+                        lines.append(f'{metric}{{quantile="{quantile}"}} {value:.6f}')
+                lines.append(f'{metric}_sum {histogram.total:.6f}')
+                lines.append(f'{metric}_count {histogram.count}')
+                if histogram.errors:
+                    errors = metric[:-len('_seconds')] + '_errors_total'
+                    lines.append(f'# TYPE {errors} counter')
+                    lines.append(f'{errors} {histogram.errors}')
+            for name, value in sorted(self._counters.items()):
+                metric = 'lumy_' + name.replace('.', '_').replace('-', '_') + '_total'
+                lines.append(f'# TYPE {metric} counter')
+                lines.append(f'{metric} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def write_text(self, path: str) -> bool:
+        """
+        Write the text export atomically, e.g. for node_exporter's textfile collector
+
+        Returns:
+            True if written
+        """
+        tmp_path = f'{path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                f.write(self.to_text())
+            os.replace(tmp_path, path)
+            return True
+        except OSError as e:
+            logger.warning(f"Could not write metrics to {path}: {e}")
+            return False
+
+    def reset(self):
+        """Drop all recorded metrics"""
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+# Shared instance used across the agent
+metrics = Metrics()
+
+def span(name: str):
+    """Time a block with the shared metrics instance"""
+    return metrics.span(name)
@@ -0,0 +1,154 @@
+"""
+Preview Encoder - Cheap, cached dashboard previews of the displayed frame
+A frame is encoded once; later heartbeats reference it by hash. Previews can
+be made straight from the packed panel buffer, without a full-size image.
+"""
+import io
+import base64
+import hashlib
+import logging
+from typing import Optional
+from PIL import Image
+import frame_packer
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {
+    'png': ('PNG', 'image/png'),
+    'webp': ('WEBP', 'image/webp')
+}
+
+def encode_preview(image, max_width: int = 400, fmt: str = 'png', quality: int = 60,
+                   max_bytes: Optional[int] = None) -> Optional[str]:
+    """
+    Encode a downscaled preview of an image as a data URL
+
+    PNG previews use a 64-colour adaptive palette; WebP uses a fixed
+    quality. If the encoded preview exceeds max_bytes it is re-encoded
+    at a smaller size.
+
+    Args:
+        image: PIL Image object
+        max_width: Maximum width of the preview (maintains aspect ratio)
+        fmt: 'png' or 'webp'
+        quality: WebP quality (ignored for PNG)
+        max_bytes: Optional size budget for the encoded image
+
+    Returns:
+        Data URL string, or None on error
+    """
+    try:
+        pil_format, mime = FORMATS[fmt]
+        width = min(max_width, image.width)
+        while True:
+            thumbnail = _downscale(image, width)
+            buffer = io.BytesIO()
+            if fmt == 'png':
+                thumbnail = thumbnail.convert('P', palette=Image.Palette.ADAPTIVE, colors=64)
+                thumbnail.save(buffer, format=pil_format)
+            else:
+                thumbnail.save(buffer, format=pil_format, quality=quality, method=0)
+            data = buffer.getvalue()
+
+            if max_bytes is None or len(data) <= max_bytes or width <= 100:
+                break
+            width = int(width * 0.75)
+            logger.debug(f"Preview is {len(data)} bytes, over budget; retrying at {width}px")
+
+        return f"data:{mime};base64,{base64.b64encode(data).decode('utf-8')}"
+    except Exception as e:
+        logger.error(f"Failed to create image preview: {e}")
+        return None
+
+def _downscale(image, width):
+    """Downscale without copying the full-size frame first"""
+    source = image if image.mode == 'RGB' else image.convert('RGB')
+    if width >= source.width:
+        return source
+    factor = source.width // width
+    if source.width == width * factor and source.height % factor == 0:
+        return source.reduce(factor)
+    height = max(1, int(source.height * width / source.width))
+    return source.resize((width, height), Image.Resampling.BILINEAR)
+
+def packed_to_thumbnail(buffer, width: int, height: int, max_width: int = 400):
+    """
+    Build a preview-sized RGB image from a packed panel buffer
+
+    This shows exactly what the panel shows (after dithering). With NumPy
+    the buffer is unpacked and box-filtered straight to the preview size,
+    so no full-size RGB frame is allocated.
+
+    Args:
+        buffer: Packed buffer as sent to the panel
+        width: Panel width in pixels
+        height: Panel height in pixels
+        max_width: Maximum width of the preview
+
+    Returns:
+        PIL Image reduced by a whole factor, to no less than max_width
+    """
+    # Reduce by a whole factor here; encode_preview() resizes the rest of the way
+    factor = max(1, width // max_width)
+    if frame_packer.is_available():
+        return Image.fromarray(frame_packer.downscale_packed(buffer, width, height, factor))
+    return _downscale(frame_packer.buffer_to_image(buffer, width, height), min(max_width, width))
+
+class PreviewEncoder:
+    def __init__(self, max_width: int = 400, fmt: str = 'png', quality: int = 60, max_bytes: Optional[int] = None):
+        """
+        Args:
+            max_width: Maximum preview width in pixels
+            fmt: 'png' (palette) or 'webp'
+            quality: WebP quality
+            max_bytes: Size budget for an encoded preview
+        """
+        if fmt not in FORMATS:
+            logger.warning(f"Unknown preview format '{fmt}', using png")
+            fmt = 'png'
+        self.max_width = max_width
+        self.fmt = fmt
+        self.quality = quality
+        self.max_bytes = max_bytes
+        self.encodes = 0
+        self._hash = None
+        self._preview = None
+
+    def get(self, image, frame_hash: Optional[str] = None):
+        """
+        Get the preview for a frame, encoding it only if the frame changed
+
+        Args:
+            image: PIL Image currently on the display
+            frame_hash: Hash identifying the frame (computed if omitted)
+
+        Returns:
+            Tuple of (data URL or None, frame hash)
+        """
+        if frame_hash is None:
+            frame_hash = hashlib.sha1(image.tobytes()).hexdigest()
+        if frame_hash != self._hash:
+            self._preview = encode_preview(image, self.max_width, self.fmt, self.quality, self.max_bytes)
+            self._hash = frame_hash if self._preview else None
+            self.encodes += 1
+        return self._preview, frame_hash
+
+    def get_packed(self, buffer, frame_hash: str, width: int, height: int):
+        """
+        Like get(), but from the packed buffer on the panel
+
+        Args:
+            buffer: Packed panel buffer
+            frame_hash: SHA-1 of the buffer (DisplayManager.frame_hash)
+            width: Panel width in pixels
+            height: Panel height in pixels
+
+        Returns:
+            Tuple of (data URL or None, frame hash)
+        """
+        if frame_hash != self._hash:
+            thumbnail = packed_to_thumbnail(buffer, width, height, self.max_width)
+            self._preview = encode_preview(thumbnail, self.max_width, self.fmt, self.quality, self.max_bytes)
+            self._hash = frame_hash if self._preview else None
+            self.encodes += 1
+        return self._preview, frame_hash
@@ -0,0 +1,195 @@
+"""
+Scheduler - Runs periodic tasks from a priority queue of deadlines
+Sleeps exactly until the next task is due instead of polling
+"""
+import time
+import heapq
+import random
+import threading
+import logging
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class ScheduledTask:
+    def __init__(self, name: str, func: Callable, interval: float, jitter: float = 0):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.jitter = jitter
+        # Unjittered deadline; jitter is applied on top and never accumulates
+        self.deadline = 0.0
+        self.runs = 0
+        self.missed = 0
+        self.last_run = None
+        # Bumped on reschedule so stale heap entries can be discarded
+        self.generation = 0
+
+class Scheduler:
+    def __init__(self):
+        self._tasks = {}
+        self._queue = []
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._running = False
+        self.wakeups = 0
+
+    def add(self, name: str, func: Callable, interval: float, jitter: float = 0, delay: Optional[float] = None):
+        """
+        Add a periodic task
+
+        Args:
+            name: Unique task name
+            func: Callable run with no arguments
+            interval: Seconds between runs
+            jitter: Up to this many random seconds are added to each deadline
+            delay: Seconds until the first run (default: one interval)
+        """
+        if interval <= 0:
+            raise ValueError(f"Task '{name}' interval must be positive")
+        task = ScheduledTask(name, func, interval, jitter)
+        first = interval if delay is None else delay
+        with self._lock:
+            self._tasks[name] = task
+            self._push(task, time.monotonic() + first)
+        self._wakeup.set()
+        return task
+
+    def set_interval(self, name: str, interval: float):
+        """
+        Change a task's interval, rescheduling it from its last run
+
+        Args:
+            name: Task name
+            interval: New interval in seconds
+        """
+        with self._lock:
+            task = self._tasks.get(name)
+            if not task or interval <= 0 or task.interval == interval:
+                return
+            logger.info(f"Task '{name}' interval changed: {task.interval}s -> {interval}s")
+            task.interval = interval
+            base = task.last_run if task.last_run is not None else time.monotonic()
+            self._push(task, max(base + interval, time.monotonic()), jitter=False)
+        self._wakeup.set()
+
+    def remove(self, name: str):
+        """Remove a task; it won't run again"""
+        with self._lock:
+            task = self._tasks.pop(name, None)
+            if task:
+                # Invalidates its queued heap entry
+                task.generation += 1
+
+    def has_task(self, name: str) -> bool:
+        """Return True if a task with this name is scheduled"""
+        with self._lock:
+            return name in self._tasks
+
+    def task_names(self):
+        """Names of all scheduled tasks"""
+        with self._lock:
+            return list(self._tasks)
+
+    def run_now(self, name: str):
+        """Make a task due immediately"""
+        with self._lock:
+            task = self._tasks.get(name)
+            if task:
+                self._push(task, time.monotonic(), jitter=False)
+        self._wakeup.set()
+
+    def run_forever(self):
+        """Run due tasks until stop() is called"""
+        self._running = True
+        while self._running:
+            self.run_pending()
+            self._wait()
+
+    def stop(self):
+        """Stop run_forever() after the current task"""
+        self._running = False
+        self._wakeup.set()
+
+    def run_pending(self):
+        """Run every task whose deadline had passed when called"""
+        now = time.monotonic()
+        while True:
+            with self._lock:
+                task = self._pop_due(now)
+            if task is None:
+                return
+            self._run(task)
+
+    def next_deadline(self) -> Optional[float]:
+        """Monotonic time of the next due task, or None if idle"""
+        with self._lock:
+            self._drop_stale()
+            return self._queue[0][0] if self._queue else None
+
+    def stats(self) -> dict:
+        """Return per-task run and missed-deadline counters"""
+        with self._lock:
+            return {
+                'wakeups': self.wakeups,
+                'tasks': {
+                    name: {'interval': task.interval, 'runs': task.runs, 'missed': task.missed}
+                    for name, task in self._tasks.items()
+                }
+            }
+
+    def _run(self, task: ScheduledTask):
+        started = time.monotonic()
+        try:
+            task.func()
+        except Exception as e:
+            logger.error(f"Task '{task.name}' failed: {e}", exc_info=True)
+        task.runs += 1
+        task.last_run = started
+
+        # Next deadline is relative to the previous one so runs don't
+        # drift. If we fell behind, the missed runs coalesce into a
+        # single immediate run.
+        with self._lock:
+            if self._tasks.get(task.name) is not task:
+                return
+            deadline = task.deadline + task.interval
+            now = time.monotonic()
+            if deadline <= now:
+                skipped = int((now - deadline) // task.interval)
+                if skipped:
+                    task.missed += skipped
+                    logger.warning(f"Task '{task.name}' fell behind, coalescing {skipped} missed run(s)")
+                deadline = now
+                self._push(task, deadline, jitter=False)
+            else:
+                self._push(task, deadline)
+
+    def _wait(self):
+        deadline = self.next_deadline()
+        timeout = None if deadline is None else max(0, deadline - time.monotonic())
+        self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        self.wakeups += 1
+
+    def _push(self, task: ScheduledTask, deadline: float, jitter: bool = True):
+        task.generation += 1
+        task.deadline = deadline
+        due = deadline + (self._jitter(task) if jitter else 0)
+        self._seq += 1
+        heapq.heappush(self._queue, (due, self._seq, task, task.generation))
+
+    def _pop_due(self, now: float) -> Optional[ScheduledTask]:
+        self._drop_stale()
+        if self._queue and self._queue[0][0] <= now:
+            return heapq.heappop(self._queue)[2]
+        return None
+
+    def _drop_stale(self):
+        while self._queue and self._queue[0][3] != self._queue[0][2].generation:
+            heapq.heappop(self._queue)
+
+    @staticmethod
+    def _jitter(task: ScheduledTask) -> float:
+        return random.uniform(0, task.jitter) if task.jitter else 0
@@ -0,0 +1,234 @@
+"""
+State Store - Agent state persisted across restarts
+Keeps the claim status, last config and the packed frame last shown on the
+panel next to the device id, so a claimed device can boot straight into its
+main loop. Writes are atomic and fsynced, and the state is versioned and
+size-bounded so a bad file can only ever cost a full boot.
+"""
+import os
+import json
+import time
+import hashlib
+import tempfile
+import threading
+import logging
+from typing import Optional, Dict, Any, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Bumped when the layout of the state changes; older state is discarded
+STATE_VERSION = 1
+
+def write_atomic(path: str, data: bytes):
+    """
+    Replace a file with new contents so a crash leaves the old or the new
+    file, never a torn one
+
+    The data and the rename are both flushed to disk, since the Pi is
+    often powered off without a shutdown. Each write gets its own temp
+    file, so concurrent writers can't interleave in one.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            os.fchmod(f.fileno(), 0o644)
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+    try:
+        dir_fd = os.open(os.path.dirname(path), os.O_RDONLY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+    except OSError:
+        pass
+
+def get_digest(value) -> str:
+    """Hex SHA-256 of a JSON-serializable value (key order doesn't matter)"""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.sha256(encoded).hexdigest()
+
+class StateStore:
+    def __init__(self, state_file: str = '/etc/lumy/state.json', frame_file: str = '/etc/lumy/boot_frame.bin',
+                 max_bytes: int = 256 * 1024):
+        """
+        Args:
+            state_file: JSON file holding claim status and config
+            frame_file: Packed panel buffer of the frame last shown
+            max_bytes: Largest config saved; a bigger one isn't kept, so
+                the next boot fetches it again
+        """
+        self.state_file = state_file
+        self.frame_file = frame_file
+        self.max_bytes = max_bytes
+        self._state = {}
+        self._lock = threading.Lock()
+        # Held from snapshot to rename, so an older snapshot never replaces
+        # a newer one (the display worker and the main thread both save)
+        self._write_lock = threading.Lock()
+        self._load()
+
+    def get(self, key: str, default=None):
+        with self._lock:
+            return self._state.get(key, default)
+
+    def update(self, **fields):
+        """Change fields and persist the state"""
+        with self._write_lock:
+            with self._lock:
+                self._state.update(fields)
+                self._state['saved_at'] = time.time()
+                snapshot = dict(self._state)
+            self._save(snapshot)
+
+    def is_claimed(self, device_id: str) -> bool:
+        """Return True if the device was claimed when last checked"""
+        with self._lock:
+            return bool(self._state.get('claimed')) and self._state.get('device_id') == device_id
+
+    def save_config(self, device_config: Dict[str, Any], etag: Optional[str] = None):
+        """
+        Persist the device config with its digest and ETag
+
+        Nothing is written when both are unchanged, so routine config
+        refreshes don't wear the SD card.
+        """
+        digest = get_digest(device_config)
+        with self._lock:
+            if digest == self._state.get('config_digest') and etag == self._state.get('config_etag'):
+                return
+            saved = self._state.get('config') is not None
+        size = len(json.dumps(device_config))
+        if size > self.max_bytes:
+            logger.warning(f"Config is {size} bytes (limit {self.max_bytes}), not saving it for fast boot")
+            if saved:
+                self.update(config=None, config_digest=None, config_etag=None)
+            return
+        self.update(config=device_config, config_digest=digest, config_etag=etag)
+
+    def load_config(self) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """
+        Returns:
+            Tuple of (saved config, its ETag), or (None, None) if there is
+            none or it doesn't match its digest
+        """
+        with self._lock:
+            device_config = self._state.get('config')
+            digest = self._state.get('config_digest')
+            etag = self._state.get('config_etag')
+        if not device_config:
+            return None, None
+        if get_digest(device_config) != digest:
+            logger.warning("Saved config doesn't match its digest, ignoring it")
+            return None, None
+        return device_config, etag
+
+    def save_frame(self, buffer, frame_hash: str):
+        """
+        Persist the packed buffer now on the panel
+
+        e-paper keeps its image without power, so after a restart this is
+        still what the panel shows.
+
+        Args:
+            buffer: Packed buffer as sent to the panel
+            frame_hash: SHA-1 of the buffer (DisplayManager.frame_hash)
+        """
+        try:
+            write_atomic(self.frame_file, bytes(buffer))
+        except PermissionError:
+            alt_path = self._fallback_path(self.frame_file)
+            try:
+                write_atomic(alt_path, bytes(buffer))
+                self.frame_file = alt_path
+            except Exception as e:
+                logger.error(f"Could not save boot frame: {e}")
+                return
+        except Exception as e:
+            logger.error(f"Error saving boot frame: {e}")
+            return
+        self.update(frame_hash=frame_hash, frame_file=self.frame_file)
+
+    def load_frame(self, size: int) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Load the packed buffer last shown on the panel
+
+        Args:
+            size: Expected buffer length in bytes
+
+        Returns:
+            Tuple of (buffer, frame hash), or (None, None) if unknown or
+            the file doesn't match the saved hash
+        """
+        frame_hash = self.get('frame_hash')
+        if not frame_hash:
+            return None, None
+        path = self.get('frame_file') or self.frame_file
+        try:
+            if os.path.getsize(path) != size:
+                logger.warning(f"Boot frame {path} has the wrong size, ignoring it")
+                return None, None
+            with open(path, 'rb') as f:
+                buffer = f.read()
+        except FileNotFoundError:
+            return None, None
+        except Exception as e:
+            logger.warning(f"Could not read boot frame {path}: {e}")
+            return None, None
+        if hashlib.sha1(buffer).hexdigest() != frame_hash:
+            logger.warning("Boot frame doesn't match the saved hash, ignoring it")
+            return None, None
+        return buffer, frame_hash
+
+    def clear_frame(self):
+        """Forget the saved frame, e.g. before drawing something else directly"""
+        if self.get('frame_hash'):
+            self.update(frame_hash=None)
+
+    def _load(self):
+        """Load persisted state, ignoring a missing, corrupt or outdated file"""
+        for path in (self.state_file, self._fallback_path(self.state_file)):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    state = json.load(f)
+            except Exception as e:
+                logger.warning(f"Could not read agent state {path}: {e}")
+                continue
+            self.state_file = path
+            if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+                logger.warning(f"Agent state {path} is from another version, starting fresh")
+                return
+            self._state = state
+            logger.info(f"Loaded agent state from {path}")
+            return
+
+    def _save(self, state):
+        """Write the state atomically, falling back to ~/.cache/lumy"""
+        state['version'] = STATE_VERSION
+        data = json.dumps(state).encode()
+        try:
+            write_atomic(self.state_file, data)
+        except PermissionError:
+            alt_path = self._fallback_path(self.state_file)
+            try:
+                write_atomic(alt_path, data)
+                self.state_file = alt_path
+            except Exception as e:
+                logger.error(f"Could not save agent state: {e}")
+        except Exception as e:
+            logger.error(f"Error saving agent state: {e}")
+
+    @staticmethod
+    def _fallback_path(path):
+        return os.path.join(os.path.expanduser('~/.cache/lumy'), os.path.basename(path))
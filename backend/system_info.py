@@ -0,0 +1,128 @@
+"""
+System Info - Collects device metrics for heartbeats
+Reads procfs/sysfs directly instead of spawning cat, iwconfig, timedatectl and free
+"""
+import os
+import logging
+
+logger = logging.getLogger(__name__)
+
+class SystemInfoCollector:
+    def __init__(self, interface: str = 'wlan0'):
+        """
+        Args:
+            interface: Network interface used for MAC address and WiFi signal
+        """
+        self.interface = interface
+        # Values that don't change while running (MAC, OS, timezone)
+        self._static_info = None
+
+    def collect(self) -> dict:
+        """
+        Collect system information
+
+        Returns:
+            Dictionary with mac_address, wifi_signal, firmware, timezone,
+            uptime, cpu_temp and memory_usage
+        """
+        if self._static_info is None:
+            self._static_info = {
+                'mac_address': self._read_mac_address(),
+                'firmware': self._read_firmware(),
+                'timezone': self._read_timezone()
+            }
+
+        info = {
+            'mac_address': self._static_info['mac_address'],
+            'wifi_signal': self._read_wifi_signal(),
+            'firmware': self._static_info['firmware'],
+            'timezone': self._static_info['timezone'],
+            'uptime': self._read_uptime(),
+            'cpu_temp': self._read_cpu_temp(),
+            'memory_usage': self._read_memory_usage()
+        }
+        return info
+
+    def refresh_static(self):
+        """Force MAC, OS version and timezone to be re-read on next collect"""
+        self._static_info = None
+
+    def _read_mac_address(self) -> str:
+        try:
+            with open(f'/sys/class/net/{self.interface}/address', 'r') as f:
+                return f.read().strip().upper()
+        except Exception:
+            return 'Unknown'
+
+    def _read_firmware(self) -> str:
+        try:
+            with open('/etc/os-release', 'r') as f:
+                for line in f:
+                    if line.startswith('PRETTY_NAME='):
+                        return line.split('=')[1].strip().strip('"')
+            return 'Raspberry Pi OS'
+        except Exception:
+            return 'Unknown'
+
+    def _read_timezone(self) -> str:
+        # /etc/localtime is a symlink into the zoneinfo database
+        try:
+            target = os.path.realpath('/etc/localtime')
+            marker = '/zoneinfo/'
+            if marker in target:
+                return target.split(marker, 1)[1]
+        except Exception:
+            pass
+
+        try:
+            with open('/etc/timezone', 'r') as f:
+                tz = f.read().strip()
+                if tz:
+                    return tz
+        except Exception:
+            pass
+
+        return 'UTC'
+
+    def _read_wifi_signal(self) -> str:
+        # /proc/net/wireless: "wlan0: 0000   54.  -56.  -256 ..."
+        try:
+            with open('/proc/net/wireless', 'r') as f:
+                for line in f:
+                    if line.strip().startswith(f'{self.interface}:'):
+                        fields = line.split(':', 1)[1].split()
+                        return str(int(float(fields[2])))
+        except Exception:
+            pass
+        return 'Unknown'
+
+    def _read_uptime(self) -> int:
+        try:
+            with open('/proc/uptime', 'r') as f:
+                return int(float(f.read().split()[0]))
+        except Exception:
+            return 0
+
+    def _read_cpu_temp(self):
+        try:
+            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
+                return round(float(f.read()) / 1000.0, 1)
+        except Exception:
+            return None
+
+    def _read_memory_usage(self):
+        # Used memory as reported by free: MemTotal - MemAvailable
+        try:
+            meminfo = {}
+            with open('/proc/meminfo', 'r') as f:
+                for line in f:
+                    key, value = line.split(':', 1)
+                    if key in ('MemTotal', 'MemAvailable'):
+                        meminfo[key] = int(value.split()[0])
+                        if len(meminfo) == 2:
+                            break
+            total = meminfo['MemTotal']
+            used = total - meminfo['MemAvailable']
+            return round((used / total) * 100, 1)
+        except Exception:
+            return None
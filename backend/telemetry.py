@@ -0,0 +1,230 @@
+"""
+Telemetry - Buffers heartbeat samples on disk and uploads them in batches
+Samples survive outages and reboots until a batch upload acknowledges them;
+when the buffer is full, the oldest samples are dropped. In write-back mode
+samples stay in memory until an upload fails, so a healthy device doesn't
+touch the SD card every heartbeat.
+"""
+import os
+import json
+import time
+import random
+import threading
+import logging
+from collections import deque
+from typing import Optional, Dict, Any, List
+from metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+class TelemetryQueue:
+    def __init__(self, queue_file: str = '/etc/lumy/telemetry.jsonl', max_records: int = 1440,
+                 write_through: bool = True):
+        """
+        Args:
+            queue_file: JSON lines file the queue is persisted to
+            max_records: Samples kept before the oldest are dropped
+                (1440 is a day of one-minute heartbeats)
+            write_through: Write every sample to disk as it is added. If
+                False, samples are only written once persist() is called
+                (after a failed upload) and while a backlog is on disk
+        """
+        self.queue_file = queue_file
+        self.max_records = max_records
+        self.write_through = write_through
+        self._records = deque(maxlen=max_records)
+        self._file_lines = 0
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self._load()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._records)
+
+    def append(self, record: Dict[str, Any]):
+        """Add a sample, dropping the oldest if the queue is full"""
+        line = json.dumps(record, separators=(',', ':'))
+        with self._lock:
+            if len(self._records) == self.max_records:
+                self.dropped += 1
+            self._records.append(record)
+            if not self.write_through and self._file_lines == 0:
+                return
+            # Appending is cheap; the file is compacted once it holds
+            # twice as many lines as the queue
+            if self._file_lines >= 2 * self.max_records:
+                self._rewrite()
+            else:
+                self._append_line(line)
+
+    def peek(self, limit: int) -> List[Dict[str, Any]]:
+        """Get up to limit of the oldest samples without removing them"""
+        with self._lock:
+            return [self._records[i] for i in range(min(limit, len(self._records)))]
+
+    def ack(self, count: int):
+        """Remove the oldest count samples once they've been uploaded"""
+        with self._lock:
+            for _ in range(min(count, len(self._records))):
+                self._records.popleft()
+            if self.write_through or self._file_lines:
+                self._rewrite()
+
+    def persist(self):
+        """Write samples held only in memory to disk, e.g. after a failed upload"""
+        with self._lock:
+            if self._file_lines != len(self._records):
+                self._rewrite()
+
+    def _load(self):
+        """Load persisted samples, skipping corrupt lines"""
+        for path in (self.queue_file, self._fallback_path()):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    for line in f:
+                        self._file_lines += 1
+                        try:
+                            self._records.append(json.loads(line))
+                        except ValueError:
+                            continue
+                self.queue_file = path
+                logger.info(f"Loaded {len(self._records)} queued telemetry samples from {path}")
+                return
+            except Exception as e:
+                logger.warning(f"Could not read telemetry queue {path}: {e}")
+
+    def _append_line(self, line):
+        try:
+            self._open_append(self.queue_file, line)
+        except PermissionError:
+            self.queue_file = self._fallback_path()
+            self._rewrite()
+            return
+        except Exception as e:
+            logger.error(f"Error saving telemetry sample: {e}")
+            return
+        self._file_lines += 1
+
+    @staticmethod
+    def _open_append(path, line):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'a') as f:
+            f.write(line + '\n')
+
+    def _rewrite(self):
+        """Write the whole queue atomically"""
+        try:
+            os.makedirs(os.path.dirname(self.queue_file), exist_ok=True)
+            tmp_path = f"{self.queue_file}.tmp"
+            with open(tmp_path, 'w') as f:
+                for record in self._records:
+                    f.write(json.dumps(record, separators=(',', ':')) + '\n')
+            os.replace(tmp_path, self.queue_file)
+            self._file_lines = len(self._records)
+        except PermissionError:
+            if self.queue_file != self._fallback_path():
+                self.queue_file = self._fallback_path()
+                self._rewrite()
+            else:
+                logger.error("Could not save telemetry queue: permission denied")
+        except Exception as e:
+            logger.error(f"Error saving telemetry queue: {e}")
+
+    @staticmethod
+    def _fallback_path():
+        return os.path.expanduser('~/.cache/lumy/telemetry.jsonl')
+
+    def get_stats(self) -> Dict[str, int]:
+        """Queue depth and drops for the heartbeat"""
+        with self._lock:
+            return {
+                'queued': len(self._records),
+                'dropped': self.dropped
+            }
+
+class TelemetryUploader:
+    def __init__(self, queue: TelemetryQueue, api_client, device_id: str,
+                 batch_size: int = 60, retry_interval: float = 30, max_backoff: float = 900):
+        """
+        Args:
+            queue: Queue of samples waiting to be uploaded
+            api_client: LumyAPIClient used to post batches
+            device_id: Unique device identifier
+            batch_size: Most samples sent in one request
+            retry_interval: Seconds before the first retry after a failure
+            max_backoff: Longest wait between retries
+        """
+        self.queue = queue
+        self.api_client = api_client
+        self.device_id = device_id
+        self.batch_size = batch_size
+        self.retry_interval = retry_interval
+        self.max_backoff = max_backoff
+        self.failures = 0
+        self._next_attempt = 0.0
+
+    def record(self, system_info: Dict[str, Any], widgets: Optional[Dict[str, Any]] = None,
+               display_preview_hash: Optional[str] = None):
+        """Queue a heartbeat sample"""
+        self.queue.append({
+            'ts': round(time.time(), 1),
+            'status': 'online',
+            'system': system_info or {},
+            'widgets': widgets or {},
+            'display_preview_hash': display_preview_hash
+        })
+
+    def backing_off(self) -> bool:
+        """True while waiting out a failure or a server Retry-After"""
+        return time.monotonic() < self._next_attempt
+
+    def flush(self, display_preview: Optional[str] = None, display_preview_hash: Optional[str] = None) -> bool:
+        """
+        Upload queued samples in batches, oldest first
+
+        The preview (if any) goes with the first batch. Samples are only
+        removed from the queue once the server accepts them, or rejects
+        them in a way no retry can fix. On other failures, uploads pause
+        for the server's Retry-After, or else an exponential backoff.
+
+        Returns:
+            True if the queue was fully flushed
+        """
+        if self.backing_off():
+            metrics.incr('telemetry.deferred')
+            return False
+
+        while len(self.queue):
+            records = self.queue.peek(self.batch_size)
+            with metrics.span('telemetry.flush'):
+                sent = self.api_client.send_telemetry_batch(self.device_id, records, display_preview, display_preview_hash)
+            if not sent and self.api_client.batch_rejected:
+                # Resending can't succeed, so drop the batch instead of
+                # blocking the queue behind it forever
+                self.queue.ack(len(records))
+                metrics.incr('telemetry.samples_rejected', len(records))
+                logger.warning(f"Dropped {len(records)} telemetry samples the dashboard rejected")
+                continue
+            if not sent:
+                self.queue.persist()
+                self._back_off(self.api_client.retry_after)
+                return False
+            self.queue.ack(len(records))
+            self.failures = 0
+            display_preview = None
+            metrics.incr('telemetry.samples_sent', len(records))
+        return True
+
+    def _back_off(self, retry_after: Optional[float]):
+        self.failures += 1
+        if retry_after is not None:
+            delay = min(retry_after, self.max_backoff)
+        else:
+            delay = min(self.max_backoff, self.retry_interval * 2 ** (self.failures - 1))
+            # Spread retries so a fleet recovering from an outage doesn't stampede
+            delay *= random.uniform(0.8, 1.2)
+        self._next_attempt = time.monotonic() + delay
+        logger.warning(f"Telemetry upload failed, {len(self.queue)} samples queued, retrying in {delay:.0f}s")
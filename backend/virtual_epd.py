@@ -0,0 +1,126 @@
+"""
+Virtual EPD - Stand-in for the Waveshare epd7in3e driver
+Same init/getbuffer/display/Clear/sleep interface; frames are written to
+disk as PNG or raw buffers so the agent runs without a panel
+"""
+import os
+import time
+import logging
+from typing import Optional
+import frame_packer
+
+logger = logging.getLogger(__name__)
+
+EPD_WIDTH = 800
+EPD_HEIGHT = 480
+
+# Approximate time the 7.3inch (E) panel takes for a full refresh
+REFRESH_LATENCY = 12.0
+
+FORMATS = ('png', 'raw', 'none')
+
+class EPD:
+    # Colour values, as in the driver
+    BLACK = 0x000000
+    WHITE = 0xffffff
+    YELLOW = 0x00ffff
+    RED = 0x0000ff
+    BLUE = 0xff0000
+    GREEN = 0x00ff00
+
+    def __init__(self, output_dir: Optional[str] = None, fmt: str = 'png',
+                 latency: float = REFRESH_LATENCY, keep_frames: bool = False):
+        """
+        Args:
+            output_dir: Directory frames are written to (None to not write)
+            fmt: 'png', 'raw' (the packed buffer) or 'none'
+            latency: Seconds display() and Clear() block, like a real refresh
+            keep_frames: Write every frame to its own numbered file instead
+                of overwriting latest.png / latest.bin
+        """
+        if fmt not in FORMATS:
+            logger.warning(f"Unknown virtual display format '{fmt}', using png")
+            fmt = 'png'
+        self.width = EPD_WIDTH
+        self.height = EPD_HEIGHT
+        self.output_dir = output_dir
+        self.fmt = fmt if output_dir else 'none'
+        self.latency = latency
+        self.keep_frames = keep_frames
+
+        self.frames = 0
+        self.busy_time = 0.0
+        self.asleep = False
+
+    def init(self):
+        """Initialize the panel"""
+        if self.output_dir:
+            os.makedirs(self.output_dir, exist_ok=True)
+        self.asleep = False
+        logger.info(f"Virtual display initialized ({self.fmt} output, {self.latency}s refresh)")
+        return 0
+
+    def getbuffer(self, image):
+        """Pack an image into the panel buffer, like the driver (always dithered)"""
+        if frame_packer.is_available():
+            return frame_packer.pack_image(image, self.width, self.height, dither=True)
+
+        image = frame_packer.orient(image, self.width, self.height)
+        indices = image.convert('RGB').quantize(palette=frame_packer.get_palette_image()).tobytes()
+        return bytearray((indices[i] << 4) | indices[i + 1] for i in range(0, len(indices), 2))
+
+    def display(self, image):
+        """
+        Show a packed buffer: simulate the refresh and write the frame
+
+        Args:
+            image: Packed buffer from getbuffer()
+        """
+        expected = self.width * self.height // 2
+        if len(image) != expected:
+            raise ValueError(f"Buffer is {len(image)} bytes, expected {expected}")
+        self._refresh(image)
+
+    def Clear(self, color=0x1):
+        """Fill the panel with one palette index (default white)"""
+        self._refresh(bytearray([(color << 4) | color]) * (self.width * self.height // 2))
+
+    def sleep(self):
+        """Put the panel to sleep"""
+        self.asleep = True
+        logger.info("Virtual display sleeping")
+
+    def _refresh(self, buffer):
+        if self.asleep:
+            logger.warning("Virtual display refreshed while asleep (call init() first)")
+        start = time.monotonic()
+        self._write(buffer)
+        remaining = self.latency - (time.monotonic() - start)
+        if remaining > 0:
+            time.sleep(remaining)
+        self.frames += 1
+        self.busy_time += time.monotonic() - start
+
+    def _write(self, buffer):
+        if self.fmt == 'none':
+            return
+        if self.keep_frames:
+            name = f"frame-{self.frames + 1:05d}"
+        else:
+            name = 'latest'
+        path = os.path.join(self.output_dir, f"{name}.{'png' if self.fmt == 'png' else 'bin'}")
+        tmp_path = path + '.tmp'
+        if self.fmt == 'png':
+            frame_packer.buffer_to_image(buffer, self.width, self.height).save(tmp_path, format='PNG')
+        else:
+            with open(tmp_path, 'wb') as f:
+                f.write(bytes(buffer))
+        # Atomic so viewers never see a half-written frame
+        os.replace(tmp_path, path)
+
+    def get_stats(self):
+        """Frames shown and time spent refreshing"""
+        return {
+            'frames': self.frames,
+            'busy_s': round(self.busy_time, 3)
+        }
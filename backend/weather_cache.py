@@ -0,0 +1,133 @@
+"""
+Weather Cache - TTL cache for weather responses, persisted to disk
+Lets the device show weather right after a reboot and ride out outages
+"""
+import os
+import json
+import time
+import threading
+import logging
+from typing import Optional, Dict, Any
+from state_store import write_atomic
+
+logger = logging.getLogger(__name__)
+
+class WeatherCache:
+    def __init__(self, cache_file: str = '/etc/lumy/weather_cache.json', ttl: int = 600, max_entries: int = 32):
+        """
+        Create a weather cache
+
+        Args:
+            cache_file: JSON file the cache is persisted to
+            ttl: Seconds an entry is considered fresh
+            max_entries: Locations kept; the least recently fetched are
+                dropped first, so old layouts don't grow the file forever
+        """
+        self.cache_file = cache_file
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+        # Held from snapshot to rename, so an older snapshot never replaces a newer one
+        self._write_lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def make_key(lat: float, lon: float, units: str) -> str:
+        """Build a cache key from location and units"""
+        return f"{lat:.4f},{lon:.4f},{units}"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Get a fresh entry
+
+        Returns:
+            Cached weather data if younger than the TTL, otherwise None
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and self._is_fresh(entry):
+            return entry['data']
+        return None
+
+    def get_stale(self, key: str) -> Optional[Dict[str, Any]]:
+        """Get an entry regardless of age (None if never cached)"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return entry['data'] if entry else None
+
+    def age(self, key: str) -> Optional[float]:
+        """Seconds since the entry was stored, or None if missing"""
+        with self._lock:
+            entry = self._entries.get(key)
+        return time.time() - entry['fetched_at'] if entry else None
+
+    def set(self, key: str, data: Dict[str, Any]):
+        """Store an entry and persist the cache to disk"""
+        with self._write_lock:
+            with self._lock:
+                self._entries[key] = {'fetched_at': time.time(), 'data': data}
+                self._evict()
+                snapshot = dict(self._entries)
+            self._save(snapshot)
+
+    def set_many(self, entries: Dict[str, Dict[str, Any]]):
+        """Store several entries with a single write to disk"""
+        now = time.time()
+        with self._write_lock:
+            with self._lock:
+                for key, data in entries.items():
+                    self._entries[key] = {'fetched_at': now, 'data': data}
+                self._evict()
+                snapshot = dict(self._entries)
+            self._save(snapshot)
+
+    def _evict(self):
+        """Drop the oldest entries beyond max_entries (lock held)"""
+        excess = len(self._entries) - self.max_entries
+        if excess > 0:
+            oldest = sorted(self._entries, key=lambda key: self._entries[key]['fetched_at'])[:excess]
+            for key in oldest:
+                del self._entries[key]
+
+    def _is_fresh(self, entry) -> bool:
+        age = time.time() - entry['fetched_at']
+        # A negative age means the clock moved backwards (e.g. no RTC
+        # before NTP sync), so the entry can't be trusted as fresh
+        return 0 <= age < self.ttl
+
+    def _load(self):
+        """Load persisted entries, ignoring a missing or corrupt file"""
+        for path in (self.cache_file, self._fallback_path()):
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r') as f:
+                    self._entries = json.load(f)
+                self.cache_file = path
+                logger.info(f"Loaded {len(self._entries)} cached weather entries from {path}")
+                return
+            except Exception as e:
+                logger.warning(f"Could not read weather cache {path}: {e}")
+
+    def _save(self, entries):
+        """Write entries atomically, falling back to ~/.cache/lumy"""
+        try:
+            self._write(self.cache_file, entries)
+        except PermissionError:
+            alt_path = self._fallback_path()
+            try:
+                self._write(alt_path, entries)
+                self.cache_file = alt_path
+            except Exception as e:
+                logger.error(f"Could not save weather cache: {e}")
+        except Exception as e:
+            logger.error(f"Error saving weather cache: {e}")
+
+    @staticmethod
+    def _write(path, entries):
+        write_atomic(path, json.dumps(entries).encode())
+
+    @staticmethod
+    def _fallback_path():
+        return os.path.expanduser('~/.cache/lumy/weather_cache.json')
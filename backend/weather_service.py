@@ -0,0 +1,318 @@
+"""
+Weather Service - Shared Open-Meteo weather data for every weather widget
+Misses for several locations are fetched in one batched request, concurrent
+requests for the same location share one fetch, and results are cached per location
+"""
+import threading
+import logging
+from typing import Optional, Dict, Any, List
+import requests
+from weather_cache import WeatherCache
+from metrics import metrics, span
+
+logger = logging.getLogger(__name__)
+
+API_URL = "https://api.open-meteo.com/v1/forecast"
+
+# Most coordinates sent in one request
+MAX_BATCH_LOCATIONS = 50
+
+# Tracked locations whose cached data is older than this fraction of the
+# TTL are fetched along with any other request, so widgets sharing a
+# refresh interval cost one round trip between them
+REFRESH_AHEAD = 0.5
+
+class Location:
+    def __init__(self, lat: float, lon: float, name: str = '',
+                 temperature_unit: str = 'fahrenheit', wind_speed_unit: str = 'mph'):
+        """
+        Args:
+            lat: Latitude in degrees
+            lon: Longitude in degrees
+            name: Label shown on the widget
+            temperature_unit: Open-Meteo temperature unit
+            wind_speed_unit: Open-Meteo wind speed unit
+        """
+        self.lat = lat
+        self.lon = lon
+        self.name = name
+        self.temperature_unit = temperature_unit
+        self.wind_speed_unit = wind_speed_unit
+
+    @property
+    def units(self) -> str:
+        return f"{self.temperature_unit}/{self.wind_speed_unit}"
+
+    @property
+    def key(self) -> str:
+        """Cache key for this location and units"""
+        return WeatherCache.make_key(self.lat, self.lon, self.units)
+
+    def __repr__(self):
+        return f"Location({self.name or self.key})"
+
+# St. Paul, MN: 44.9537°N, 93.0900°W
+DEFAULT_LOCATION = Location(44.9537, -93.0900, "St. Paul, MN")
+
+def parse_forecast(data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert one location's Open-Meteo response into widget data
+
+    Returns:
+        Current conditions, today's UV index and precipitation chance,
+        and a 5-day forecast starting tomorrow
+    """
+    current = data.get('current', {})
+    daily = data.get('daily', {})
+
+    weather_info = {
+        'temperature': round(current.get('temperature_2m', 0)),
+        'humidity': current.get('relative_humidity_2m', 0),
+        'wind_speed': round(current.get('wind_speed_10m', 0)),
+        'weather_code': current.get('weather_code', 0),
+        'precipitation': current.get('precipitation', 0),
+        'time': current.get('time', ''),
+        'uv_index': 0,
+        'precipitation_chance': 0,
+        'forecast': []
+    }
+
+    # Get today's UV and precipitation
+    if daily:
+        uv_indices = daily.get('uv_index_max', [])
+        precip_probs = daily.get('precipitation_probability_max', [])
+
+        if len(uv_indices) > 0:
+            weather_info['uv_index'] = round(uv_indices[0])
+        if len(precip_probs) > 0:
+            weather_info['precipitation_chance'] = precip_probs[0]
+
+    # Parse 5-day forecast (skip today, get next 5 days)
+    if daily:
+        times = daily.get('time', [])
+        codes = daily.get('weather_code', [])
+        max_temps = daily.get('temperature_2m_max', [])
+        min_temps = daily.get('temperature_2m_min', [])
+
+        for i in range(1, min(6, len(times))):  # Start from index 1 (tomorrow)
+            weather_info['forecast'].append({
+                'date': times[i],
+                'weather_code': codes[i] if i < len(codes) else 0,
+                'temp_max': round(max_temps[i]) if i < len(max_temps) else 0,
+                'temp_min': round(min_temps[i]) if i < len(min_temps) else 0,
+            })
+
+    return weather_info
+
+class _PendingFetch:
+    """A fetch in progress that other callers can wait on"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+
+class WeatherService:
+    def __init__(self, weather_cache: Optional[WeatherCache] = None, api_url: str = API_URL,
+                 timeout: float = 30, session: Optional[requests.Session] = None):
+        """
+        Args:
+            weather_cache: Optional WeatherCache for parsed results
+            api_url: Open-Meteo forecast endpoint
+            timeout: Seconds to wait for a response
+            session: Optional requests session (keeps the connection alive)
+        """
+        self.cache = weather_cache
+        self.api_url = api_url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._tracked = {}
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.requests_sent = 0
+        self.locations_fetched = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+
+    def set_locations(self, locations: List[Location]):
+        """
+        Set the locations currently on screen
+
+        Their data is refreshed ahead of time whenever another location
+        is fetched (see REFRESH_AHEAD).
+        """
+        with self._lock:
+            self._tracked = {location.key: location for location in locations}
+
+    def is_fresh(self, location: Location) -> bool:
+        """Return True if the cache holds fresh data for the location"""
+        return bool(self.cache and self.cache.get(location.key))
+
+    def get_cached(self, location: Location) -> Optional[Dict[str, Any]]:
+        """Return the last cached data of any age, or None"""
+        if not self.cache:
+            return None
+        return self.cache.get_stale(location.key)
+
+    def get(self, location: Location) -> Optional[Dict[str, Any]]:
+        """
+        Get weather for one location (see get_many)
+
+        Returns:
+            Weather data, or None if it couldn't be fetched and nothing is cached
+        """
+        return self.get_many([location]).get(location.key)
+
+    def get_many(self, locations: List[Location]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """
+        Get weather for several locations
+
+        Fresh cached data is returned as is. Misses are fetched together,
+        along with tracked locations due for a refresh; a location already
+        being fetched by another thread is waited on rather than fetched
+        again. If a fetch fails, stale cached data is returned instead.
+
+        Returns:
+            Dict of location key -> weather data (None if unavailable)
+        """
+        results = {}
+        waiting = {}
+        to_fetch = []
+        with self._lock:
+            for location in locations:
+                key = location.key
+                if key in results or key in waiting:
+                    continue
+                data = self.cache.get(key) if self.cache else None
+                if data:
+                    results[key] = data
+                    self.cache_hits += 1
+                    metrics.incr('weather.cache_hit')
+                elif key in self._in_flight:
+                    waiting[key] = self._in_flight[key]
+                    self.coalesced += 1
+                    metrics.incr('weather.coalesced')
+                else:
+                    self._in_flight[key] = _PendingFetch()
+                    to_fetch.append(location)
+
+            if to_fetch and self.cache:
+                # Piggyback tracked locations that will expire soon
+                for key, location in self._tracked.items():
+                    if key in self._in_flight or key in results:
+                        continue
+                    age = self.cache.age(key)
+                    if age is None or not 0 <= age < self.cache.ttl * REFRESH_AHEAD:
+                        self._in_flight[key] = _PendingFetch()
+                        to_fetch.append(location)
+
+        if to_fetch:
+            results.update(self._fetch_and_release(to_fetch))
+
+        for key, pending in waiting.items():
+            pending.done.wait(self.timeout * 2)
+            results[key] = pending.data
+
+        return {location.key: results.get(location.key) for location in locations}
+
+    def _fetch_and_release(self, locations: List[Location]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """Fetch locations this thread claimed and hand the results to anyone waiting"""
+        fetched = {}
+        try:
+            fetched = self._request_all(locations)
+            if self.cache and fetched:
+                self.cache.set_many(fetched)
+        finally:
+            results = {}
+            for location in locations:
+                key = location.key
+                data = fetched.get(key)
+                if data is None and self.cache:
+                    data = self.cache.get_stale(key)
+                    if data:
+                        logger.warning(f"Using stale weather data for {location.name or key} ({int(self.cache.age(key))}s old)")
+                results[key] = data
+                with self._lock:
+                    pending = self._in_flight.pop(key, None)
+                if pending:
+                    pending.data = data
+                    pending.done.set()
+        return results
+
+    def _request_all(self, locations: List[Location]) -> Dict[str, Dict[str, Any]]:
+        """Fetch locations in as few requests as possible (units are per request)"""
+        groups = {}
+        for location in locations:
+            groups.setdefault((location.temperature_unit, location.wind_speed_unit), []).append(location)
+
+        fetched = {}
+        for group in groups.values():
+            for start in range(0, len(group), MAX_BATCH_LOCATIONS):
+                fetched.update(self._request_batch(group[start:start + MAX_BATCH_LOCATIONS]))
+        return fetched
+
+    def _request_batch(self, locations: List[Location]) -> Dict[str, Dict[str, Any]]:
+        """
+        Fetch current weather and 5-day forecasts from Open-Meteo in one request
+
+        Open-Meteo accepts comma-separated coordinate lists and then answers
+        with a list of per-location results in the same order.
+
+        Returns:
+            Dict of location key -> weather data for the locations fetched
+        """
+        first = locations[0]
+        params = {
+            'latitude': ','.join(f'{location.lat:.4f}' for location in locations),
+            'longitude': ','.join(f'{location.lon:.4f}' for location in locations),
+            'current': 'temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,precipitation',
+            'daily': 'weather_code,temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_probability_max',
+            'temperature_unit': first.temperature_unit,
+            'wind_speed_unit': first.wind_speed_unit,
+            # Each location's own timezone, so "today" is local to it
+            'timezone': 'auto',
+            'forecast_days': 6  # Get 6 days (today + 5 more)
+        }
+
+        self.requests_sent += 1
+        try:
+            with span('weather.fetch'):
+                response = self.session.get(self.api_url, params=params, timeout=self.timeout)
+
+            if response.status_code != 200:
+                logger.error(f"Weather API error: {response.status_code}")
+                metrics.incr('weather.fetch_failed')
+                return {}
+
+            data = response.json()
+            # A single location comes back as an object, several as a list
+            if isinstance(data, dict):
+                data = [data]
+            if len(data) != len(locations):
+                logger.error(f"Weather API returned {len(data)} results for {len(locations)} locations")
+                metrics.incr('weather.fetch_failed')
+                return {}
+
+            fetched = {}
+            for location, location_data in zip(locations, data):
+                fetched[location.key] = parse_forecast(location_data)
+            self.locations_fetched += len(fetched)
+            summary = ', '.join(f"{location.name or location.key} {fetched[location.key]['temperature']}°" for location in locations)
+            logger.info(f"Weather data fetched for {len(fetched)} location(s): {summary}")
+            return fetched
+
+        except Exception as e:
+            logger.error(f"Error fetching weather: {e}")
+            metrics.incr('weather.fetch_failed')
+            return {}
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Request and cache counts for the heartbeat"""
+        with self._lock:
+            tracked = len(self._tracked)
+        return {
+            'locations': tracked,
+            'requests': self.requests_sent,
+            'fetched': self.locations_fetched,
+            'cache_hits': self.cache_hits,
+            'coalesced': self.coalesced
+        }
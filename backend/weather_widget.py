@@ -1,91 +1,111 @@
 """
 Weather Widget for Lumy Display
-Displays current weather for St. Paul, Minnesota
+Displays current weather for a configured location (St. Paul, Minnesota by default)
 """
-import requests
 import logging
-from PIL import Image, ImageDraw, ImageFont
+from PIL import Image, ImageDraw
 from datetime import datetime
+from font_cache import get_font, FONT_REGULAR, FONT_BOLD
+from weather_service import WeatherService, Location, DEFAULT_LOCATION
 
 logger = logging.getLogger(__name__)
 
 class WeatherWidget:
-    def __init__(self, width=800, height=480):
+    # Widget registry metadata
+    widget_id = 'weather'
+    refresh_interval = 600  # seconds between refreshes unless the config overrides it
+    data_dependencies = ('weather_service',)
+    render_budget = None  # seconds; None uses the registry default
+    
+    # Static background layers, keyed by (width, height, city name)
+    _backgrounds = {}
+    
+    def __init__(self, width=800, height=480, weather_service=None):
+        """
+        Args:
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+            weather_service: Shared WeatherService (one without a cache is
+                created if not given)
+        """
         self.width = width
         self.height = height
         # Using Open-Meteo (free, no API key required)
-        # St. Paul, MN coordinates: 44.9537°N, 93.0900°W
-        self.lat = 44.9537
-        self.lon = -93.0900
-        self.api_url = "https://api.open-meteo.com/v1/forecast"
+        self.service = weather_service or WeatherService()
+        self.location = DEFAULT_LOCATION
+        
+        # Layout: 3 columns above a footer bar, sized to the canvas
+        # (267/266/267px on the full 800px panel)
+        self.col1_width = (width + 1) // 3  # Left section
+        self.col3_width = self.col1_width  # Right section
+        self.col2_width = width - self.col1_width - self.col3_width  # Center section
+        self.col2_x = self.col1_width
+        self.col3_x = self.col1_width + self.col2_width
+        self.footer_y = height - 35
+        self.content_height = self.footer_y - 20
+        
+        # Forecast: 5 items stacked from y=60, 76px apart
+        self.forecast_top_padding = 60
+        self.forecast_spacing = 76
+        # Day, icon, high and low within the right section: 0, 50, 105 and
+        # 160px into the 267px column, scaled to the column's width
+        scale = self.col3_width / 267
+        self.forecast_columns = tuple(round(dx * scale) for dx in (0, 50, 105, 160))
+        # Text shrinks with narrower tiles so it stays inside its column
+        self.font_scale = min(1.0, width / 800)
+        
+        # Canvas reused by every render (the background is pasted over it)
+        self._canvas = None
+    
+    def _font(self, path, size):
+        """Shared font, scaled down for tiles narrower than the panel"""
+        return get_font(path, max(8, round(size * self.font_scale)))
+    
+    @property
+    def city_name(self):
+        return self.location.name
+    
+    def configure(self, widget_config):
+        """
+        Apply the widget's config from the dashboard
+        
+        'latitude' and 'longitude' pick the location and 'location' labels
+        it; without coordinates the default location is shown.
+        
+        Args:
+            widget_config: The widget's 'config' dict
+        """
+        widget_config = widget_config or {}
+        location = DEFAULT_LOCATION
+        if 'latitude' in widget_config and 'longitude' in widget_config:
+            try:
+                lat = float(widget_config['latitude'])
+                lon = float(widget_config['longitude'])
+                name = widget_config.get('location') or f"{lat:.2f}, {lon:.2f}"
+                location = Location(lat, lon, name)
+            except (TypeError, ValueError):
+                logger.warning(f"Invalid weather coordinates: {widget_config.get('latitude')}, {widget_config.get('longitude')}")
+        elif widget_config.get('location'):
+            logger.debug(f"No coordinates for '{widget_config['location']}', showing {DEFAULT_LOCATION.name}")
+        self.location = location
+    
+    def cache_key(self):
+        """Cache key for this widget's location and units"""
+        return self.location.key
+    
+    def get_cached_weather(self):
+        """Return the last cached weather data of any age, or None"""
+        return self.service.get_cached(self.location)
     
     def fetch_weather(self):
-        """Fetch current weather and 5-day forecast from Open-Meteo API"""
-        try:
-            params = {
-                'latitude': self.lat,
-                'longitude': self.lon,
-                'current': 'temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,precipitation',
-                'daily': 'weather_code,temperature_2m_max,temperature_2m_min,uv_index_max,precipitation_probability_max',
-                'temperature_unit': 'fahrenheit',
-                'wind_speed_unit': 'mph',
-                'timezone': 'America/Chicago',
-                'forecast_days': 6  # Get 6 days (today + 5 more)
-            }
-            
-            response = requests.get(self.api_url, params=params, timeout=30)
-            
-            if response.status_code == 200:
-                data = response.json()
-                current = data.get('current', {})
-                daily = data.get('daily', {})
-                
-                weather_info = {
-                    'temperature': round(current.get('temperature_2m', 0)),
-                    'humidity': current.get('relative_humidity_2m', 0),
-                    'wind_speed': round(current.get('wind_speed_10m', 0)),
-                    'weather_code': current.get('weather_code', 0),
-                    'precipitation': current.get('precipitation', 0),
-                    'time': current.get('time', ''),
-                    'uv_index': 0,
-                    'precipitation_chance': 0,
-                    'forecast': []
-                }
-                
-                # Get today's UV and precipitation
-                if daily:
-                    uv_indices = daily.get('uv_index_max', [])
-                    precip_probs = daily.get('precipitation_probability_max', [])
-                    
-                    if len(uv_indices) > 0:
-                        weather_info['uv_index'] = round(uv_indices[0])
-                    if len(precip_probs) > 0:
-                        weather_info['precipitation_chance'] = precip_probs[0]
-                
-                # Parse 5-day forecast (skip today, get next 5 days)
-                if daily:
-                    times = daily.get('time', [])
-                    codes = daily.get('weather_code', [])
-                    max_temps = daily.get('temperature_2m_max', [])
-                    min_temps = daily.get('temperature_2m_min', [])
-                    
-                    for i in range(1, min(6, len(times))):  # Start from index 1 (tomorrow)
-                        weather_info['forecast'].append({
-                            'date': times[i],
-                            'weather_code': codes[i] if i < len(codes) else 0,
-                            'temp_max': round(max_temps[i]) if i < len(max_temps) else 0,
-                            'temp_min': round(min_temps[i]) if i < len(min_temps) else 0,
-                        })
-                
-                logger.info(f"Weather data fetched: {weather_info['temperature']}°F with {len(weather_info['forecast'])} day forecast")
-                return weather_info
-            else:
-                logger.error(f"Weather API error: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error fetching weather: {e}")
-            return None
+        """
+        Get current weather and 5-day forecast
+        
+        Fetched through the shared weather service, which serves fresh
+        cached data, batches requests for several locations and falls
+        back to stale data if a request fails.
+        """
+        return self.service.get(self.location)
     
     def get_weather_description(self, code):
         """Convert WMO weather code to description"""
@@ -168,71 +188,129 @@ class WeatherWidget:
             draw.line([(x, y), (x, min(y + spacing, y2))], fill=color, width=2)
             y += spacing * 2
     
+    def _get_background(self):
+        """
+        Get the cached static background layer for this size and location
+        
+        Returns:
+            PIL Image with dividers, labels, separators and footer drawn
+        """
+        key = (self.width, self.height, self.city_name)
+        background = WeatherWidget._backgrounds.get(key)
+        if background is None:
+            logger.info(f"Building weather background for {self.city_name} ({self.width}x{self.height})")
+            background = self._render_background()
+            WeatherWidget._backgrounds[key] = background
+        return background
+    
+    def invalidate_background(self):
+        """Drop the cached background so it is rebuilt on the next render"""
+        WeatherWidget._backgrounds.pop((self.width, self.height, self.city_name), None)
+    
+    def _render_background(self):
+        """Draw the parts of the layout that never change between refreshes"""
+        image = Image.new('RGB', (self.width, self.height), 'white')
+        draw = ImageDraw.Draw(image)
+        
+        label_font = self._font(FONT_REGULAR, 22)
+        footer_font = self._font(FONT_REGULAR, 20)
+        
+        # Draw dotted vertical dividers
+        self.draw_dotted_line(draw, self.col2_x, 0, self.footer_y)
+        self.draw_dotted_line(draw, self.col3_x, 0, self.footer_y)
+        
+        # UV and Precipitation labels in the center section
+        center_x = self.col2_x + (self.col2_width // 2)
+        uv_precip_y = self.content_height - 140
+        
+        uv_text = "UV Index"
+        uv_bbox = draw.textbbox((0, 0), uv_text, font=label_font)
+        uv_text_width = uv_bbox[2] - uv_bbox[0]
+        uv_x = center_x - (uv_text_width // 2)
+        draw.text((uv_x, uv_precip_y), uv_text, font=label_font, fill=(100, 100, 100))
+        
+        precip_text = "Precipitation"
+        precip_bbox = draw.textbbox((0, 0), precip_text, font=label_font)
+        precip_text_width = precip_bbox[2] - precip_bbox[0]
+        precip_x = center_x - (precip_text_width // 2)
+        draw.text((precip_x, uv_precip_y + 68), precip_text, font=label_font, fill=(100, 100, 100))
+        
+        # Forecast separator lines (between the 5 stacked items)
+        right_margin = self.col3_x + 15
+        for i in range(4):
+            sep_y = self.forecast_top_padding + (i * self.forecast_spacing) + 58
+            draw.line([(right_margin, sep_y), (self.col3_x + self.col3_width - 15, sep_y)], fill=(220, 220, 220), width=1)
+        
+        # ============ FOOTER ============
+        # Draw filled footer with border
+        footer_border_y = self.footer_y - 8
+        draw.rectangle(
+            [0, footer_border_y, self.width, self.height],
+            fill=(70, 130, 180),  # Steel blue background
+            outline=(50, 100, 150),  # Darker blue border
+            width=2
+        )
+        
+        # Bottom left: "Weather" (white text on blue background)
+        draw.text((20, self.footer_y), "Weather", font=footer_font, fill='white')
+        
+        # Center: Version (white text on blue background)
+        version_text = "v.1.0"
+        version_bbox = draw.textbbox((0, 0), version_text, font=footer_font)
+        version_width = version_bbox[2] - version_bbox[0]
+        version_x = (self.width - version_width) // 2
+        draw.text((version_x, self.footer_y), version_text, font=footer_font, fill='white')
+        
+        # Bottom right: City name (white text on blue background)
+        city_bbox = draw.textbbox((0, 0), self.city_name, font=footer_font)
+        city_width = city_bbox[2] - city_bbox[0]
+        draw.text((self.width - city_width - 20, self.footer_y), self.city_name, font=footer_font, fill='white')
+        
+        return image
+    
+    def get_data(self):
+        """Data this widget renders (see fetch_weather)"""
+        return self.fetch_weather()
+    
     def render(self, weather_data=None):
         """
         Render weather widget with 3-column layout
         
+        Only the dynamic values are drawn; the static layout comes from a
+        cached background layer (see _get_background). Rendering does no
+        network I/O; use get_data() to fetch.
+        
         Args:
-            weather_data: Optional pre-fetched weather data
+            weather_data: Weather data from get_data(); an error screen is
+                shown if it is missing
             
         Returns:
             PIL Image object
         """
-        if weather_data is None:
-            weather_data = self.fetch_weather()
-        
         if not weather_data:
             return self._render_error()
         
-        # Create canvas
-        image = Image.new('RGB', (self.width, self.height), 'white')
+        # Start from the static background, pasted into the reused canvas
+        background = self._get_background()
+        if self._canvas is None or self._canvas.size != background.size:
+            self._canvas = Image.new('RGB', background.size)
+        image = self._canvas
+        image.paste(background, (0, 0))
         draw = ImageDraw.Draw(image)
         
-        # Load fonts
-        try:
-            condition_icon_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 80)
-            condition_desc_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 32)
-            later_label_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 22)
-            later_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 20)
-            temp_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 130)  # Bigger temp
-            label_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 22)
-            value_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 30)
-            day_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 20)
-            forecast_icon_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 28)  # Smaller icons
-            forecast_temp_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 18)
-            footer_font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf', 20)
-        except Exception as e:
-            logger.warning(f"Could not load fonts: {e}")
-            # Fallback
-            condition_icon_font = ImageFont.load_default()
-            condition_desc_font = ImageFont.load_default()
-            later_label_font = ImageFont.load_default()
-            later_font = ImageFont.load_default()
-            temp_font = ImageFont.load_default()
-            label_font = ImageFont.load_default()
-            value_font = ImageFont.load_default()
-            day_font = ImageFont.load_default()
-            forecast_icon_font = ImageFont.load_default()
-            forecast_temp_font = ImageFont.load_default()
-            footer_font = ImageFont.load_default()
-        
-        # Define column widths (3 columns)
-        col1_width = 267  # Left section
-        col2_width = 266  # Center section
-        col3_width = 267  # Right section
-        col1_x = 0
-        col2_x = col1_width
-        col3_x = col1_width + col2_width
-        
-        footer_y = self.height - 35
-        content_height = footer_y - 20
-        
-        # Draw dotted vertical dividers
-        self.draw_dotted_line(draw, col2_x, 0, footer_y)
-        self.draw_dotted_line(draw, col3_x, 0, footer_y)
+        # Load fonts (shared cache, parsed once per process)
+        condition_icon_font = self._font(FONT_BOLD, 80)
+        condition_desc_font = self._font(FONT_BOLD, 32)
+        later_label_font = self._font(FONT_REGULAR, 22)
+        later_font = self._font(FONT_REGULAR, 20)
+        temp_font = self._font(FONT_BOLD, 130)  # Bigger temp
+        value_font = self._font(FONT_BOLD, 30)
+        day_font = self._font(FONT_BOLD, 20)
+        forecast_icon_font = self._font(FONT_BOLD, 28)  # Smaller icons
+        forecast_temp_font = self._font(FONT_REGULAR, 18)
         
         # ============ LEFT SECTION ============
-        left_center = col1_width // 2
+        left_center = self.col1_width // 2
         
         # Current condition at top - CENTERED
         desc_text = self.get_weather_description(weather_data['weather_code'])
@@ -252,7 +330,7 @@ class WeatherWidget:
         draw.text((desc_x, condition_y + 100), desc_text, font=condition_desc_font, fill=(40, 40, 40))
         
         # "Later" forecast at bottom of left section - smaller text
-        later_y = content_height - 80
+        later_y = self.content_height - 80
         later_label = "Later:"
         later_label_bbox = draw.textbbox((0, 0), later_label, font=later_label_font)
         later_label_width = later_label_bbox[2] - later_label_bbox[0]
@@ -266,7 +344,7 @@ class WeatherWidget:
         draw.text((later_x, later_y + 28), later_forecast, font=later_font, fill=(60, 60, 60))
         
         # ============ CENTER SECTION ============
-        center_x = col2_x + (col2_width // 2)
+        center_x = self.col2_x + (self.col2_width // 2)
         
         # Large temperature at top (centered)
         temp = weather_data['temperature']
@@ -277,92 +355,41 @@ class WeatherWidget:
         temp_x = center_x - (temp_width // 2)
         draw.text((temp_x, 20), temp_text, font=temp_font, fill=temp_color)
         
-        # UV and Precipitation at bottom of center (higher up to avoid footer)
-        uv_precip_y = content_height - 140
+        # UV and Precipitation values (labels are on the background)
+        uv_precip_y = self.content_height - 140
         
-        # UV Index
-        uv_text = "UV Index"
         uv_value = f"{weather_data['uv_index']}"
-        uv_bbox = draw.textbbox((0, 0), uv_text, font=label_font)
-        uv_text_width = uv_bbox[2] - uv_bbox[0]
-        uv_x = center_x - (uv_text_width // 2)
-        draw.text((uv_x, uv_precip_y), uv_text, font=label_font, fill=(100, 100, 100))
-        
         uv_value_bbox = draw.textbbox((0, 0), uv_value, font=value_font)
         uv_value_width = uv_value_bbox[2] - uv_value_bbox[0]
         uv_value_x = center_x - (uv_value_width // 2)
         draw.text((uv_value_x, uv_precip_y + 28), uv_value, font=value_font, fill=(255, 140, 0))
         
-        # Precipitation
-        precip_text = "Precipitation"
         precip_value = f"{weather_data['precipitation_chance']}%"
-        precip_bbox = draw.textbbox((0, 0), precip_text, font=label_font)
-        precip_text_width = precip_bbox[2] - precip_bbox[0]
-        precip_x = center_x - (precip_text_width // 2)
-        draw.text((precip_x, uv_precip_y + 68), precip_text, font=label_font, fill=(100, 100, 100))
-        
         precip_value_bbox = draw.textbbox((0, 0), precip_value, font=value_font)
         precip_value_width = precip_value_bbox[2] - precip_value_bbox[0]
         precip_value_x = center_x - (precip_value_width // 2)
         draw.text((precip_value_x, uv_precip_y + 96), precip_value, font=value_font, fill=(70, 130, 180))
         
         # ============ RIGHT SECTION (5-DAY FORECAST STACKED) ============
-        right_margin = col3_x + 15
-        
-        # Simple fixed spacing that works - 5 items evenly distributed
-        # Total space: 0 to 437 (footer border)
-        # Use 60-380 for forecast (320px / 5 items = 64px per item)
-        forecast_top_padding = 60
-        forecast_bottom_padding = 57  # 437 - 380 = 57 (roughly equal to top)
-        forecast_spacing = 76  # Space between each item
+        right_margin = self.col3_x + 15
+        day_dx, icon_dx, high_dx, low_dx = self.forecast_columns
         
         for i, day_data in enumerate(weather_data.get('forecast', [])[:5]):
-            item_y = forecast_top_padding + (i * forecast_spacing)
+            item_y = self.forecast_top_padding + (i * self.forecast_spacing)
             
             # Day name
             day_name = self.get_day_name(day_data['date'])
-            draw.text((right_margin, item_y), day_name, font=day_font, fill=(40, 40, 40))
+            draw.text((right_margin + day_dx, item_y), day_name, font=day_font, fill=(40, 40, 40))
             
             # Weather icon - simple fixed alignment
             icon = self.get_weather_icon(day_data['weather_code'])
-            draw.text((right_margin + 50, item_y - 3), icon, font=forecast_icon_font, fill='black')
+            draw.text((right_margin + icon_dx, item_y - 3), icon, font=forecast_icon_font, fill='black')
             
             # High/Low temps (aligned with day name)
             high_temp = f"{day_data['temp_max']}°"
             low_temp = f"{day_data['temp_min']}°"
-            draw.text((right_margin + 105, item_y), high_temp, font=forecast_temp_font, fill=(255, 69, 0))
-            draw.text((right_margin + 160, item_y), low_temp, font=forecast_temp_font, fill=(70, 130, 180))
-            
-            # Separator line (except last item)
-            if i < 4:
-                sep_y = item_y + 58
-                draw.line([(right_margin, sep_y), (col3_x + col3_width - 15, sep_y)], fill=(220, 220, 220), width=1)
-        
-        # ============ FOOTER ============
-        # Draw filled footer with border
-        footer_border_y = footer_y - 8
-        draw.rectangle(
-            [0, footer_border_y, self.width, self.height],
-            fill=(70, 130, 180),  # Steel blue background
-            outline=(50, 100, 150),  # Darker blue border
-            width=2
-        )
-        
-        # Bottom left: "Weather" (white text on blue background)
-        draw.text((20, footer_y), "Weather", font=footer_font, fill='white')
-        
-        # Center: Version (white text on blue background)
-        version_text = "v.1.0"
-        version_bbox = draw.textbbox((0, 0), version_text, font=footer_font)
-        version_width = version_bbox[2] - version_bbox[0]
-        version_x = (self.width - version_width) // 2
-        draw.text((version_x, footer_y), version_text, font=footer_font, fill='white')
-        
-        # Bottom right: City name (white text on blue background)
-        city_text = "St. Paul, MN"
-        city_bbox = draw.textbbox((0, 0), city_text, font=footer_font)
-        city_width = city_bbox[2] - city_bbox[0]
-        draw.text((self.width - city_width - 20, footer_y), city_text, font=footer_font, fill='white')
+            draw.text((right_margin + high_dx, item_y), high_temp, font=forecast_temp_font, fill=(255, 69, 0))
+            draw.text((right_margin + low_dx, item_y), low_temp, font=forecast_temp_font, fill=(70, 130, 180))
         
         return image
     
@@ -390,10 +417,7 @@ class WeatherWidget:
         image = Image.new('RGB', (self.width, self.height), 'white')
         draw = ImageDraw.Draw(image)
         
-        try:
-            font = ImageFont.truetype('/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf', 48)
-        except:
-            font = ImageFont.load_default()
+        font = self._font(FONT_BOLD, 48)
         
         error_text = "Weather data unavailable"
         bbox = draw.textbbox((0, 0), error_text, font=font)
@@ -0,0 +1,196 @@
+"""
+Widget Registry - Maps widget ids to widget classes
+Widget modules are imported lazily, only when a widget is enabled, and
+render times are tracked against a per-widget budget
+"""
+import time
+import importlib
+import logging
+from typing import Optional, Dict, Any, List
+from metrics import span
+
+logger = logging.getLogger(__name__)
+
+# Widget id -> (module, class name). Modules are imported on first use.
+WIDGETS = {
+    'weather': ('weather_widget', 'WeatherWidget'),
+    'clock': ('clock_widget', 'ClockWidget'),
+}
+
+# Widgets shown when the device has no config yet
+DEFAULT_WIDGETS = ['weather']
+
+def widget_type(widget_id: str) -> str:
+    """
+    Widget type for a config id
+
+    A widget can be shown several times by giving each instance a
+    suffix, e.g. 'weather:paris' and 'weather:tokyo' are both weather.
+    """
+    return widget_id.split(':', 1)[0]
+
+# Consecutive over-budget renders before a widget's refresh is backed off
+MAX_OVERRUNS = 3
+
+class WidgetRegistry:
+    def __init__(self, render_budget: float = 2.0):
+        """
+        Args:
+            render_budget: Default seconds a widget render may take
+        """
+        self.render_budget = render_budget
+        self._widgets = dict(WIDGETS)
+        self._classes = {}
+        self.render_stats = {}
+        # Ids already reported as unavailable, so a config listing widgets
+        # for other devices doesn't warn on every fetch
+        self._unavailable_reported = set()
+
+    def register(self, widget_id: str, module: str, class_name: str):
+        """Register (or replace) a widget implementation"""
+        self._widgets[widget_id] = (module, class_name)
+        self._classes.pop(widget_id, None)
+
+    def is_available(self, widget_id: str) -> bool:
+        """Return True if this device has an implementation for the widget"""
+        return widget_type(widget_id) in self._widgets
+
+    def get_class(self, widget_id: str):
+        """
+        Get a widget class, importing its module on first use
+
+        Returns:
+            Widget class, or None if unknown or the import failed
+        """
+        widget_id = widget_type(widget_id)
+        if widget_id in self._classes:
+            return self._classes[widget_id]
+        if widget_id not in self._widgets:
+            return None
+
+        module_name, class_name = self._widgets[widget_id]
+        try:
+            module = importlib.import_module(module_name)
+            widget_class = getattr(module, class_name)
+        except Exception as e:
+            logger.error(f"Could not load widget '{widget_id}' from {module_name}: {e}")
+            widget_class = None
+        self._classes[widget_id] = widget_class
+        return widget_class
+
+    def enabled_widgets(self, device_config: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        List the enabled widgets this device can render, in config order
+
+        Args:
+            device_config: Config dict from the dashboard (may be None)
+
+        Returns:
+            List of widget entries ({'id', 'enabled', 'config'})
+        """
+        if not device_config or 'widgets' not in device_config:
+            return [{'id': widget_id, 'enabled': True, 'config': {}} for widget_id in DEFAULT_WIDGETS]
+
+        enabled = []
+        for entry in device_config.get('widgets') or []:
+            widget_id = entry.get('id') if isinstance(entry, dict) else None
+            if not isinstance(widget_id, str) or not widget_id:
+                logger.warning(f"Widget entry without an id, skipping: {entry!r}")
+                continue
+            if not entry.get('enabled', True):
+                continue
+            if not self.is_available(widget_id):
+                if widget_id not in self._unavailable_reported:
+                    self._unavailable_reported.add(widget_id)
+                    logger.warning(f"Widget '{widget_id}' is not available on this device, skipping")
+                else:
+                    logger.debug(f"Skipping unavailable widget '{widget_id}'")
+                continue
+            enabled.append(entry)
+        return enabled
+
+    def create(self, widget_id: str, width: int, height: int, services: Optional[Dict[str, Any]] = None,
+               widget_config: Optional[Dict[str, Any]] = None):
+        """
+        Instantiate a widget
+
+        Each widget class lists the services it needs in data_dependencies;
+        those are looked up in services and passed as keyword arguments.
+        Widgets with a configure() method are then given their config.
+
+        Args:
+            widget_id: Widget id from the config
+            width: Canvas width in pixels
+            height: Canvas height in pixels
+            services: Shared objects widgets may depend on (e.g. weather_service)
+            widget_config: The widget's 'config' dict from the device config
+
+        Returns:
+            Widget instance, or None if it can't be created
+        """
+        widget_class = self.get_class(widget_id)
+        if widget_class is None:
+            return None
+
+        services = services or {}
+        kwargs = {}
+        for name in getattr(widget_class, 'data_dependencies', ()):
+            if name in services:
+                kwargs[name] = services[name]
+            else:
+                logger.warning(f"Widget '{widget_id}' dependency '{name}' not provided")
+        widget = widget_class(width, height, **kwargs)
+        if hasattr(widget, 'configure'):
+            widget.configure(widget_config or {})
+        return widget
+
+    def render(self, widget_id: str, widget, *args, **kwargs):
+        """
+        Render a widget, recording its render time against its budget
+
+        Returns:
+            Whatever the widget's render() returns
+        """
+        budget = getattr(widget, 'render_budget', None) or self.render_budget
+        stats = self.render_stats.setdefault(widget_id, {
+            'renders': 0,
+            'last_ms': 0,
+            'max_ms': 0,
+            'total_ms': 0,
+            'over_budget': 0,
+            'overruns': 0
+        })
+
+        start = time.perf_counter()
+        try:
+            with span(f'render.{widget_id}'):
+                return widget.render(*args, **kwargs)
+        finally:
+            elapsed_ms = round((time.perf_counter() - start) * 1000, 1)
+            stats['renders'] += 1
+            stats['last_ms'] = elapsed_ms
+            stats['max_ms'] = max(stats['max_ms'], elapsed_ms)
+            stats['total_ms'] = round(stats['total_ms'] + elapsed_ms, 1)
+            if elapsed_ms > budget * 1000:
+                stats['over_budget'] += 1
+                stats['overruns'] += 1
+                logger.warning(f"Widget '{widget_id}' render took {elapsed_ms}ms (budget {budget * 1000:.0f}ms)")
+            else:
+                stats['overruns'] = 0
+
+    def effective_interval(self, widget_id: str, interval: float) -> float:
+        """
+        Refresh interval after enforcing the render budget
+
+        A widget that keeps overrunning its budget has its interval
+        doubled for each overrun past MAX_OVERRUNS (up to 8x).
+        """
+        overruns = self.render_stats.get(widget_id, {}).get('overruns', 0)
+        if overruns < MAX_OVERRUNS:
+            return interval
+        factor = min(8, 2 ** (overruns - MAX_OVERRUNS + 1))
+        return interval * factor
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-widget render stats for the heartbeat"""
+        return {widget_id: dict(stats) for widget_id, stats in self.render_stats.items()}
@@ -0,0 +1,7 @@
+-- Add display_preview_hash column to devices table
+-- Devices send only this hash in heartbeats while their frame is unchanged
+
+ALTER TABLE devices
+ADD COLUMN IF NOT EXISTS display_preview_hash TEXT;
+
+COMMENT ON COLUMN devices.display_preview_hash IS 'Hash of the frame shown in display_preview, used to skip re-uploading unchanged previews';
@@ -0,0 +1,17 @@
+-- Heartbeat history uploaded in batches by devices
+-- Devices queue samples on disk while offline and upload them later, so
+-- recorded_at is when the sample was taken, not when it arrived
+
+CREATE TABLE IF NOT EXISTS device_telemetry (
+    id BIGSERIAL PRIMARY KEY,
+    device_id TEXT NOT NULL REFERENCES devices(device_id) ON DELETE CASCADE,
+    recorded_at TIMESTAMPTZ NOT NULL,
+    system JSONB DEFAULT '{}'::jsonb,
+    widgets JSONB DEFAULT '{}'::jsonb,
+    received_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_device_telemetry_device_time
+    ON device_telemetry (device_id, recorded_at DESC);
+
+COMMENT ON TABLE device_telemetry IS 'Heartbeat samples from devices, uploaded in gzip-compressed batches';
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Measure end-to-end frame throughput on the virtual display
+Renders changing weather and clock data through the compositor, display
+scheduler and packer, off-device. Usage: python3 benchmark-frames.py [frames] [latency]
+"""
+import sys
+import os
+import time
+import tempfile
+
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+import virtual_epd
+from display_manager import DisplayManager
+from display_scheduler import DisplayScheduler
+from compositor import Compositor
+from weather_widget import WeatherWidget
+from clock_widget import ClockWidget
+
+WIDTH = 800
+HEIGHT = 480
+
+def make_weather(frame):
+    """Synthetic weather data that changes every frame"""
+    return {
+        'temperature': 40 + frame % 50,
+        'humidity': 60,
+        'wind_speed': 8,
+        'weather_code': [0, 2, 3, 61, 71][frame % 5],
+        'precipitation': 0,
+        'time': '2026-01-01T10:00',
+        'uv_index': 3,
+        'precipitation_chance': 20,
+        'forecast': [
+            {'date': f'2026-01-{2 + day:02d}', 'weather_code': [0, 3, 61, 71, 95][day], 'temp_max': 60 + day, 'temp_min': 40 + day}
+            for day in range(5)
+        ]
+    }
+
+def make_clock(frame):
+    return {'time': f'{frame // 60 % 24:02d}:{frame % 60:02d}', 'date': 'Thu Jan 01'}
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.0
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        epd = virtual_epd.EPD(output_dir, 'png', latency)
+        display = DisplayManager(epd=epd)
+        scheduler = DisplayScheduler(display, min_interval=0)
+        scheduler.start()
+
+        compositor = Compositor(WIDTH, HEIGHT)
+        compositor.add('weather', WeatherWidget(WIDTH, HEIGHT), (0, 0, WIDTH, HEIGHT))
+        compositor.add('clock', ClockWidget(240, 120), (560, 0, 240, 120))
+        render = lambda widget, data: widget.render(data)
+
+        print(f"Rendering {frames} frames, simulated refresh latency {latency}s")
+        render_time = 0.0
+        start = time.perf_counter()
+        for frame in range(frames):
+            render_start = time.perf_counter()
+            compositor.update('weather', make_weather(frame), render)
+            compositor.update('clock', make_clock(frame), render)
+            image, dirty = compositor.compose()
+            render_time += time.perf_counter() - render_start
+            scheduler.submit(image, dirty_regions=dirty)
+            # One frame in flight at a time, like the agent
+            scheduler.wait_idle()
+        elapsed = time.perf_counter() - start
+        scheduler.stop()
+
+    stats = scheduler.get_stats()
+    print(f"  Frames shown:     {epd.frames} ({stats['coalesced']} coalesced, {stats['skipped']} skipped)")
+    print(f"  Render+compose:   {render_time / frames * 1000:9.1f} ms/frame")
+    print(f"  Pack+display:     {stats['avg_duration_s'] * 1000:9.1f} ms/frame (avg)")
+    print(f"  Throughput:       {frames / elapsed:9.2f} frames/s")
+
+if __name__ == "__main__":
+    main()
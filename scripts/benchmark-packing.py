@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark the NumPy frame packer against the Waveshare driver's getbuffer()
+Runs without hardware: uses the real driver if it imports, otherwise a
+verbatim copy of its packing loop. Usage: python3 benchmark-packing.py [runs]
+"""
+import sys
+import os
+import time
+
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, backend_path)
+lib_path = os.path.join(backend_path, 'lib')
+if os.path.exists(lib_path):
+    sys.path.insert(0, lib_path)
+
+from PIL import Image, ImageDraw
+import frame_packer
+
+WIDTH = 800
+HEIGHT = 480
+
+def reference_getbuffer(image):
+    """Copy of epd7in3e.EPD.getbuffer() packing"""
+    image_7color = image.convert("RGB").quantize(palette=frame_packer.get_palette_image())
+    buf_7color = bytearray(image_7color.tobytes('raw'))
+    buf = [0x00] * int(WIDTH * HEIGHT / 2)
+    idx = 0
+    for i in range(0, len(buf_7color), 2):
+        buf[idx] = (buf_7color[i] << 4) + buf_7color[i+1]
+        idx += 1
+    return buf
+
+def load_getbuffer():
+    """Use the driver's getbuffer() if available, else the reference copy"""
+    try:
+        from waveshare_epd import epd7in3e
+        epd = epd7in3e.EPD()
+        return epd.getbuffer, 'epd7in3e.getbuffer'
+    except Exception:
+        return reference_getbuffer, 'reference getbuffer'
+
+def make_test_image():
+    """Build a colourful test frame with gradients and text"""
+    image = Image.new('RGB', (WIDTH, HEIGHT), 'white')
+    draw = ImageDraw.Draw(image)
+    for x in range(0, WIDTH, 4):
+        draw.line([(x, 0), (x, HEIGHT // 2)], fill=(x * 255 // WIDTH, 128, 255 - x * 255 // WIDTH))
+    draw.rectangle([50, 280, 750, 430], outline='black', width=3, fill=(70, 130, 180))
+    draw.text((100, 330), "Lumy packing benchmark", fill='white')
+    return image
+
+def time_it(func, image, runs):
+    """Return the best wall time of several runs and the last result"""
+    best = None
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = func(image)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    if not frame_packer.is_available():
+        print("NumPy is not installed, nothing to benchmark")
+        sys.exit(1)
+
+    getbuffer, name = load_getbuffer()
+    image = make_test_image()
+
+    print(f"Packing {WIDTH}x{HEIGHT} frame, best of {runs} runs")
+    ref_time, ref_buf = time_it(getbuffer, image, runs)
+    print(f"  {name:<24} {ref_time * 1000:9.1f} ms")
+
+    fast_time, fast_buf = time_it(frame_packer.pack_image, image, runs)
+    print(f"  {'frame_packer (dither)':<24} {fast_time * 1000:9.1f} ms")
+
+    nodither = lambda img: frame_packer.pack_image(img, dither=False)
+    plain_time, _ = time_it(nodither, image, runs)
+    print(f"  {'frame_packer (nearest)':<24} {plain_time * 1000:9.1f} ms")
+
+    identical = bytes(ref_buf) == bytes(fast_buf)
+    print(f"Speedup: {ref_time / fast_time:.1f}x, byte-identical: {identical}")
+    if not identical:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Render pipeline benchmark suite with baseline comparison
+Times each stage off-device and reports wall time, peak RSS, the peak of
+Python allocations during a run and the memory blocks a run leaves behind.
+Peak RSS is also measured per run (how far one cycle pushes memory above
+where it started), using the kernel's resettable high-water mark on Linux.
+API calls are timed against a local stub dashboard, so no network is needed.
+Usage: python3 benchmark-suite.py [--runs N] [--output results.json]
+                                  [--baseline baseline.json] [--threshold 0.25]
+Exits with status 1 if any benchmark regressed past the threshold.
+"""
+import sys
+import os
+import gc
+import json
+import time
+import argparse
+import platform
+import resource
+import statistics
+import tracemalloc
+from datetime import datetime, timezone
+
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+import logging
+logging.disable(logging.INFO)
+
+import PIL
+import frame_packer
+import virtual_epd
+from display_manager import DisplayManager
+from display_scheduler import DisplayScheduler
+from compositor import Compositor
+from preview_encoder import PreviewEncoder, encode_preview, packed_to_thumbnail
+from weather_widget import WeatherWidget
+from api_client import LumyAPIClient
+from http_transport import HTTPTransport
+from main import image_to_base64_preview, get_system_info
+
+# Test tooling kept next to this script, not installed on devices
+from stub_dashboard import StubDashboard
+
+WIDTH = 800
+HEIGHT = 480
+
+# Canned Open-Meteo style data so renders don't touch the network
+CANNED_WEATHER = {
+    'temperature': 54,
+    'humidity': 60,
+    'wind_speed': 8,
+    'weather_code': 2,
+    'precipitation': 0,
+    'time': '2026-01-01T10:00',
+    'uv_index': 3,
+    'precipitation_chance': 20,
+    'forecast': [
+        {'date': '2026-01-02', 'weather_code': 0, 'temp_max': 60, 'temp_min': 40},
+        {'date': '2026-01-03', 'weather_code': 3, 'temp_max': 61, 'temp_min': 41},
+        {'date': '2026-01-04', 'weather_code': 61, 'temp_max': 62, 'temp_min': 42},
+        {'date': '2026-01-05', 'weather_code': 71, 'temp_max': 63, 'temp_min': 43},
+        {'date': '2026-01-06', 'weather_code': 95, 'temp_max': 64, 'temp_min': 44}
+    ]
+}
+
+def peak_rss_kb():
+    """Peak resident set size of this process in KiB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux KiB
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def read_rss_kb():
+    """
+    Current and peak resident set size in KiB from /proc/self/status
+
+    Returns:
+        Tuple of (VmRSS, VmHWM), or (None, None) off Linux
+    """
+    values = {}
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(('VmRSS:', 'VmHWM:')):
+                    values[line.split(':')[0]] = int(line.split()[1])
+    except OSError:
+        pass
+    return values.get('VmRSS'), values.get('VmHWM')
+
+def reset_peak_rss():
+    """Reset the kernel's peak RSS so it covers only what runs next (Linux 4.0+)"""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+API_BENCHMARKS = ('api_claim_poll', 'api_heartbeat_preview', 'api_heartbeat', 'api_config')
+
+def build_benchmarks(only=None):
+    """
+    Set up the selected benchmarks
+
+    The display scheduler and stub dashboard are only started when a
+    benchmark that needs them is selected.
+
+    Args:
+        only: Names of the benchmarks to build (default: all)
+
+    Returns:
+        Tuple of (list of (name, callable) pairs, list of callables that
+        stop what was started)
+    """
+    def selected(*names):
+        return not only or any(name in only for name in names)
+
+    benchmarks = []
+    cleanups = []
+    weather = WeatherWidget(WIDTH, HEIGHT)
+    weather_image = weather.render(CANNED_WEATHER).copy()
+    display = DisplayManager(epd=virtual_epd.EPD(latency=0))
+    weather_buffer = display.pack_frame(weather_image)
+
+    def weather_render_cold():
+        weather.invalidate_background()
+        return weather.render(CANNED_WEATHER)
+
+    def preview_packed():
+        return encode_preview(packed_to_thumbnail(weather_buffer, WIDTH, HEIGHT))
+
+    benchmarks += [
+        ('weather_render', lambda: weather.render(CANNED_WEATHER)),
+        ('weather_render_cold', weather_render_cold),
+        ('preview_encode', lambda: image_to_base64_preview(weather_image)),
+        ('preview_packed', preview_packed),
+        ('welcome_screen', lambda: display.render_welcome_screen('ABC123')),
+        ('pack_frame', lambda: display.pack_frame(weather_image)),
+        ('system_info', get_system_info)
+    ]
+
+    if selected('agent_cycle'):
+        # One full agent cycle: new data, render, compose, pack and refresh on
+        # the scheduler's worker, then the heartbeat preview from the buffer
+        cycle_widget = WeatherWidget(WIDTH, HEIGHT)
+        compositor = Compositor(WIDTH, HEIGHT)
+        compositor.add('weather', cycle_widget, (0, 0, WIDTH, HEIGHT))
+        cycle_display = DisplayManager(epd=virtual_epd.EPD(fmt='none', latency=0))
+        scheduler = DisplayScheduler(cycle_display, min_interval=0, max_duty=0)
+        scheduler.start()
+        cleanups.append(scheduler.stop)
+        cycle_encoder = PreviewEncoder(400, 'png')
+        cycles = [0]
+
+        def agent_cycle():
+            cycles[0] += 1
+            data = dict(CANNED_WEATHER, temperature=CANNED_WEATHER['temperature'] + cycles[0] % 20)
+            compositor.update('weather', data, lambda widget, widget_data: widget.render(widget_data))
+            image, dirty_regions = compositor.compose()
+            scheduler.submit(image, dirty_regions=dirty_regions, force=True)
+            scheduler.wait_idle()
+            buffer, frame_hash = scheduler.current_frame()
+            return cycle_encoder.get_packed(buffer, frame_hash, WIDTH, HEIGHT)
+
+        benchmarks.append(('agent_cycle', agent_cycle))
+
+    if frame_packer.is_available():
+        benchmarks.append(('pack_frame_nearest', lambda: frame_packer.pack_image(weather_image, WIDTH, HEIGHT, dither=False)))
+
+    if selected(*API_BENCHMARKS):
+        # The agent's network calls, against a stub dashboard on loopback
+        stub = StubDashboard(claim_after=None, seed=0)
+        stub.start()
+        cleanups.append(stub.stop)
+        client = LumyAPIClient(stub.url, 'benchmark', HTTPTransport(stub.url, retries=0))
+        device_id = 'lumy-benchmark'
+        preview = image_to_base64_preview(weather_image)
+        system_info = get_system_info()
+        client.get_config(device_id)  # later fetches are 304s, as on a device
+        benchmarks += [
+            ('api_claim_poll', lambda: client.check_claim_status(device_id)),
+            ('api_heartbeat_preview', lambda: client.send_heartbeat(device_id, preview, system_info, 'benchmark')),
+            ('api_heartbeat', lambda: client.send_heartbeat(device_id, None, system_info, 'benchmark')),
+            ('api_config', lambda: client.get_config(device_id))
+        ]
+    return [(name, func) for name, func in benchmarks if selected(name)], cleanups
+
+def run_benchmark(func, runs):
+    """
+    Time a benchmark, then measure its allocations in a separate traced run
+
+    Allocations are Python-level (tracemalloc), which includes NumPy
+    arrays but not PIL pixel buffers; those show up in peak RSS. The
+    allocation peak is the most memory held at once during the run;
+    retained blocks are those still alive after it (caches, leaks), not a
+    count of every allocation.
+
+    Returns:
+        Dict of timing and memory results
+    """
+    func()  # warm up caches and imports
+    times = []
+    for _ in range(runs):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        times.append((time.perf_counter() - start) * 1000)
+
+    # Memory high-water mark of a single run, above the RSS it started at
+    gc.collect()
+    cycle_rss = None
+    rss_before, _ = read_rss_kb()
+    if rss_before is not None and reset_peak_rss():
+        func()
+        _, rss_peak = read_rss_kb()
+        cycle_rss = max(0, rss_peak - rss_before)
+
+    # tracemalloc slows allocation down, so it gets its own run
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    result = func()
+    _, alloc_peak = tracemalloc.get_traced_memory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    del result
+    # Blocks the run allocated and still holds afterwards (caches, leaks)
+    retained = sum(stat.count_diff for stat in after.compare_to(before, 'filename') if stat.count_diff > 0)
+
+    return {
+        'runs': runs,
+        'min_ms': round(min(times), 3),
+        'median_ms': round(statistics.median(times), 3),
+        'mean_ms': round(statistics.mean(times), 3),
+        'max_ms': round(max(times), 3),
+        'peak_rss_kb': peak_rss_kb(),
+        'cycle_rss_kb': cycle_rss,
+        'alloc_peak_kb': round(alloc_peak / 1024, 1),
+        'retained_blocks': retained
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Compare results against a baseline
+
+    A benchmark regresses if its best time or allocation peak grew by
+    more than threshold (a fraction, e.g. 0.25 for 25%). The best time is
+    used rather than the median since it is far less noisy.
+
+    Returns:
+        List of regression messages
+    """
+    regressions = []
+    print(f"\nCompared with baseline from {baseline.get('timestamp', 'unknown')} ({baseline.get('machine', '?')}):")
+    for name, result in results['benchmarks'].items():
+        base = baseline.get('benchmarks', {}).get(name)
+        if not base:
+            print(f"  {name:<22} (no baseline)")
+            continue
+        line = f"  {name:<22}"
+        for key in ('min_ms', 'alloc_peak_kb'):
+            if not base.get(key):
+                continue
+            change = result[key] / base[key] - 1
+            line += f" {key} {change:+7.1%}"
+            if change > threshold:
+                regressions.append(f"{name}: {key} {base[key]} -> {result[key]} ({change:+.1%})")
+        print(line)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Lumy render pipeline benchmarks")
+    parser.add_argument('--runs', type=int, default=10, help="timed runs per benchmark")
+    parser.add_argument('--output', help="write results as JSON to this file")
+    parser.add_argument('--baseline', help="JSON results to compare against")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed slowdown as a fraction (default 0.25)")
+    parser.add_argument('--only', nargs='*', help="run only these benchmarks")
+    args = parser.parse_args()
+
+    results = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'machine': platform.machine(),
+        'python': platform.python_version(),
+        'pillow': PIL.__version__,
+        'numpy': frame_packer.is_available(),
+        'benchmarks': {}
+    }
+
+    print(f"{'benchmark':<22} {'median':>10} {'min':>10} {'rss':>10} {'run rss':>10} {'alloc peak':>12} {'retained':>8}")
+    benchmarks, cleanups = build_benchmarks(args.only)
+    try:
+        for name, func in benchmarks:
+            result = run_benchmark(func, args.runs)
+            results['benchmarks'][name] = result
+            run_rss = f"{result['cycle_rss_kb'] / 1024:>8.1f}MB" if result['cycle_rss_kb'] is not None else f"{'n/a':>10}"
+            print(f"{name:<22} {result['median_ms']:>8.2f}ms {result['min_ms']:>8.2f}ms "
+                  f"{result['peak_rss_kb'] / 1024:>8.1f}MB {run_rss} {result['alloc_peak_kb'] / 1024:>10.2f}MB {result['retained_blocks']:>8}")
+    finally:
+        for cleanup in cleanups:
+            cleanup()
+    results['peak_rss_kb'] = peak_rss_kb()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}:")
+            for message in regressions:
+                print(f"  {message}")
+            sys.exit(1)
+        print("\nNo regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark for heartbeat system info collection
+Compares the old subprocess-based collector with the procfs/sysfs reader.
+Usage: python3 benchmark-system-info.py [runs]
+"""
+import sys
+import os
+import time
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'backend'))
+
+from system_info import SystemInfoCollector
+
+def legacy_get_system_info():
+    """
+    Previous subprocess-based collector from main.py, kept for comparison
+    
+    Returns:
+        Dictionary with system information
+    """
+    info = {}
+    
+    try:
+        # Get MAC address
+        try:
+            mac_result = subprocess.run(['cat', '/sys/class/net/wlan0/address'], 
+                                       capture_output=True, text=True, timeout=2)
+            if mac_result.returncode == 0:
+                info['mac_address'] = mac_result.stdout.strip().upper()
+        except:
+            info['mac_address'] = 'Unknown'
+        
+        # Get WiFi signal strength
+        try:
+            wifi_result = subprocess.run(['iwconfig', 'wlan0'], 
+                                        capture_output=True, text=True, timeout=2)
+            if wifi_result.returncode == 0:
+                # Parse signal level from iwconfig output
+                for line in wifi_result.stdout.split('\n'):
+                    if 'Signal level' in line:
+                        # Extract signal level (e.g., "-50 dBm")
+                        parts = line.split('Signal level=')
+                        if len(parts) > 1:
+                            signal = parts[1].split()[0]
+                            info['wifi_signal'] = signal
+                            break
+                if 'wifi_signal' not in info:
+                    info['wifi_signal'] = 'Unknown'
+        except:
+            info['wifi_signal'] = 'Unknown'
+        
+        # Get firmware/OS version
+        try:
+            with open('/etc/os-release', 'r') as f:
+                for line in f:
+                    if line.startswith('PRETTY_NAME='):
+                        info['firmware'] = line.split('=')[1].strip().strip('"')
+                        break
+            if 'firmware' not in info:
+                info['firmware'] = 'Raspberry Pi OS'
+        except:
+            info['firmware'] = 'Unknown'
+        
+        # Get timezone
+        try:
+            tz_result = subprocess.run(['timedatectl', 'show', '--property=Timezone', '--value'], 
+                                      capture_output=True, text=True, timeout=2)
+            if tz_result.returncode == 0:
+                tz = tz_result.stdout.strip()
+                info['timezone'] = tz if tz else 'UTC'
+            else:
+                info['timezone'] = 'UTC'
+        except:
+            info['timezone'] = 'UTC'
+        
+        # Get uptime
+        try:
+            with open('/proc/uptime', 'r') as f:
+                uptime_seconds = float(f.read().split()[0])
+                info['uptime'] = int(uptime_seconds)
+        except:
+            info['uptime'] = 0
+        
+        # Get CPU temperature
+        try:
+            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
+                temp = float(f.read()) / 1000.0
+                info['cpu_temp'] = round(temp, 1)
+        except:
+            info['cpu_temp'] = None
+        
+        # Get memory usage
+        try:
+            mem_result = subprocess.run(['free'], capture_output=True, text=True, timeout=2)
+            if mem_result.returncode == 0:
+                lines = mem_result.stdout.split('\n')
+                if len(lines) > 1:
+                    mem_line = lines[1].split()
+                    total = int(mem_line[1])
+                    used = int(mem_line[2])
+                    info['memory_usage'] = round((used / total) * 100, 1)
+        except:
+            info['memory_usage'] = None
+        
+    except Exception as e:
+        print(f"Error collecting system info: {e}")
+    
+    return info
+
+def time_it(func, runs):
+    """Return the mean wall time per call and the last result"""
+    result = None
+    start = time.perf_counter()
+    for _ in range(runs):
+        result = func()
+    return (time.perf_counter() - start) / runs, result
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    collector = SystemInfoCollector()
+
+    print(f"Collecting system info, mean of {runs} runs")
+    old_time, old_info = time_it(legacy_get_system_info, runs)
+    print(f"  {'subprocess (old)':<20} {old_time * 1000:9.2f} ms")
+    new_time, new_info = time_it(collector.collect, runs)
+    print(f"  {'procfs/sysfs (new)':<20} {new_time * 1000:9.2f} ms")
+    print(f"Speedup: {old_time / new_time:.0f}x")
+
+    print("Fields:")
+    for key in sorted(set(old_info) | set(new_info)):
+        print(f"  {key:<14} old={old_info.get(key)!r:<28} new={new_info.get(key)!r}")
+
+if __name__ == "__main__":
+    main()
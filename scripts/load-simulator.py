@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Fleet load simulator for the dashboard device API
+Runs N virtual devices through the agent's real register, claim-poll, config
+and heartbeat cycle with LumyAPIClient, and reports throughput, latency
+percentiles and error rates per endpoint. Heartbeats go out the way the
+agent's LUMY_TELEMETRY mode sends them: gzip batches to /status/batch
+('live' or 'batch') or single posts to /status ('off').
+Usage: python3 load-simulator.py --url http://localhost:3000 --devices 50 --duration 60
+       python3 load-simulator.py --stub --devices 50   (in-process stub dashboard)
+"""
+import sys
+import os
+import time
+import json
+import random
+import argparse
+import tempfile
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor
+
+backend_path = os.path.join(os.path.dirname(__file__), '..', 'backend')
+sys.path.insert(0, backend_path)
+
+import logging
+logging.disable(logging.WARNING)
+
+from api_client import LumyAPIClient
+from device_manager import DeviceManager
+from http_transport import HTTPTransport
+from weather_widget import WeatherWidget
+from preview_encoder import PreviewEncoder
+from telemetry import TelemetryQueue, TelemetryUploader
+from main import generate_registration_code, get_system_info
+import config
+
+# Test tooling kept next to this script, not installed on devices
+from stub_dashboard import StubDashboard
+
+# Canned weather so previews look like real frames without touching the network
+CANNED_WEATHER = {
+    'temperature': 54,
+    'humidity': 60,
+    'wind_speed': 8,
+    'weather_code': 2,
+    'precipitation': 0,
+    'time': '2026-01-01T10:00',
+    'uv_index': 3,
+    'precipitation_chance': 20,
+    'forecast': [
+        {'date': '2026-01-02', 'weather_code': 0, 'temp_max': 60, 'temp_min': 40},
+        {'date': '2026-01-03', 'weather_code': 3, 'temp_max': 61, 'temp_min': 41},
+        {'date': '2026-01-04', 'weather_code': 61, 'temp_max': 62, 'temp_min': 42},
+        {'date': '2026-01-05', 'weather_code': 71, 'temp_max': 63, 'temp_min': 43},
+        {'date': '2026-01-06', 'weather_code': 95, 'temp_max': 64, 'temp_min': 44}
+    ]
+}
+
+class Recorder:
+    """Collects per-endpoint latencies and outcomes from every device thread"""
+
+    def __init__(self):
+        self.samples = {}
+        self.errors = {}
+        self.statuses = {}
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, seconds, status):
+        """
+        Args:
+            endpoint: Transport endpoint name
+            seconds: Request latency
+            status: HTTP status code, or the exception name if no response
+        """
+        failed = not isinstance(status, int) or status >= 400
+        with self._lock:
+            self.samples.setdefault(endpoint, []).append(seconds * 1000)
+            self.errors[endpoint] = self.errors.get(endpoint, 0) + failed
+            statuses = self.statuses.setdefault(endpoint, {})
+            statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    def report(self, elapsed):
+        """
+        Summarize the run
+
+        Returns:
+            Dict of endpoint -> counts, requests per second, error rate and
+            latency percentiles in milliseconds
+        """
+        report = {}
+        with self._lock:
+            for endpoint, samples in sorted(self.samples.items()):
+                ordered = sorted(samples)
+                pick = lambda fraction: round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 1)
+                report[endpoint] = {
+                    'requests': len(ordered),
+                    'rps': round(len(ordered) / elapsed, 2),
+                    'error_rate': round(self.errors[endpoint] / len(ordered), 4),
+                    'p50_ms': pick(0.5),
+                    'p90_ms': pick(0.9),
+                    'p99_ms': pick(0.99),
+                    'max_ms': round(ordered[-1], 1),
+                    'mean_ms': round(statistics.mean(ordered), 1),
+                    'statuses': dict(self.statuses[endpoint])
+                }
+        return report
+
+class RecordingTransport(HTTPTransport):
+    """HTTPTransport that reports every request's latency and status to a Recorder"""
+
+    def __init__(self, recorder, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorder = recorder
+
+    def request(self, endpoint, method, path, retries=None, read_timeout=None, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = super().request(endpoint, method, path, retries, read_timeout, **kwargs)
+        except Exception as e:
+            self.recorder.record(endpoint, time.perf_counter() - start, type(e).__name__)
+            raise
+        self.recorder.record(endpoint, time.perf_counter() - start, response.status_code)
+        return response
+
+class VirtualDeviceManager(DeviceManager):
+    """DeviceManager whose "MAC address" is derived from the device number"""
+
+    def __init__(self, index, state_dir):
+        super().__init__(os.path.join(state_dir, f'device_{index}'))
+        self.index = index
+
+    def _get_mac_address(self):
+        return f'0000{self.index:08x}'
+
+def build_previews(count):
+    """Encode a few distinct weather previews, like frames changing over time"""
+    widget = WeatherWidget(config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
+    encoder = PreviewEncoder(config.PREVIEW_MAX_WIDTH, config.PREVIEW_FORMAT, config.PREVIEW_QUALITY, config.PREVIEW_MAX_BYTES)
+    previews = []
+    for i in range(count):
+        image = widget.render(dict(CANNED_WEATHER, temperature=CANNED_WEATHER['temperature'] + i))
+        previews.append(encoder.get(image, f'sim-{i}'))
+    return previews
+
+def run_device(index, args, recorder, previews, system_info, deadline):
+    """
+    One virtual device: register, poll for a claim, then heartbeat and
+    refresh config on the agent's schedule until the deadline
+
+    A device that isn't claimed after --claim-polls polls carries on as if
+    it had been, so the steady-state cycle is measured either way.
+    """
+    transport = RecordingTransport(
+        recorder, args.url,
+        connect_timeout=config.HTTP_CONNECT_TIMEOUT,
+        read_timeout=config.HTTP_READ_TIMEOUT,
+        pool_size=1,
+        retries=args.retries,
+        # Keep breakers out of the way so every request reaches the server
+        failure_threshold=10 ** 9
+    )
+    client = LumyAPIClient(args.url, args.api_key, transport)
+    device_id = VirtualDeviceManager(index, args.state_dir).get_device_id()
+
+    # Spread start-up over the ramp so the fleet doesn't arrive at once
+    time.sleep(random.uniform(0, args.ramp))
+
+    client.register_device(device_id, generate_registration_code())
+    for _ in range(args.claim_polls):
+        if client.check_claim_status(device_id, wait=args.claim_wait):
+            break
+        if time.monotonic() >= deadline:
+            return
+        if args.claim_wait <= 0:
+            time.sleep(args.poll_interval)
+    client.get_config(device_id)
+
+    telemetry = None
+    if args.telemetry in ('live', 'batch'):
+        queue_file = os.path.join(args.state_dir, f'telemetry_{index}.jsonl')
+        queue = TelemetryQueue(queue_file, config.TELEMETRY_MAX_RECORDS, write_through=args.telemetry == 'batch')
+        telemetry = TelemetryUploader(queue, client, device_id, config.TELEMETRY_BATCH_SIZE,
+                                      config.TELEMETRY_RETRY_INTERVAL, config.TELEMETRY_MAX_BACKOFF)
+    last_flush = time.monotonic()
+
+    heartbeats = 0
+    preview_sent_hash = None
+    next_heartbeat = time.monotonic()
+    next_config = time.monotonic() + args.config_interval
+    while True:
+        now = time.monotonic()
+        if now >= deadline:
+            return
+        if now >= next_heartbeat:
+            # The agent only uploads the preview when the frame changed
+            preview, preview_hash = previews[(heartbeats // args.preview_every) % len(previews)]
+            if preview_hash == preview_sent_hash and not client.preview_required:
+                preview = None
+            # Same path as LumyAgent.post_heartbeat
+            if telemetry and client.batch_supported:
+                telemetry.record(system_info, None, preview_hash)
+                sent = False
+                if (args.telemetry == 'live' or len(telemetry.queue) >= telemetry.batch_size
+                        or now - last_flush >= args.flush_interval):
+                    last_flush = now
+                    sent = telemetry.flush(preview, preview_hash)
+                    if not sent and not client.batch_supported:
+                        sent = client.send_heartbeat(device_id, preview, system_info, preview_hash)
+            else:
+                sent = client.send_heartbeat(device_id, preview, system_info, preview_hash)
+            if sent:
+                if client.preview_required:
+                    preview_sent_hash = None
+                elif preview:
+                    preview_sent_hash = preview_hash
+            heartbeats += 1
+            next_heartbeat += args.heartbeat_interval
+        if now >= next_config:
+            client.get_config(device_id)
+            next_config += args.config_interval
+        time.sleep(max(0, min(next_heartbeat, next_config, deadline) - time.monotonic()))
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate a fleet of Lumy devices against the dashboard API")
+    # Never default to the production dashboard
+    parser.add_argument('--url', default='http://localhost:3000', help="dashboard base URL (default http://localhost:3000)")
+    parser.add_argument('--api-key', default=config.API_KEY, help="device API key (default LUMY_API_KEY)")
+    parser.add_argument('--stub', action='store_true', help="run against an in-process stub dashboard instead of --url")
+    parser.add_argument('--devices', type=int, default=20, help="virtual devices")
+    parser.add_argument('--duration', type=float, default=60, help="seconds to run")
+    parser.add_argument('--ramp', type=float, default=5, help="seconds over which devices start")
+    parser.add_argument('--heartbeat-interval', type=float, default=config.HEARTBEAT_INTERVAL, help="seconds between heartbeats")
+    parser.add_argument('--config-interval', type=float, default=config.CONFIG_REFRESH_INTERVAL, help="seconds between config refreshes")
+    parser.add_argument('--telemetry', choices=('live', 'batch', 'off'), default=config.TELEMETRY_MODE,
+                        help="heartbeat upload mode, as LUMY_TELEMETRY on the agent (default: the agent's default)")
+    parser.add_argument('--flush-interval', type=float, default=config.TELEMETRY_FLUSH_INTERVAL,
+                        help="seconds between batch uploads in --telemetry batch")
+    parser.add_argument('--preview-every', type=int, default=10, help="heartbeats per preview upload (the frame changes this often)")
+    parser.add_argument('--claim-polls', type=int, default=3, help="claim polls before carrying on unclaimed")
+    parser.add_argument('--claim-wait', type=float, default=0, help="long-poll wait sent with claim polls")
+    parser.add_argument('--poll-interval', type=float, default=1, help="seconds between claim polls without long-poll")
+    parser.add_argument('--retries', type=int, default=0, help="transport retries per request")
+    parser.add_argument('--state-dir', help="where device ids are kept, so reruns reuse them (default: a temp dir)")
+    parser.add_argument('--output', help="write the report as JSON to this file")
+    args = parser.parse_args()
+    args.state_dir = args.state_dir or tempfile.mkdtemp(prefix='lumy-sim-')
+    args.preview_every = max(1, args.preview_every)
+
+    previews = build_previews(4)
+    system_info = get_system_info()
+    recorder = Recorder()
+    stub = None
+    if args.stub:
+        # Shares this process (and its GIL) with the devices, so use a real
+        # server for absolute numbers; it is meant for checking the cycle
+        stub = StubDashboard()
+        args.url = stub.start()
+
+    print(f"Simulating {args.devices} devices against {args.url} for {args.duration:.0f}s "
+          f"(heartbeat {args.heartbeat_interval:g}s, config {args.config_interval:g}s, telemetry {args.telemetry})")
+    start = time.monotonic()
+    deadline = start + args.duration
+    failures = 0
+    with ThreadPoolExecutor(max_workers=args.devices) as pool:
+        futures = [pool.submit(run_device, i, args, recorder, previews, system_info, deadline) for i in range(args.devices)]
+        for future in futures:
+            try:
+                future.result()
+            except Exception as e:
+                failures += 1
+                print(f"Device crashed: {e}")
+    elapsed = time.monotonic() - start
+    if stub:
+        stub.stop()
+
+    report = recorder.report(elapsed)
+    total = sum(result['requests'] for result in report.values())
+    errors = sum(round(result['error_rate'] * result['requests']) for result in report.values())
+    print(f"\n{'endpoint':<14} {'requests':>9} {'req/s':>8} {'errors':>8} {'p50':>9} {'p90':>9} {'p99':>9} {'max':>9}")
+    for endpoint, result in report.items():
+        print(f"{endpoint:<14} {result['requests']:>9} {result['rps']:>8.2f} {result['error_rate']:>8.2%} "
+              f"{result['p50_ms']:>7.1f}ms {result['p90_ms']:>7.1f}ms {result['p99_ms']:>7.1f}ms {result['max_ms']:>7.1f}ms")
+    print(f"\n{total} requests in {elapsed:.1f}s ({total / elapsed:.1f} req/s), "
+          f"{errors / total if total else 0:.2%} errors, {failures} device(s) crashed")
+    if stub:
+        for endpoint, stats in sorted(stub.get_stats().items()):
+            print(f"  stub {endpoint:<13} {stats['bytes_in'] / 1024:>9.1f}KB in {stats['bytes_out'] / 1024:>8.1f}KB out")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({
+                'url': args.url,
+                'devices': args.devices,
+                'duration_s': round(elapsed, 1),
+                'heartbeat_interval': args.heartbeat_interval,
+                'config_interval': args.config_interval,
+                'requests': total,
+                'rps': round(total / elapsed, 2),
+                'endpoints': report
+            }, f, indent=2)
+        print(f"Report written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,363 @@
+#!/usr/bin/env python3
+"""
+Stub Dashboard - Local stand-in for the dashboard's device API
+Implements the register, registration, config and status contract in memory
+with injectable latency, errors and response sizes, and counts requests and
+bytes, so network paths can be tested and benchmarked without a network.
+Usage: python3 stub_dashboard.py [--port 3000] [--latency 0.05] [--error-rate 0.01]
+"""
+import json
+import gzip
+import time
+import random
+import argparse
+import threading
+import logging
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+from typing import Optional, Dict, Any, List
+
+logger = logging.getLogger(__name__)
+
+# Longest a claim long-poll is held, like the real endpoint
+MAX_WAIT_SECONDS = 25
+
+# Largest telemetry batch accepted
+MAX_RECORDS = 500
+
+DEFAULT_WIDGETS = [
+    {'id': 'weather', 'enabled': True, 'config': {}}
+]
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Send headers and body in one write, and don't wait on delayed ACKs
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+    def do_GET(self):
+        self.server.stub.handle(self, 'GET')
+
+    def do_POST(self):
+        self.server.stub.handle(self, 'POST')
+
+class StubDashboard:
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, api_key: Optional[str] = None,
+                 latency: float = 0.0, jitter: float = 0.0, error_rate: float = 0.0,
+                 error_status: int = 503, retry_after: Optional[int] = None,
+                 config_size: int = 0, claim_after: Optional[int] = 0,
+                 widgets: Optional[List[Dict[str, Any]]] = None, seed: Optional[int] = None):
+        """
+        Args:
+            host: Interface to listen on
+            port: Port to listen on (0 picks a free one)
+            api_key: Required X-API-KEY (None accepts any key)
+            latency: Seconds added to every response
+            jitter: Extra random seconds (0 to jitter) added to every response
+            error_rate: Fraction of requests answered with error_status
+            error_status: Status used for injected errors
+            retry_after: Retry-After seconds sent with injected errors
+            config_size: Pad config responses to at least this many bytes
+            claim_after: Registration checks before a device counts as
+                claimed (None: only when claim() is called)
+            widgets: Widgets in every device's config
+            seed: Seed for injected jitter and errors, for repeatable runs
+        """
+        self.host = host
+        self.port = port
+        self.api_key = api_key
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.config_size = config_size
+        self.claim_after = claim_after
+        self.widgets = widgets if widgets is not None else DEFAULT_WIDGETS
+        self._random = random.Random(seed)
+
+        self._devices = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+        self._claimed = threading.Condition(self._lock)
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        """Base URL to point LumyAPIClient at"""
+        return f'http://{self.host}:{self.port}'
+
+    def start(self) -> str:
+        """
+        Start serving on a background thread
+
+        Returns:
+            Base URL of the server
+        """
+        self._server = ThreadingHTTPServer((self.host, self.port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='stub-dashboard', daemon=True)
+        self._thread.start()
+        logger.info(f"Stub dashboard listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        """Stop serving"""
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _device(self, device_id: str) -> Dict[str, Any]:
+        """Per-device state (call with the lock held)"""
+        device = self._devices.get(device_id)
+        if device is None:
+            device = self._devices[device_id] = {
+                'code': None,
+                'checks': 0,
+                'claimed_at': None,
+                'preview_hash': None,
+                'status': None,
+                'config_updated_at': datetime.now(timezone.utc).isoformat(),
+                'widgets': None
+            }
+        return device
+
+    def claim(self, device_id: str):
+        """Mark a device as claimed, waking any long-poll waiting on it"""
+        with self._claimed:
+            self._device(device_id)['claimed_at'] = datetime.now(timezone.utc).isoformat()
+            self._claimed.notify_all()
+
+    def set_widgets(self, device_id: str, widgets: List[Dict[str, Any]]):
+        """Change a device's widgets (and so its config ETag)"""
+        with self._lock:
+            device = self._device(device_id)
+            device['widgets'] = widgets
+            device['config_updated_at'] = datetime.now(timezone.utc).isoformat()
+
+    def get_device(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Copy of a device's state, or None if it never called in"""
+        with self._lock:
+            device = self._devices.get(device_id)
+            return dict(device) if device else None
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint request, error and byte counts"""
+        with self._lock:
+            return {endpoint: dict(stats, statuses=dict(stats['statuses'])) for endpoint, stats in self._stats.items()}
+
+    def reset_stats(self):
+        with self._lock:
+            self._stats.clear()
+
+    def _record(self, endpoint: str, status: int, bytes_in: int, bytes_out: int):
+        with self._lock:
+            stats = self._stats.setdefault(endpoint, {
+                'requests': 0, 'errors': 0, 'bytes_in': 0, 'bytes_out': 0, 'statuses': {}
+            })
+            stats['requests'] += 1
+            stats['errors'] += status >= 400
+            stats['bytes_in'] += bytes_in
+            stats['bytes_out'] += bytes_out
+            stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+
+    @staticmethod
+    def _route(method: str, path: str):
+        """
+        Match a request to an endpoint
+
+        Returns:
+            Tuple of (endpoint name, device id), with a None endpoint if
+            nothing matches. Names match LumyAPIClient's transport endpoints.
+        """
+        parts = path.strip('/').split('/')
+        if parts[:2] != ['api', 'devices'] or len(parts) < 3:
+            return None, None
+        if parts[2:] == ['register']:
+            return ('register' if method == 'POST' else None), None
+        endpoint = {
+            ('GET', 'registration'): 'registration',
+            ('GET', 'config'): 'config',
+            ('POST', 'status'): 'status',
+            ('POST', 'status/batch'): 'status_batch'
+        }.get((method, '/'.join(parts[3:])))
+        return endpoint, parts[2]
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str):
+        """Route a request to its endpoint, injecting latency and errors"""
+        url = urlparse(request.path)
+        body = request.rfile.read(int(request.headers.get('Content-Length') or 0))
+        endpoint, device_id = self._route(method, url.path)
+
+        headers = {}
+        if endpoint is None:
+            endpoint, status, payload = 'unknown', 404, {'error': 'Not found'}
+        else:
+            with self._lock:
+                delay = self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0)
+                fail = self.error_rate and self._random.random() < self.error_rate
+            if delay:
+                time.sleep(delay)
+
+            if self.api_key is not None and request.headers.get('X-API-KEY') != self.api_key:
+                status, payload = 401, {'error': 'Unauthorized'}
+            elif fail:
+                status, payload = self.error_status, {'success': False, 'error': 'Injected error'}
+                if self.retry_after is not None:
+                    headers['Retry-After'] = str(self.retry_after)
+            else:
+                try:
+                    handler = getattr(self, f'_{endpoint}')
+                    status, payload, headers = handler(device_id, request, body, parse_qs(url.query))
+                except Exception as e:
+                    logger.error(f"Stub dashboard {endpoint} failed: {e}")
+                    status, payload = 500, {'error': str(e)}
+
+        data = json.dumps(payload).encode('utf-8') if payload is not None else b''
+        request.send_response(status)
+        if data:
+            request.send_header('Content-Type', 'application/json')
+        request.send_header('Content-Length', str(len(data)))
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.end_headers()
+        request.wfile.write(data)
+        self._record(endpoint, status, len(body), len(data))
+
+    def _register(self, device_id, request, body, query):
+        data = json.loads(body or b'{}')
+        device_id, code = data.get('device_id'), data.get('registration_code')
+        if not device_id or not code:
+            return 400, {'error': 'device_id and registration_code are required'}, {}
+        expires_at = datetime.fromtimestamp(time.time() + data.get('expires_in', 3600), timezone.utc).isoformat()
+        with self._lock:
+            self._device(device_id)['code'] = code.upper()
+        return 200, {'success': True, 'code': code.upper(), 'expires_at': expires_at}, {}
+
+    def _registration(self, device_id, request, body, query):
+        try:
+            wait = min(max(0.0, float(query.get('wait', ['0'])[0])), MAX_WAIT_SECONDS)
+        except ValueError:
+            wait = 0.0
+        deadline = time.monotonic() + wait
+        with self._claimed:
+            device = self._device(device_id)
+            device['checks'] += 1
+            if device['claimed_at'] is None and self.claim_after is not None and device['checks'] > self.claim_after:
+                device['claimed_at'] = datetime.now(timezone.utc).isoformat()
+            while device['claimed_at'] is None and time.monotonic() < deadline:
+                self._claimed.wait(deadline - time.monotonic())
+            claimed_at = device['claimed_at']
+        if claimed_at is None:
+            return 200, {'registered': False, 'device_id': device_id, 'wait': wait}, {}
+        return 200, {
+            'registered': True,
+            'device_id': device_id,
+            'user_id': 'stub-user',
+            'device_name': f'Stub {device_id}',
+            'registered_at': claimed_at
+        }, {}
+
+    def _config(self, device_id, request, body, query):
+        with self._lock:
+            device = self._device(device_id)
+            updated_at = device['config_updated_at']
+            widgets = device['widgets'] if device['widgets'] is not None else self.widgets
+        etag = f'W/"{device_id}-{updated_at}"'
+        if request.headers.get('If-None-Match') == etag:
+            return 304, None, {'ETag': etag}
+
+        config = {
+            'device_id': device_id,
+            'display': {'width': 800, 'height': 480, 'refresh_interval': 300},
+            'widgets': widgets,
+            'updated_at': updated_at
+        }
+        size = len(json.dumps(config))
+        if size < self.config_size:
+            config['padding'] = 'x' * (self.config_size - size - len(', "padding": ""'))
+        return 200, config, {'ETag': etag}
+
+    def _update_preview(self, device, preview, preview_hash) -> bool:
+        """Store a preview, returning True if the device should send one"""
+        if preview:
+            device['preview_hash'] = preview_hash
+            return False
+        return bool(preview_hash) and device['preview_hash'] != preview_hash
+
+    def _status(self, device_id, request, body, query):
+        data = json.loads(body or b'{}')
+        with self._lock:
+            device = self._device(device_id)
+            device['status'] = data
+            preview_required = self._update_preview(device, data.get('display_preview'), data.get('display_preview_hash'))
+        return 200, {'success': True, 'preview_required': preview_required}, {}
+
+    def _status_batch(self, device_id, request, body, query):
+        try:
+            if request.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            data = json.loads(body)
+        except (OSError, ValueError):
+            return 400, {'success': False, 'error': 'Invalid batch body'}, {}
+
+        records = data.get('records') if isinstance(data.get('records'), list) else []
+        if not 0 < len(records) <= MAX_RECORDS:
+            return 400, {'success': False, 'error': f'Batch must hold 1-{MAX_RECORDS} records'}, {}
+
+        latest = max(records, key=lambda record: record.get('ts', 0))
+        preview_hash = data.get('display_preview_hash') or latest.get('display_preview_hash')
+        with self._lock:
+            device = self._device(device_id)
+            device['status'] = latest
+            preview_required = self._update_preview(device, data.get('display_preview'), preview_hash)
+        return 200, {'success': True, 'accepted': len(records), 'preview_required': preview_required}, {}
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in for the Lumy dashboard device API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=3000)
+    parser.add_argument('--api-key', help="require this X-API-KEY (default: accept any)")
+    parser.add_argument('--latency', type=float, default=0, help="seconds added to every response")
+    parser.add_argument('--jitter', type=float, default=0, help="up to this many extra random seconds per response")
+    parser.add_argument('--error-rate', type=float, default=0, help="fraction of requests that fail")
+    parser.add_argument('--error-status', type=int, default=503, help="status for injected errors")
+    parser.add_argument('--retry-after', type=int, help="Retry-After sent with injected errors")
+    parser.add_argument('--config-size', type=int, default=0, help="pad config responses to this many bytes")
+    parser.add_argument('--claim-after', type=int, default=0, help="registration checks before a device is claimed (-1: never)")
+    parser.add_argument('--seed', type=int, help="seed for injected jitter and errors")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    stub = StubDashboard(
+        args.host, args.port, args.api_key, args.latency, args.jitter, args.error_rate,
+        args.error_status, args.retry_after, args.config_size,
+        None if args.claim_after < 0 else args.claim_after, seed=args.seed
+    )
+    stub.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.stop()
+        print(json.dumps(stub.get_stats(), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,17 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { createHash } from 'crypto';
 
 // This is a placeholder - you'll need to add Supabase after deployment
 // For now, return static config
+
+// Weak ETag hashed from the config's content (not updated_at), so it is the
+// same on every server instance and only changes when the config does
+function configEtag(config: Record<string, unknown>) {
+  const content = JSON.stringify({ ...config, updated_at: undefined });
+  const digest = createHash('sha1').update(content).digest('hex');
+  return `W/"${digest.slice(0, 16)}"`;
+}
+
 export async function GET(
   request: NextRequest,
   { params }: { params: { id: string } }
@@ -9,7 +19,9 @@ export async function GET(
   const deviceId = params.id;
   
   // Verify API key (basic check for now)
-  const apiKey = request.headers.get('authorization')?.replace('Bearer ', '');
+  const apiKey =
+    request.headers.get('X-API-KEY') ||
+    request.headers.get('authorization')?.replace('Bearer ', '');
   if (!apiKey) {
     return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
   }
@@ -22,30 +34,42 @@ export async function GET(
       height: 480,
       refresh_interval: 300
     },
+    // region is [x, y, width, height] and widgets draw in this order, so
+    // the clock and calendar sit in free space on the full-screen weather
     widgets: [
       {
-        id: 'clock',
+        id: 'weather',
         enabled: true,
-        config: {}
+        config: {
+          location: 'New York',
+          units: 'metric',
+          region: [0, 0, 800, 480]
+        }
       },
       {
-        id: 'weather',
+        id: 'clock',
         enabled: true,
         config: {
-          location: 'New York',
-          units: 'metric'
+          region: [280, 170, 240, 100]
         }
       },
       {
         id: 'calendar',
         enabled: true,
         config: {
-          max_events: 5
+          max_events: 5,
+          region: [10, 300, 247, 130]
         }
       }
     ],
     updated_at: new Date().toISOString()
   };
   
-  return NextResponse.json(config);
+  // Unchanged since the device last fetched it: skip the body
+  const etag = configEtag(config);
+  if (request.headers.get('if-none-match') === etag) {
+    return new NextResponse(null, { status: 304, headers: { ETag: etag } });
+  }
+  
+  return NextResponse.json(config, { headers: { ETag: etag } });
 }
@@ -5,6 +5,80 @@ const supabaseUrl = process.env.NEXT_PUBLIC_SUPABASE_URL!;
 const supabaseServiceRoleKey = process.env.SUPABASE_SERVICE_ROLE_KEY!;
 const supabase = createClient(supabaseUrl, supabaseServiceRoleKey);
 
+// Long-polls hold the request open, so never cache and allow for the wait
+export const dynamic = 'force-dynamic';
+export const maxDuration = 30;
+
+// Longest a device may ask us to hold a long-poll
+const MAX_WAIT_SECONDS = 25;
+
+// How often a held request re-checks the database, in case the realtime
+// notification is missed (or realtime isn't enabled for the table)
+const RECHECK_INTERVAL_MS = 5000;
+
+async function lookupDevice(deviceId: string) {
+  const { data: device, error } = await supabase
+    .from('devices')
+    .select('user_id, device_name, registered_at')
+    .eq('device_id', deviceId)
+    .single();
+
+  if (error && error.code !== 'PGRST116') {
+    throw error;
+  }
+  return device;
+}
+
+// Watch the device row for the whole request: one realtime channel and one
+// abort listener, however many times the held request re-checks
+function watchClaim(deviceId: string, signal: AbortSignal) {
+  let changed = false;
+  let wake: (() => void) | null = null;
+
+  const notify = () => {
+    changed = true;
+    wake?.();
+  };
+
+  const channel = supabase
+    .channel(`claim-${deviceId}-${Date.now()}`)
+    .on(
+      'postgres_changes',
+      { event: '*', schema: 'public', table: 'devices', filter: `device_id=eq.${deviceId}` },
+      notify
+    )
+    .subscribe();
+  signal.addEventListener('abort', notify);
+
+  return {
+    // Resolve when the row is created or updated (or the request is
+    // aborted) since the last call, or after timeoutMs
+    next(timeoutMs: number) {
+      return new Promise<void>((resolve) => {
+        const timer = setTimeout(() => settle(), timeoutMs);
+
+        function settle() {
+          clearTimeout(timer);
+          wake = null;
+          changed = false;
+          resolve();
+        }
+
+        if (changed || signal.aborted) {
+          settle();
+        } else {
+          wake = settle;
+        }
+      });
+    },
+    done() {
+      wake?.();
+      signal.removeEventListener('abort', notify);
+      supabase.removeChannel(channel);
+    },
+  };
+}
+
 export async function GET(
   request: NextRequest,
   { params }: { params: { id: string } }
@@ -16,26 +90,36 @@ export async function GET(
     return NextResponse.json({ error: 'Unauthorized' }, { status: 401 });
   }
 
+  // ?wait=N holds the request for up to N seconds until the device is claimed
+  const requestedWait = Number(request.nextUrl.searchParams.get('wait') || 0);
+  const wait = Math.min(Math.max(0, requestedWait || 0), MAX_WAIT_SECONDS);
+
   try {
     // Check if device is registered
-    const { data: device, error } = await supabase
-      .from('devices')
-      .select('user_id, device_name, registered_at')
-      .eq('device_id', deviceId)
-      .single();
-
-    if (error && error.code !== 'PGRST116') {
-      console.error('Error checking registration:', error);
-      return NextResponse.json(
-        { error: 'Failed to check registration' },
-        { status: 500 }
-      );
+    let device = await lookupDevice(deviceId);
+    const deadline = Date.now() + wait * 1000;
+
+    if (!device && Date.now() < deadline) {
+      const watcher = watchClaim(deviceId, request.signal);
+      try {
+        while (!device && Date.now() < deadline) {
+          if (request.signal.aborted) {
+            break;
+          }
+          const remaining = deadline - Date.now();
+          await watcher.next(Math.min(remaining, RECHECK_INTERVAL_MS));
+          device = await lookupDevice(deviceId);
+        }
+      } finally {
+        watcher.done();
+      }
     }
 
     if (!device) {
       return NextResponse.json({
         registered: false,
         device_id: deviceId,
+        wait,
       });
     }
 
@@ -49,7 +133,7 @@ export async function GET(
   } catch (error) {
     console.error('Error checking registration:', error);
     return NextResponse.json(
-      { error: 'Internal server error' },
+      { error: 'Failed to check registration' },
       { status: 500 }
     );
   }
@@ -0,0 +1,183 @@
+import { NextRequest, NextResponse } from 'next/server';
+import { createClient } from '@supabase/supabase-js';
+import { gunzipSync } from 'zlib';
+
+const supabase = createClient(
+  process.env.NEXT_PUBLIC_SUPABASE_URL || '',
+  process.env.SUPABASE_SERVICE_ROLE_KEY || ''
+);
+
+// Largest batch accepted in one request
+const MAX_RECORDS = 500;
+
+// Largest (decompressed) body accepted, so a small gzip body can't expand
+// into gigabytes
+const MAX_BODY_BYTES = 8 * 1024 * 1024;
+
+// Seconds a device should wait before retrying when we can't store its batch
+const RETRY_AFTER_SECONDS = 120;
+
+interface TelemetryRecord {
+  ts: number;
+  status?: string;
+  system?: Record<string, unknown>;
+  widgets?: Record<string, unknown>;
+  display_preview_hash?: string | null;
+}
+
+// A record needs a finite Unix timestamp in a range Date can represent
+function isValidRecord(record: unknown): record is TelemetryRecord {
+  if (!record || typeof record !== 'object') return false;
+  const ts = (record as TelemetryRecord).ts;
+  return typeof ts === 'number' && Number.isFinite(ts) && !Number.isNaN(new Date(ts * 1000).getTime());
+}
+
+function tooLarge() {
+  return NextResponse.json(
+    { success: false, error: `Batch body must be at most ${MAX_BODY_BYTES} bytes` },
+    { status: 413 }
+  );
+}
+
+// Ask the device to back off; it keeps the batch and retries later
+function retryLater(error: string) {
+  return NextResponse.json(
+    { success: false, error },
+    { status: 503, headers: { 'Retry-After': String(RETRY_AFTER_SECONDS) } }
+  );
+}
+
+// POST - Store a batch of queued heartbeats (optionally gzip-compressed)
+export async function POST(
+  request: NextRequest,
+  { params }: { params: { id: string } }
+) {
+  const deviceId = params.id;
+  
+  // Same key as the other device routes, as X-API-KEY or a Bearer token
+  const apiKey =
+    request.headers.get('X-API-KEY') ||
+    request.headers.get('authorization')?.replace('Bearer ', '');
+  if (apiKey !== process.env.LUMY_API_KEY) {
+    return NextResponse.json({ success: false, error: 'Unauthorized' }, { status: 401 });
+  }
+  
+  let body;
+  try {
+    const raw = Buffer.from(await request.arrayBuffer());
+    if (raw.length > MAX_BODY_BYTES) {
+      return tooLarge();
+    }
+    const encoding = request.headers.get('content-encoding');
+    const text = (encoding === 'gzip' ? gunzipSync(raw, { maxOutputLength: MAX_BODY_BYTES }) : raw).toString('utf-8');
+    body = JSON.parse(text);
+  } catch (err) {
+    if ((err as NodeJS.ErrnoException).code === 'ERR_BUFFER_TOO_LARGE') {
+      return tooLarge();
+    }
+    return NextResponse.json({ success: false, error: 'Invalid batch body' }, { status: 400 });
+  }
+  if (!body || typeof body !== 'object' || Array.isArray(body)) {
+    return NextResponse.json({ success: false, error: 'Batch body must be a JSON object' }, { status: 400 });
+  }
+  
+  const received: unknown[] = Array.isArray(body.records) ? body.records : [];
+  if (received.length === 0 || received.length > MAX_RECORDS) {
+    return NextResponse.json(
+      { success: false, error: `Batch must hold 1-${MAX_RECORDS} records` },
+      { status: 400 }
+    );
+  }
+  
+  // Drop malformed records rather than failing the batch: the device keeps
+  // a failed batch and would resend the same bad records forever
+  const records = received.filter(isValidRecord);
+  const rejected = received.length - records.length;
+  if (rejected > 0) {
+    console.warn(`Device ${deviceId} sent ${rejected} malformed telemetry record(s), skipping them`);
+  }
+  if (records.length === 0) {
+    return NextResponse.json({ success: true, accepted: 0, rejected, preview_required: false });
+  }
+  
+  try {
+    // Keep the history so samples from an outage aren't lost
+    const { error: historyError } = await supabase
+      .from('device_telemetry')
+      .insert(records.map((record) => ({
+        device_id: deviceId,
+        recorded_at: new Date(record.ts * 1000).toISOString(),
+        system: record.system || {},
+        widgets: record.widgets || {}
+      })));
+    
+    if (historyError) {
+      console.error('Failed to store telemetry batch:', historyError);
+      // Constraint violations won't go away on a retry: tell the device to
+      // drop the batch rather than resend it forever
+      if (historyError.code === '23503') {
+        return NextResponse.json({ success: false, error: 'Unknown device' }, { status: 404 });
+      }
+      if (historyError.code?.startsWith('23')) {
+        return NextResponse.json({ success: false, error: 'Batch rejected' }, { status: 422 });
+      }
+      return retryLater('Could not store telemetry');
+    }
+    
+    // The newest sample is the device's current status
+    const latest = records.reduce((a, b) => (b.ts > a.ts ? b : a));
+    const { error: statusError } = await supabase
+      .from('device_status')
+      .upsert({
+        device_id: deviceId,
+        status: latest.status || 'online',
+        last_refresh: null,
+        widgets: latest.widgets || {},
+        system: latest.system || {},
+        updated_at: new Date().toISOString()
+      });
+    
+    if (statusError) {
+      console.error('Supabase error:', statusError);
+    }
+    
+    const previewHash = body.display_preview_hash || latest.display_preview_hash || null;
+    let previewRequired = false;
+    if (body.display_preview) {
+      const { error: deviceError } = await supabase
+        .from('devices')
+        .update({
+          display_preview: body.display_preview,
+          display_preview_hash: previewHash,
+          last_seen: new Date().toISOString(),
+          is_online: true
+        })
+        .eq('device_id', deviceId);
+      
+      if (deviceError) {
+        console.error('Failed to update device preview:', deviceError);
+      }
+    } else {
+      const { data: device } = await supabase
+        .from('devices')
+        .update({
+          last_seen: new Date().toISOString(),
+          is_online: true
+        })
+        .eq('device_id', deviceId)
+        .select('display_preview_hash')
+        .maybeSingle();
+      
+      // Same as single heartbeats: ask for the preview if ours is stale
+      if (previewHash && device?.display_preview_hash !== previewHash) {
+        previewRequired = true;
+      }
+    }
+    
+    console.log(`Device ${deviceId} uploaded ${records.length} telemetry samples`);
+    return NextResponse.json({ success: true, accepted: records.length, rejected, preview_required: previewRequired });
+  } catch (err) {
+    console.error('Error storing telemetry batch:', err);
+    return retryLater(String(err));
+  }
+}
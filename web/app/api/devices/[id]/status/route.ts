@@ -74,11 +74,13 @@ export async function POST(
     }
     
     // If display preview is provided, update the device record
+    let previewRequired = false;
     if (body.display_preview) {
       const { error: deviceError } = await supabase
         .from('devices')
         .update({ 
           display_preview: body.display_preview,
+          display_preview_hash: body.display_preview_hash || null,
           last_seen: new Date().toISOString(),
           is_online: true
         })
@@ -89,16 +91,24 @@ export async function POST(
       }
     } else {
       // Just update last_seen and is_online
-      await supabase
+      const { data: device } = await supabase
         .from('devices')
         .update({ 
           last_seen: new Date().toISOString(),
           is_online: true
         })
-        .eq('device_id', deviceId);
+        .eq('device_id', deviceId)
+        .select('display_preview_hash')
+        .maybeSingle();
+      
+      // "Unchanged preview" heartbeat: ask for the full preview if the
+      // one we have stored isn't the frame the device is showing
+      if (body.display_preview_hash && device?.display_preview_hash !== body.display_preview_hash) {
+        previewRequired = true;
+      }
     }
     
-    return NextResponse.json({ success: true });
+    return NextResponse.json({ success: true, preview_required: previewRequired });
   } catch (err) {
     console.error('Error updating status:', err);
     return NextResponse.json({ success: false, error: String(err) }, { status: 500 });